@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark of DataLoader parser backends
+
+Writes a synthetic clean file (tab-separated, decimal commas) with the
+column layout of a mapped Fluke 435 export and times each parser engine.
+
+Usage:
+    python benchmarks/parser_backends.py [--rows 1000000] [--cols 26]
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fluke_processor.data_loader import DataLoader, PARSER_ENGINES
+
+
+def write_clean_file(filepath: Path, rows: int, cols: int):
+    """Write synthetic clean data in blocks of 100k rows"""
+
+    rng = np.random.default_rng(0)
+    start = np.datetime64('2025-10-21T16:01:00')
+
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write('\t'.join(['Dátum', 'Čas'] + [f"Hodnota {i} Priem" for i in range(cols - 2)]) + '\n')
+
+        for offset in range(0, rows, 100_000):
+            n = min(100_000, rows - offset)
+            ts = (start + np.arange(offset, offset + n) * np.timedelta64(1, 'm')).astype(str)
+            values = rng.uniform(-1000, 100000, size=(n, cols - 2))
+
+            lines = []
+            for t, row in zip(ts, values):
+                date, clock = t.split('T')
+                y, m, d = date.split('-')
+                fields = [f"{d}.{m}.{y}", f"{clock}.000"]
+                fields += [f"{v:.3f}".replace('.', ',') for v in row]
+                lines.append('\t'.join(fields))
+
+            f.write('\n'.join(lines) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DataLoader parser backends')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--cols', type=int, default=26)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = Path(tmp) / 'bench_clean.txt'
+
+        print(f"Writing {args.rows:,} rows × {args.cols} columns ...")
+        write_clean_file(filepath, args.rows, args.cols)
+        print(f"File size: {filepath.stat().st_size / 1024 / 1024:.1f} MB\n")
+
+        timings = {}
+        for engine in PARSER_ENGINES:
+            loader = DataLoader(str(filepath), engine=engine)
+
+            t0 = time.perf_counter()
+            df = loader.load_data(auto_mode=False)
+            timings[engine] = time.perf_counter() - t0
+
+            print(f"{engine:>8}: {timings[engine]:7.2f} s  ({len(df):,} rows)")
+
+        base = timings['python']
+        print()
+        for engine, seconds in timings.items():
+            print(f"{engine:>8}: {base / seconds:6.1f}x vs python engine")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,10 +7,23 @@ Fluke 435 analyzers via Power Log Classic 4.6.
 Features:
 - Fuzzy column matching (SK/CZ/EN)
 - Robust preprocessing (missing zeros, encoding issues)
+- Streaming preprocess-and-parse without a scratch copy
 - Energy calculations and cross-validations
+- Sampling segment table (gaps, mixed Δt) for energy and reports
+- Aggregation pyramid (1 min → 1 day) for reports, plots and compliance
+- Rolling 15 min / 1 h demand with daily and top-N peaks
+- Voltage dip/swell/interruption events
+- Harmonic analytics (THD, EN 50160 limits, dominant harmonic, spectrum)
+- Metric dependency graph (column projection, parallel metrics)
 - XLSX reports with multiple sheets
 - PNG visualizations
 - Chunked processing for large files (up to 10M rows)
+- Streaming analysis with bounded memory (online accumulators)
+- Append mode for growing exports (persisted accumulator state)
+- Lazy dataset queries (column and time-range pushdown)
+- Sparse time index sidecar for random access to time windows
+- Cache of parsed data for fast reruns
+- Harmonics 2-50 as a dense float32 array
 
 Author: Claude Code Analysis
 Version: 1.0.0
@@ -20,16 +33,41 @@ Date: 2025-11-12
 __version__ = "1.0.0"
 __author__ = "Claude Code Analysis"
 
-from .preprocessor import preprocess_file
+from .preprocessor import preprocess_file, CleanStream
 from .column_mapper import ColumnMapper
 from .data_loader import DataLoader
 from .calculator import Calculator
+from .streaming import StreamingCalculator
 from .exporter import Exporter
+from .cache import DataCache
+from .harmonics import HarmonicDecoder, HarmonicAnalyzer
+from .segments import SegmentTable, SegmentStats
+from .pyramid import AggregationPyramid
+from .demand import DemandEngine
+from .events import EventTable
+from .scheduler import MetricScheduler
+from .append import AppendState
+from .dataset import FlukeDataset
+from .time_index import TimeIndex
 
 __all__ = [
     'preprocess_file',
+    'CleanStream',
     'ColumnMapper',
     'DataLoader',
     'Calculator',
-    'Exporter'
+    'StreamingCalculator',
+    'Exporter',
+    'DataCache',
+    'HarmonicDecoder',
+    'HarmonicAnalyzer',
+    'SegmentTable',
+    'SegmentStats',
+    'AggregationPyramid',
+    'DemandEngine',
+    'EventTable',
+    'MetricScheduler',
+    'AppendState',
+    'FlukeDataset',
+    'TimeIndex'
 ]
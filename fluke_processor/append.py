@@ -0,0 +1,163 @@
+"""
+Append module for growing logger exports
+
+A Fluke export that is still being recorded (or re-exported with more
+data) only grows at its end. AppendState keeps the StreamingCalculator
+accumulators of the last run together with the byte offset up to which
+the file was consumed, so the next run only preprocesses and parses the
+new tail and continues the accumulators from there.
+
+The state is only reused when the file still starts with the same bytes
+(hash of everything before the offset, so any edit or replacement is
+detected) and the run settings (columns, metrics, parser, code version)
+are unchanged; otherwise the whole file is reprocessed. The prefix is
+read once per run: the digest verified on load is continued over the
+new tail on save.
+"""
+
+import os
+import hashlib
+import logging
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional
+from .config import CACHE_DIR
+from .cache import HASH_BLOCK_SIZE
+
+logger = logging.getLogger(__name__)
+
+APPEND_VERSION = 2
+STATE_SUBDIR = 'append'
+
+
+def prefix_digest(filepath: Path, offset: int, digest=None, start: int = 0):
+    """
+    BLAKE2b of the first offset bytes of a file
+
+    Args:
+        filepath: Path to file
+        offset: Bytes to hash
+        digest: Digest of the first start bytes to continue (None = new)
+        start: Bytes already hashed into digest
+
+    Returns:
+        hashlib digest object
+    """
+
+    if digest is None:
+        digest = hashlib.blake2b(digest_size=16)
+
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        remaining = offset - start
+
+        while remaining > 0:
+            block = f.read(min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+
+    return digest
+
+
+class AppendState:
+    """
+    Persisted streaming accumulators and consumed offset of one input file
+    """
+
+    def __init__(self, input_path: str, state_dir: str = CACHE_DIR):
+        """
+        Initialize state
+
+        Args:
+            input_path: Path to the growing export
+            state_dir: Directory for state files (created if missing)
+        """
+
+        self.input_path = Path(input_path)
+        self.state_dir = Path(state_dir).expanduser() / STATE_SUBDIR
+
+        name = hashlib.blake2b(str(self.input_path.resolve()).encode('utf-8'),
+                               digest_size=16).hexdigest()
+        self.path = self.state_dir / f"{name}.pkl"
+
+        # (offset, digest) of the prefix verified by load(), continued by save()
+        self._verified = None
+
+    def load(self, settings: Dict) -> Optional[Dict]:
+        """
+        Load state of the previous run
+
+        Args:
+            settings: Run settings that must match the previous run
+
+        Returns:
+            Dict with offset, last_timestamp and calc (StreamingCalculator),
+            or None if the whole file has to be processed
+        """
+
+        if not self.path.exists():
+            logger.info("Append: no previous state, processing whole file")
+            return None
+
+        try:
+            state = pd.read_pickle(self.path)
+        except Exception as e:
+            logger.warning(f"Append: unreadable state {self.path.name} ({e}), processing whole file")
+            return None
+
+        if state.get('version') != APPEND_VERSION or state.get('settings') != settings:
+            logger.info("Append: settings changed, processing whole file")
+            return None
+
+        offset = state['offset']
+
+        if self.input_path.stat().st_size < offset:
+            logger.info("Append: file is shorter than the stored offset, processing whole file")
+            return None
+
+        digest = prefix_digest(self.input_path, offset)
+
+        if digest.hexdigest() != state['fingerprint']:
+            logger.info("Append: file changed before the stored offset, processing whole file")
+            return None
+
+        self._verified = (offset, digest)
+
+        logger.info(f"Append: resuming at byte {offset:,} "
+                    f"(last timestamp {state['last_timestamp']})")
+
+        return state
+
+    def save(self, offset: int, calc, settings: Dict):
+        """
+        Store accumulators and consumed offset (before calc.finalize())
+
+        Args:
+            offset: Bytes of the file consumed so far
+            calc: StreamingCalculator after its last update
+            settings: Run settings of this run
+        """
+
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+
+        # Only the bytes after the prefix verified on load are read
+        start, digest = 0, None
+        if self._verified is not None and self._verified[0] <= offset:
+            start, digest = self._verified[0], self._verified[1].copy()
+
+        state = {
+            'version': APPEND_VERSION,
+            'settings': settings,
+            'offset': offset,
+            'fingerprint': prefix_digest(self.input_path, offset, digest, start).hexdigest(),
+            'last_timestamp': calc.last_timestamp,
+            'calc': calc
+        }
+
+        tmp_path = self.path.with_suffix('.tmp')
+        pd.to_pickle(state, tmp_path)
+        os.replace(tmp_path, self.path)
+
+        logger.info(f"Append: saved state at byte {offset:,}")
@@ -0,0 +1,265 @@
+"""
+Cache module for preprocessed and parsed data
+
+Stores the clean, mapped DataFrame of a raw export under a content key:
+hash of the raw file + preprocessor version + column mapping.
+A rerun on an unchanged file (e.g. after a threshold change) can then
+skip preprocessing, mapping and parsing altogether. Results derived
+from the data (memoized metric results, see scheduler) are stored under
+keys derived from the data key.
+
+Entries are evicted least-recently-used first once the cache grows
+above its size cap.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, Optional
+from .config import CACHE_DIR, CACHE_MAX_SIZE_MB, CACHE_STAT_INDEX_MAX
+from .preprocessor import PREPROCESSOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+STAT_INDEX_FILE = 'stat_index.json'
+ENTRY_SUFFIX = '.pkl'
+
+
+def _describe(entry: Any) -> str:
+    """Short description of a cache entry for log messages"""
+
+    if isinstance(entry, pd.DataFrame):
+        return f"{len(entry):,} rows"
+
+    return 'metric results' if isinstance(entry, dict) else type(entry).__name__
+
+
+class DataCache:
+    """
+    Content-addressed on-disk cache of loaded DataFrames with LRU eviction
+    """
+
+    def __init__(self,
+                 cache_dir: str = CACHE_DIR,
+                 max_size_mb: float = CACHE_MAX_SIZE_MB):
+        """
+        Initialize cache
+
+        Args:
+            cache_dir: Cache directory (created if missing)
+            max_size_mb: Size cap; oldest entries are evicted above it
+        """
+
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_mb = max_size_mb
+        self._stat_index = None
+
+    def _load_stat_index(self) -> Dict:
+        """Load {path: [size, mtime_ns, digest]} index of hashed files (once per instance)"""
+
+        if self._stat_index is None:
+            try:
+                with open(self.cache_dir / STAT_INDEX_FILE, 'r', encoding='utf-8') as f:
+                    self._stat_index = json.load(f)
+            except (OSError, ValueError):
+                self._stat_index = {}
+
+        return self._stat_index
+
+    @staticmethod
+    def _prune_stat_index(index: Dict) -> Dict:
+        """
+        Drop stale entries and cap the index size
+
+        Entries of files that are gone or whose size/mtime changed can
+        never hit again. Above CACHE_STAT_INDEX_MAX entries the ones
+        hashed longest ago are dropped (the index keeps hashing order).
+
+        Args:
+            index: Stat index from _load_stat_index()
+
+        Returns:
+            Pruned index
+        """
+
+        pruned = {}
+        for path, entry in index.items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            if entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                pruned[path] = entry
+
+        return dict(list(pruned.items())[-CACHE_STAT_INDEX_MAX:])
+
+    def _save_stat_index(self, index: Dict):
+        """Write stat index atomically"""
+
+        self._stat_index = index
+
+        tmp_path = self.cache_dir / (STAT_INDEX_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.cache_dir / STAT_INDEX_FILE)
+
+    def file_digest(self, filepath: str) -> str:
+        """
+        Hash file contents (BLAKE2b)
+
+        The digest is remembered together with the file's size and
+        modification time, so an unchanged file is not read again. The
+        index is only rewritten (and pruned) when a file had to be hashed.
+
+        Args:
+            filepath: Path to file
+
+        Returns:
+            Hex digest
+        """
+
+        filepath = Path(filepath).resolve()
+        stat = filepath.stat()
+
+        index = self._load_stat_index()
+        entry = index.get(str(filepath))
+
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+
+        h = hashlib.blake2b(digest_size=16)
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                h.update(block)
+
+        digest = h.hexdigest()
+
+        index.pop(str(filepath), None)
+        index[str(filepath)] = [stat.st_size, stat.st_mtime_ns, digest]
+        self._save_stat_index(self._prune_stat_index(index))
+
+        return digest
+
+    def make_key(self, filepath: str, column_mapping: Dict, **params) -> str:
+        """
+        Build cache key for a file and the way it is loaded
+
+        Args:
+            filepath: Path to raw data file
+            column_mapping: Dict of {logical_name: column_index}
+            **params: Other settings that change the loaded data
+
+        Returns:
+            Hex key
+        """
+
+        key_data = {
+            'file': self.file_digest(filepath),
+            'preprocessor': PREPROCESSOR_VERSION,
+            'mapping': column_mapping,
+            **params
+        }
+
+        blob = json.dumps(key_data, sort_keys=True).encode('utf-8')
+        return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+    def derive_key(self, key: str, name: str, **params) -> str:
+        """
+        Build key of a table derived from cached data
+
+        Args:
+            key: Data key from make_key()
+            name: Name of the derived table (e.g. 'pyramid')
+            **params: Settings and version of the derivation
+
+        Returns:
+            Hex key
+        """
+
+        blob = json.dumps({'data': key, 'name': name, **params}, sort_keys=True).encode('utf-8')
+        return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{ENTRY_SUFFIX}"
+
+    def load(self, key: str) -> Optional[Any]:
+        """
+        Load cached DataFrame (or derived table)
+
+        Args:
+            key: Key from make_key() or derive_key()
+
+        Returns:
+            DataFrame / derived object or None on cache miss
+        """
+
+        path = self._entry_path(key)
+
+        if not path.exists():
+            return None
+
+        try:
+            df = pd.read_pickle(path)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        # Mark as recently used
+        os.utime(path)
+
+        logger.info(f"Cache hit: {path.name} ({_describe(df)})")
+        return df
+
+    def store(self, key: str, df: Any):
+        """
+        Store DataFrame and evict old entries above the size cap
+
+        Args:
+            key: Key from make_key() or derive_key()
+            df: Loaded DataFrame (or derived object with len())
+        """
+
+        path = self._entry_path(key)
+        tmp_path = path.with_suffix('.tmp')
+
+        pd.to_pickle(df, tmp_path)
+        os.replace(tmp_path, path)
+
+        logger.info(f"Cached {_describe(df)}: {path.name} "
+                    f"({path.stat().st_size / 1024 / 1024:.1f} MB)")
+
+        self._evict(keep=path)
+
+    def _evict(self, keep: Optional[Path] = None):
+        """Remove least recently used entries until cache fits the cap"""
+
+        entries = []
+        for path in self.cache_dir.glob(f"*{ENTRY_SUFFIX}"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        max_size = self.max_size_mb * 1024 * 1024
+
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= max_size:
+                break
+            if path == keep:
+                continue
+
+            path.unlink(missing_ok=True)
+            total -= size
+            logger.info(f"Evicted cache entry: {path.name}")
+
+        index = self._load_stat_index()
+        pruned = self._prune_stat_index(index)
+
+        if len(pruned) != len(index):
+            self._save_stat_index(pruned)
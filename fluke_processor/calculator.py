@@ -8,61 +8,194 @@ and cross-validation checks according to specification.
 import pandas as pd
 import numpy as np
 import logging
-from typing import Dict, Optional, List
-from .config import THRESHOLDS
+from typing import Dict, Iterable, Optional, List, Mapping, Sequence, Union
+from .config import THRESHOLDS, QUANTILE_BACKEND, DEMAND_WINDOWS_S, DEMAND_TOP_N
+from .timestamps import TimestampParser, check_order, sort_order
+from .metrics import MetricsKernel, GROUPS, error_summary
+from .sketch import ErrorAccumulator, QUANTILE_BACKENDS
+from .segments import SegmentTable
+from .pyramid import AggregationPyramid, check_compliance
+from .demand import DemandEngine
+from .events import EventTable
+from .harmonics import HarmonicDecoder, HarmonicAnalyzer
 
 logger = logging.getLogger(__name__)
 
 
+def _copy_on_write() -> bool:
+    """Whether pandas copy-on-write is active (always on from pandas 3)"""
+
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+
+    return getattr(pd.options.mode, 'copy_on_write', False) is True
+
+
+def _log_compliance(result: Dict):
+    """Log compliance result of check_compliance()"""
+
+    for quantity in ['voltage', 'frequency']:
+        if f"{quantity}_status" in result:
+            logger.info(f"Compliance ({quantity}, {result['level']} means): "
+                        f"{result[f'{quantity}_in_range_percent']:.1f}% in range "
+                        f"[{result[f'{quantity}_status']}]")
+
+
+def _log_events(result: Dict):
+    """Log event counts of EventTable.summary()"""
+
+    logger.info(f"Voltage events: {result['dips']} dips, {result['swells']} swells, "
+                f"{result['interruptions']} interruptions")
+
+
+def _log_harmonics(result: Dict):
+    """Log THD and limit violations of HarmonicAnalyzer.result()"""
+
+    for phase, values in result['phases'].items():
+        logger.info(f"Harmonics ({phase}): THD p95 {values['THD_p95_percent']:.2f}%, "
+                    f"dominant H{values['dominant_harmonic']}")
+
+    if result['violations']:
+        logger.warning(f"Harmonic limits exceeded ({result['violations']}× p95 above limit): "
+                       f"H{', H'.join(map(str, result['violating_harmonics']))}")
+
+
 class Calculator:
     """
     Calculate energy, power quality metrics, and validations
     """
 
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self,
+                 data: Union[pd.DataFrame, Mapping[str, np.ndarray]],
+                 copy: bool = True,
+                 quantiles: str = QUANTILE_BACKEND):
         """
         Initialize calculator with dataframe
 
+        Derived columns (timestamp, dt, PF_calc) are added to self.df only,
+        never to the input. Input values are never modified, so with pandas
+        copy-on-write a shallow copy is as safe as a deep one.
+
         Args:
-            df: DataFrame with power quality data (must have datum and cas columns)
+            data: DataFrame with power quality data (must have datum and cas
+                  columns, or a parsed timestamp column), or a dict of
+                  equally long NumPy arrays with the same columns
+            copy: Copy the input data. False takes ownership of it (zero-copy):
+                  the caller should not use the frame/arrays afterwards.
+            quantiles: Quantile backend for p50/p95 metrics: 'exact' or
+                       'sketch' (mergeable, state kept in self.accumulators)
         """
 
-        self.df = df.copy()
+        if quantiles not in QUANTILE_BACKENDS:
+            raise ValueError(f"Unknown quantile backend '{quantiles}' "
+                             f"(choose from {', '.join(QUANTILE_BACKENDS)})")
+
+        if isinstance(data, pd.DataFrame):
+            self.df = data.copy(deep=copy and not _copy_on_write())
+        else:
+            self.df = pd.DataFrame(dict(data), copy=copy)
+
         self.results = {}
+        self.quantiles = quantiles
+        self.accumulators: Dict[str, ErrorAccumulator] = {}
+        self.segments: Optional[SegmentTable] = None
+        self.kernel: Optional[MetricsKernel] = None
+        self.pyramid: Optional[AggregationPyramid] = None
+        self.events: Optional[EventTable] = None
+        self.harmonics: Optional[HarmonicAnalyzer] = None
+
+        # Row of the input data behind every row of self.df (None = same rows)
+        self.loaded_rows = len(self.df)
+        self.source_rows: Optional[np.ndarray] = None
+
+    def _summarize(self, name: str, values) -> Dict[str, float]:
+        """
+        Mean, p50, p95 and max of an error vector with the quantile backend
+
+        Args:
+            name: Error vector name (key in self.accumulators)
+            values: Error values (Series or array, NaN skipped)
+
+        Returns:
+            Dict with mean, p50, p95, max
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+
+        if self.quantiles == 'exact':
+            return error_summary(values)
+
+        acc = ErrorAccumulator(self.quantiles).update(values)
+        self.accumulators[name] = acc
+
+        return acc.summary()
+
+    def get_quantile_state(self) -> Dict[str, Dict]:
+        """
+        Serializable state of the error accumulators ('sketch' backend)
+
+        States of several runs (chunks, files, sites) can be combined with
+        ErrorAccumulator.from_dict(...).merge(...) without the raw samples.
+
+        Returns:
+            Dict of {error vector name: JSON compatible state}
+        """
+
+        return {name: acc.to_dict() for name, acc in self.accumulators.items()}
 
     def create_timestamp(self, date_col: str = 'datum', time_col: str = 'cas'):
         """
         Create timestamp column from separate date and time columns
 
+        If the frame already has a 'timestamp' column, only invalid rows
+        are removed and rows are sorted. Rows already in time order are
+        not sorted; otherwise the order breaks are reported and the sorted
+        runs are merged.
+
         Args:
             date_col: Name of date column
             time_col: Name of time column
         """
 
-        # Try multiple date formats
-        date_formats = ['%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y']
-
-        for fmt in date_formats:
-            try:
-                self.df['timestamp'] = pd.to_datetime(
-                    self.df[date_col] + ' ' + self.df[time_col],
-                    format=fmt + ' %H:%M:%S.%f',
-                    dayfirst=True
-                )
-                break
-            except:
-                continue
+        # Parsed already during load (DataLoader parse_timestamps=True)
+        if 'timestamp' not in self.df.columns:
+            parser = TimestampParser.sniff(self.df[date_col], self.df[time_col])
+            self.df['timestamp'] = parser.parse(self.df[date_col], self.df[time_col])
 
         # Remove rows with invalid timestamps
         initial_count = len(self.df)
-        self.df = self.df[self.df['timestamp'].notna()]
+        valid = self.df['timestamp'].notna()
+
+        if not valid.all():
+            self.df = self.df[valid]
+            self.df.index = pd.RangeIndex(len(self.df))
+            self.source_rows = np.flatnonzero(valid.to_numpy())
+
         removed = initial_count - len(self.df)
 
         if removed > 0:
             logger.warning(f"Removed {removed} rows with invalid timestamps")
 
-        # Sort by timestamp
-        self.df = self.df.sort_values('timestamp').reset_index(drop=True)
+        # Sort by timestamp only if order breaks (exports are nearly always ordered)
+        ts_ns = self.df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        order = check_order(ts_ns)
+        self.results['timestamp_order'] = order
+
+        if not order['monotonic']:
+            for b in order['breaks']:
+                logger.warning(f"Time order breaks at row {b['row']:,}: "
+                               f"{b['before']} → {b['after']} ({b['jump_s']:+.0f} s)")
+
+            logger.warning(f"Merging {order['sorted_runs']} sorted runs "
+                           f"({order['order_breaks']} order breaks)")
+
+            order = sort_order(ts_ns)
+            self.df = self.df.take(order)
+            self.df.index = pd.RangeIndex(len(self.df))
+            self.source_rows = order if self.source_rows is None else self.source_rows[order]
+
+        elif not self.df.index.equals(pd.RangeIndex(len(self.df))):
+            self.df.index = pd.RangeIndex(len(self.df))
 
         logger.info(f"Created timestamp column, {len(self.df):,} valid rows")
 
@@ -70,15 +203,20 @@ class Calculator:
         """
         Analyze sampling interval (Δt)
 
+        Builds the segment table (self.segments) that energy integration,
+        gap reporting and plotting reuse.
+
         Returns:
             Dict with dt_mode, dt_histogram, mixed_sampling flag
         """
 
-        # Calculate Δt
-        self.df['dt'] = self.df['timestamp'].diff().dt.total_seconds()
+        # Segment table of Δt runs, built once
+        ts_ns = self.df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        self.segments = SegmentTable.from_timestamps(ts_ns)
+        self.df['dt'] = self.segments.row_dt_s()
 
         # Get histogram
-        dt_counts = self.df['dt'].value_counts().head(10)
+        dt_counts = self.segments.interval_counts().head(10)
 
         # Dominant Δt (mode)
         dt_mode = dt_counts.index[0] if len(dt_counts) > 0 else 60.0
@@ -103,18 +241,27 @@ class Calculator:
         }
 
         self.results['sampling'] = result
+        self.results['segments'] = self.segments.quality()
 
         if mixed_sampling:
             logger.warning(f"Mixed sampling detected! Dominant interval: {dominant_ratio:.1%}")
         else:
             logger.info(f"Stable sampling: {dt_mode}s ({dt_mode/60:.2f} min)")
 
+        quality = self.results['segments']
+        if quality['gaps']:
+            logger.warning(f"{quality['gaps']} gaps in recording, {quality['gap_hours']:.2f} h missing "
+                           f"(coverage {quality['coverage_percent']:.1f}%)")
+
         return result
 
     def calculate_energy(self, power_col: str = 'P_total') -> Dict:
         """
         Calculate energy from power timeseries
 
+        Every segment of the segment table is integrated with its own Δt;
+        a sample after a gap counts for the dominant Δt.
+
         Args:
             power_col: Name of power column (in Watts)
 
@@ -122,7 +269,7 @@ class Calculator:
             Dict with energy calculations
         """
 
-        if 'dt' not in self.df.columns:
+        if self.segments is None:
             raise ValueError("Must call analyze_sampling() first")
 
         if power_col not in self.df.columns:
@@ -133,7 +280,7 @@ class Calculator:
         dt_h = dt_mode / 3600  # Convert to hours
 
         # Calculate energy in kWh
-        E_kWh = self.df[power_col].sum() * dt_h / 1000
+        E_kWh = self.segments.integrate(self.df[power_col]) / 1000
 
         result = {
             'power_column': power_col,
@@ -174,17 +321,19 @@ class Calculator:
         # Relative error (with protection against zero)
         rel_err = np.abs(phase_sum - self.df[total_col]) / (np.abs(self.df[total_col]) + 1e-6)
 
+        err = self._summarize(f"balance_{total_col}", rel_err)
+
         result = {
             'available': True,
             'total_col': total_col,
             'phase_cols': phase_cols,
-            'rel_err_mean': rel_err.mean(),
-            'rel_err_p50': rel_err.quantile(0.50),
-            'rel_err_p95': rel_err.quantile(0.95),
-            'rel_err_max': rel_err.max()
+            'rel_err_mean': err['mean'],
+            'rel_err_p50': err['p50'],
+            'rel_err_p95': err['p95'],
+            'rel_err_max': err['max']
         }
 
-        logger.info(f"Power balance ({total_col}): mean={rel_err.mean():.3f}, p95={rel_err.quantile(0.95):.3f}")
+        logger.info(f"Power balance ({total_col}): mean={err['mean']:.3f}, p95={err['p95']:.3f}")
 
         return result
 
@@ -218,17 +367,17 @@ class Calculator:
 
         # Compare with measured if available
         if PF_measured_col and PF_measured_col in self.df.columns:
-            diff = np.abs(self.df[PF_measured_col] - self.df['PF_calc'])
+            diff = self._summarize('PF_diff', np.abs(self.df[PF_measured_col] - self.df['PF_calc']))
 
             result.update({
                 'PF_measured_mean': self.df[PF_measured_col].mean(),
-                'PF_diff_mean': diff.mean(),
-                'PF_diff_p50': diff.quantile(0.50),
-                'PF_diff_p95': diff.quantile(0.95),
-                'PF_diff_max': diff.max()
+                'PF_diff_mean': diff['mean'],
+                'PF_diff_p50': diff['p50'],
+                'PF_diff_p95': diff['p95'],
+                'PF_diff_max': diff['max']
             })
 
-            logger.info(f"PF difference: mean={diff.mean():.4f}, p95={diff.quantile(0.95):.4f}")
+            logger.info(f"PF difference: mean={diff['mean']:.4f}, p95={diff['p95']:.4f}")
 
         return result
 
@@ -259,16 +408,18 @@ class Calculator:
         mask = self.df[S_col] > 1
         rel_err = np.abs(self.df[S_col][mask] - S_calc[mask]) / self.df[S_col][mask]
 
+        err = self._summarize('vector_rel_err', rel_err)
+
         result = {
             'available': True,
             'samples_used': mask.sum(),
-            'rel_err_mean': rel_err.mean(),
-            'rel_err_p50': rel_err.quantile(0.50),
-            'rel_err_p95': rel_err.quantile(0.95),
-            'rel_err_max': rel_err.max()
+            'rel_err_mean': err['mean'],
+            'rel_err_p50': err['p50'],
+            'rel_err_p95': err['p95'],
+            'rel_err_max': err['max']
         }
 
-        logger.info(f"Vector validation (S²=P²+Q²): mean={rel_err.mean():.3f}, p95={rel_err.quantile(0.95):.3f}")
+        logger.info(f"Vector validation (S²=P²+Q²): mean={err['mean']:.3f}, p95={err['p95']:.3f}")
 
         return result
 
@@ -329,12 +480,14 @@ class Calculator:
         # Maximum imbalance per sample
         max_imbalance = pd.concat(imbalances, axis=1).max(axis=1)
 
+        err = self._summarize('voltage_imbalance', max_imbalance)
+
         result = {
             'available': True,
-            'imbalance_mean_percent': max_imbalance.mean(),
-            'imbalance_p50_percent': max_imbalance.quantile(0.50),
-            'imbalance_p95_percent': max_imbalance.quantile(0.95),
-            'imbalance_max_percent': max_imbalance.max()
+            'imbalance_mean_percent': err['mean'],
+            'imbalance_p50_percent': err['p50'],
+            'imbalance_p95_percent': err['p95'],
+            'imbalance_max_percent': err['max']
         }
 
         logger.info(f"Voltage imbalance: mean={result['imbalance_mean_percent']:.2f}%, "
@@ -342,6 +495,251 @@ class Calculator:
 
         return result
 
+    def compute_all(self) -> Dict:
+        """
+        Compute all available metrics in one fused pass
+
+        Same results as calling calculate_energy (total and phases),
+        calculate_pf, validate_power_balance (P and S),
+        validate_vector_power, analyze_frequency and
+        analyze_voltage_imbalance, but over one packed float matrix
+        (see metrics.MetricsKernel). Adds the PF_calc column.
+
+        Returns:
+            Dict of computed results (also merged into self.results)
+        """
+
+        kernel = self.prepare_metrics()
+
+        if kernel.has('P_total', 'S_total', 'PF_total'):
+            self.add_pf_calc()
+
+        results = {}
+        for group in GROUPS:
+            results.update(self.compute_metric(group))
+
+        return results
+
+    def prepare_metrics(self) -> MetricsKernel:
+        """
+        Pack the metric columns once (self.kernel) for compute_metric()
+
+        Returns:
+            MetricsKernel instance
+        """
+
+        if 'sampling' not in self.results:
+            self.analyze_sampling()
+
+        self.kernel = MetricsKernel(self.df)
+
+        return self.kernel
+
+    def add_pf_calc(self) -> Optional[np.ndarray]:
+        """
+        Add the calculated PF column (PF_calc = P_total / S_total)
+
+        Returns:
+            PF_calc values (None without P_total and S_total)
+        """
+
+        if self.kernel is not None:
+            pf_calc = self.kernel.pf_calc_values()
+        elif 'P_total' in self.df.columns and 'S_total' in self.df.columns:
+            P = self.df['P_total'].to_numpy(dtype=np.float64, na_value=np.nan)
+            S = self.df['S_total'].to_numpy(dtype=np.float64, na_value=np.nan)
+            pf_calc = np.clip(P / (S + 1e-6), -1, 1)
+        else:
+            pf_calc = None
+
+        if pf_calc is not None:
+            self.df['PF_calc'] = pf_calc
+
+        return pf_calc
+
+    def compute_metric(self, group: str) -> Dict:
+        """
+        Compute one metric group of the fused kernel
+
+        Args:
+            group: 'energy', 'pf', 'balance', 'vector', 'frequency'
+                   or 'imbalance' (metrics.GROUPS)
+
+        Returns:
+            Dict of computed results (also merged into self.results)
+        """
+
+        if self.kernel is None:
+            self.prepare_metrics()
+
+        dt_h = self.results['sampling']['dt_mode_s'] / 3600
+
+        results = self.kernel.compute(group, dt_h, summarize=self._summarize,
+                                      segments=self.segments)
+        self.results.update(results)
+
+        return results
+
+    def build_pyramid(self) -> AggregationPyramid:
+        """
+        Build the multi-resolution aggregation pyramid (self.pyramid)
+
+        Energy per bin uses the segment table weights, so call after
+        analyze_sampling() (and compute_all() to include PF_calc).
+
+        Returns:
+            AggregationPyramid instance
+        """
+
+        if self.segments is None:
+            self.analyze_sampling()
+
+        self.pyramid = AggregationPyramid.from_frame(self.df, self.segments)
+
+        return self.pyramid
+
+    def analyze_compliance(self) -> Dict:
+        """
+        Voltage and frequency compliance from 10-minute pyramid means
+
+        Returns:
+            Dict with in-range percentages and statuses
+        """
+
+        if self.pyramid is None:
+            self.build_pyramid()
+
+        result = check_compliance(self.pyramid)
+        self.results['compliance'] = result
+
+        _log_compliance(result)
+
+        return result
+
+    def analyze_demand(self,
+                       windows_s: Sequence[float] = DEMAND_WINDOWS_S,
+                       top_n: int = DEMAND_TOP_N) -> Dict:
+        """
+        Rolling demand of P_total and phase powers
+
+        Windows follow the segment table: samples count with their Δt
+        and windows spanning a gap are skipped.
+
+        Args:
+            windows_s: Window lengths in seconds (e.g. [900] for 15 min)
+            top_n: Number of highest non-overlapping windows to report
+
+        Returns:
+            Dict of {window label: {column: peak, daily peaks, top windows}}
+        """
+
+        if self.segments is None:
+            self.analyze_sampling()
+
+        columns = {c: self.df[c].to_numpy(dtype=np.float64, na_value=np.nan)
+                   for c in ['P_total', 'P_L1N', 'P_L2N', 'P_L3N'] if c in self.df.columns}
+
+        ts_ns = self.df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        engine = DemandEngine(ts_ns, self.segments.row_weights_h())
+
+        result = engine.analyze(columns, windows_s, top_n)
+        self.results['demand'] = result
+
+        return result
+
+    def analyze_events(self, phases: List[str] = ['L1N', 'L2N', 'L3N']) -> Dict:
+        """
+        Detect voltage dips, swells and interruptions (self.events)
+
+        Uses the per-interval minimum/maximum phase voltages (U_<phase>_min,
+        U_<phase>_max), or the mean voltages when the export has no
+        min/max columns.
+
+        Args:
+            phases: Phase names
+
+        Returns:
+            Dict with event counts and worst events
+        """
+
+        if self.segments is None:
+            self.analyze_sampling()
+
+        phases = [p for p in phases if f"U_{p}" in self.df.columns]
+
+        def column(name: str) -> np.ndarray:
+            return self.df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        u_min, u_max = {}, {}
+        for p in phases:
+            u_min[p] = column(f"U_{p}_min") if f"U_{p}_min" in self.df.columns else column(f"U_{p}")
+            u_max[p] = column(f"U_{p}_max") if f"U_{p}_max" in self.df.columns else column(f"U_{p}")
+
+        if any(f"U_{p}_min" not in self.df.columns for p in phases):
+            logger.info("Voltage min/max columns not found, events use mean voltages")
+
+        ts_ns = self.df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        self.events = EventTable.detect(ts_ns, u_min, u_max,
+                                        self.segments.row_weights_h(),
+                                        self.segments.after_gap())
+
+        result = self.events.summary()
+        self.results['events'] = result
+
+        _log_events(result)
+
+        return result
+
+    def loaded_timestamps(self) -> np.ndarray:
+        """
+        Timestamps in the row order of the input data
+
+        Returns:
+            int64 nanosecond timestamps, one per input row; NaT (int64 min)
+            for rows removed by create_timestamp()
+        """
+
+        ts_ns = self.df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+        if self.source_rows is None:
+            return ts_ns
+
+        loaded = np.full(self.loaded_rows, np.iinfo(np.int64).min, dtype=np.int64)
+        loaded[self.source_rows] = ts_ns
+
+        return loaded
+
+    def analyze_harmonics(self, blocks: Iterable[np.ndarray],
+                          decoder: HarmonicDecoder) -> Dict:
+        """
+        THD, per-harmonic levels vs limits, dominant harmonic and
+        spectrum over time (self.harmonics)
+
+        Args:
+            blocks: Harmonic cube blocks of the same rows as the loaded
+                    data (HarmonicDecoder.iter_load)
+            decoder: Decoder of the cube layout
+
+        Returns:
+            Dict with per-phase THD and dominant harmonic, limit violations
+        """
+
+        self.harmonics = HarmonicAnalyzer.from_decoder(decoder)
+        self.harmonics.consume(blocks, self.loaded_timestamps())
+
+        result = self.harmonics.result()
+
+        # Instrument THD for comparison with the recomputed one
+        for phase, values in result['phases'].items():
+            if f"THD_V_{phase}" in self.df.columns:
+                measured = self.df[f"THD_V_{phase}"].to_numpy(dtype=np.float64, na_value=np.nan)
+                values['THD_measured_p95_percent'] = self._summarize(f"THD_V_{phase}", measured)['p95']
+
+        self.results['harmonics'] = result
+        _log_harmonics(result)
+
+        return result
+
     def get_summary(self) -> Dict:
         """
         Generate comprehensive summary of all calculations
@@ -390,6 +788,19 @@ class Calculator:
             else:
                 status['PF_diff'] = 'ALERT'
 
+        # Voltage/frequency compliance (10-minute means)
+        if 'compliance' in self.results:
+            compliance = self.results['compliance']
+            for quantity in ['voltage', 'frequency']:
+                if f"{quantity}_status" in compliance:
+                    status[f"{quantity}_{compliance['level']}"] = compliance[f"{quantity}_status"]
+
+        # Harmonic limits and THD (p95)
+        if 'harmonics' in self.results:
+            harmonics = self.results['harmonics']
+            thd_alert = any(v['THD_status'] == 'ALERT' for v in harmonics['phases'].values())
+            status['harmonics'] = 'ALERT' if harmonics['violations'] or thd_alert else 'PASS'
+
         # Overall status
         if all(s == 'PASS' for s in status.values()):
             status['overall'] = 'PASS'
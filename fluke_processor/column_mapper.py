@@ -3,16 +3,24 @@ Column Mapper module for fuzzy matching of headers
 
 Handles multi-language (SK/CZ/EN) column names with diacritics,
 various spellings, and aggregation preferences.
+
+Keyword lookups go through a token → columns inverted index, and
+resolved mappings can be persisted per header fingerprint.
 """
 
 import re
+import json
+import hashlib
 import unicodedata
 import logging
-from typing import List, Optional, Dict
-from .config import COLUMN_KEYWORDS, AGG_PREFERENCE, ENCODING_INPUT
+from pathlib import Path
+from typing import Iterable, List, Optional, Dict, Set
+from .config import COLUMN_KEYWORDS, AGG_PREFERENCE, AGG_KEYWORDS, ENCODING_INPUT
 
 logger = logging.getLogger(__name__)
 
+MAPPER_VERSION = 1  # Bump when the matching/scoring logic changes (mapping cache key)
+
 
 class ColumnMapper:
     """
@@ -37,6 +45,15 @@ class ColumnMapper:
 
         self.mapping = {}
         self.normalized_columns = [self._normalize(col) for col in self.columns]
+        self.word_counts = [len(col.split()) for col in self.normalized_columns]
+
+        # Inverted index: token → column indices
+        self._token_index = {}
+        for i, norm_col in enumerate(self.normalized_columns):
+            for token in set(norm_col.split()):
+                self._token_index.setdefault(token, []).append(i)
+
+        self._keyword_cache = {}
 
     @staticmethod
     def _remove_diacritics(text: str) -> str:
@@ -76,6 +93,31 @@ class ColumnMapper:
 
         return text
 
+    def _columns_with(self, keyword: str) -> Set[int]:
+        """
+        Get indices of columns whose normalized name contains keyword
+
+        Keywords match as substrings (same as `keyword in name`). A keyword
+        without spaces can only occur inside one token, so the token
+        vocabulary is scanned instead of every column name.
+        """
+
+        cols = self._keyword_cache.get(keyword)
+        if cols is not None:
+            return cols
+
+        if not keyword or ' ' in keyword:
+            cols = {i for i, norm_col in enumerate(self.normalized_columns)
+                    if keyword in norm_col}
+        else:
+            cols = set()
+            for token, indices in self._token_index.items():
+                if keyword in token:
+                    cols.update(indices)
+
+        self._keyword_cache[keyword] = cols
+        return cols
+
     def find_column(self,
                    keywords: List[str],
                    prefer: List[str] = None,
@@ -95,18 +137,21 @@ class ColumnMapper:
         if prefer is None:
             prefer = AGG_PREFERENCE
 
-        candidates = []
+        # Check which columns match keywords
+        keyword_sets = [self._columns_with(kw) for kw in keywords]
 
-        for i, norm_col in enumerate(self.normalized_columns):
-
-            # Check if keywords match
-            if require_all:
-                matches = all(kw in norm_col for kw in keywords)
+        if require_all:
+            if keyword_sets:
+                matches = set.intersection(*keyword_sets)
             else:
-                matches = any(kw in norm_col for kw in keywords)
+                matches = range(len(self.normalized_columns))
+        else:
+            matches = set().union(*keyword_sets)
+
+        candidates = []
 
-            if not matches:
-                continue
+        for i in matches:
+            norm_col = self.normalized_columns[i]
 
             # Score by aggregation preference
             score = 0
@@ -116,25 +161,56 @@ class ColumnMapper:
                     break
 
             # Also consider word count (prefer shorter/more specific)
-            word_count = len(norm_col.split())
-
-            candidates.append((score, word_count, i, self.columns[i]))
+            candidates.append((score, self.word_counts[i], i))
 
         if not candidates:
             return None
 
-        # Sort by: score (desc), word count (asc), index (asc)
-        candidates.sort(key=lambda x: (-x[0], x[1], x[2]))
+        # Best by: score (desc), word count (asc), index (asc)
+        best = min(candidates, key=lambda x: (-x[0], x[1], x[2]))
+
+        return best[2]  # Return index
+
+    @staticmethod
+    def _agg_preference(keywords: List[str]) -> Optional[List[str]]:
+        """Preference of a spec ending with an aggregation (e.g. [..., 'max'])"""
 
-        return candidates[0][2]  # Return index
+        if keywords and keywords[-1] in AGG_KEYWORDS:
+            return [keywords[-1]]
+        return None
 
-    def auto_map(self, column_specs: Dict[str, List[str]] = None) -> Dict[str, Optional[int]]:
+    def fingerprint(self, column_specs: Dict[str, List[str]] = None) -> str:
+        """
+        Fingerprint of header + column specs + aggregation preference
+
+        Exports from the same instrument configuration share a fingerprint,
+        so their resolved mapping can be reused. MAPPER_VERSION is part of
+        the key, so persisted mappings are re-resolved when scoring changes.
+
+        Returns:
+            Hex digest
+        """
+
+        if column_specs is None:
+            column_specs = COLUMN_KEYWORDS
+
+        blob = json.dumps([MAPPER_VERSION, self.columns, column_specs, AGG_PREFERENCE, AGG_KEYWORDS],
+                          ensure_ascii=False).encode('utf-8')
+
+        return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+    def auto_map(self,
+                 column_specs: Dict[str, List[str]] = None,
+                 cache_dir: Optional[str] = None) -> Dict[str, Optional[int]]:
         """
         Automatically map all common columns
 
         Args:
             column_specs: Dict of {logical_name: [keywords]}
                          If None, uses COLUMN_KEYWORDS from config
+            cache_dir: If given, resolved mappings are stored in
+                       <cache_dir>/mappings/ per header fingerprint and
+                       reused for identical headers
 
         Returns:
             Dict of {logical_name: column_index or None}
@@ -143,11 +219,28 @@ class ColumnMapper:
         if column_specs is None:
             column_specs = COLUMN_KEYWORDS
 
-        mapping = {}
+        cache_path = None
+        mapping = None
+
+        if cache_dir is not None:
+            cache_path = (Path(cache_dir).expanduser() / 'mappings' /
+                          f"{self.fingerprint(column_specs)}.json")
+            mapping = self._load_cached_mapping(cache_path)
+
+            if mapping is not None and set(mapping) != set(column_specs):
+                mapping = None
+
+        if mapping is None:
+            mapping = {name: self.find_column(keywords, prefer=self._agg_preference(keywords))
+                       for name, keywords in column_specs.items()}
+
+            if cache_path is not None:
+                self._store_cached_mapping(cache_path, mapping)
+        else:
+            logger.info(f"Reusing column mapping for header {cache_path.stem}")
 
         for logical_name, keywords in column_specs.items():
-            idx = self.find_column(keywords)
-            mapping[logical_name] = idx
+            idx = mapping[logical_name]
 
             if idx is not None:
                 logger.debug(f"Mapped '{logical_name}' → col {idx}: {self.columns[idx]}")
@@ -157,12 +250,36 @@ class ColumnMapper:
         self.mapping = mapping
         return mapping
 
-    def get_mapped_indices(self, required: List[str] = None) -> List[int]:
+    @staticmethod
+    def _load_cached_mapping(path: Path) -> Optional[Dict[str, Optional[int]]]:
+        """Load persisted mapping, None if missing or unreadable"""
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _store_cached_mapping(path: Path, mapping: Dict[str, Optional[int]]):
+        """Persist mapping (best effort)"""
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(mapping, f)
+        except OSError as e:
+            logger.warning(f"Could not store column mapping: {e}")
+
+    def get_mapped_indices(self, required: List[str] = None,
+                           names: Optional[Iterable[str]] = None) -> List[int]:
         """
         Get list of mapped column indices
 
         Args:
             required: List of required logical column names
+            names: Only these logical columns (column projection,
+                   e.g. MetricScheduler.columns()); None = all
 
         Returns:
             List of indices (excluding None values)
@@ -173,7 +290,7 @@ class ColumnMapper:
 
         indices = []
 
-        for name, idx in self.mapping.items():
+        for name, idx in self._selected(names).items():
             if idx is not None:
                 indices.append(idx)
             elif required and name in required:
@@ -181,6 +298,34 @@ class ColumnMapper:
 
         return sorted(set(indices))
 
+    def get_projected_mapping(self, names: Optional[Iterable[str]] = None) -> Dict[str, Optional[int]]:
+        """
+        Get mapping onto a projected (narrow) file
+
+        A projected file holds only the get_mapped_indices() columns,
+        in index order (see preprocessor column projection).
+
+        Args:
+            names: Only these logical columns (same as for
+                   get_mapped_indices()); None = all
+
+        Returns:
+            Dict of {logical_name: position in projected file or None}
+        """
+
+        position = {idx: pos for pos, idx in enumerate(self.get_mapped_indices(names=names))}
+
+        return {name: position[idx] if idx is not None else None
+                for name, idx in self._selected(names).items()}
+
+    def _selected(self, names: Optional[Iterable[str]]) -> Dict[str, Optional[int]]:
+        """Mapping restricted to names (None = whole mapping)"""
+
+        if names is None:
+            return self.mapping
+
+        return {name: self.mapping.get(name) for name in names}
+
     def get_mapping_log(self) -> List[Dict[str, any]]:
         """
         Get mapping log for export/debugging
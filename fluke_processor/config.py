@@ -7,20 +7,79 @@ ENCODING_INPUT = 'cp1250'
 ENCODING_OUTPUT = 'utf-8'
 CHUNK_SIZE_DEFAULT = 20000
 FILE_SIZE_THRESHOLD_MB = 100  # Switch to chunked processing above this
+PREPROCESS_BLOCK_SIZE = 16 * 1024 * 1024  # Bytes per preprocessing block
+PREPROCESS_PREFETCH = 2  # Parallel mode: shards in flight per worker (bounds memory)
+ESTIMATE_BLOCK_SIZE = 64 * 1024 * 1024  # Bytes per block when counting lines
+
+# Date/time formats of datum and cas columns (tried in order)
+DATE_FORMATS = ['%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y']
+TIME_FORMATS = ['%H:%M:%S.%f', '%H:%M:%S']
+
+# Cache of preprocessed and parsed data
+CACHE_DIR = '~/.cache/fluke_processor'
+CACHE_MAX_SIZE_MB = 2048  # LRU eviction above this
+CACHE_STAT_INDEX_MAX = 1000  # Hashed files remembered in the stat index
+
+# Sparse time index (<file>.tidx sidecar, built during preprocessing)
+TIME_INDEX_STRIDE = 1000  # Rows between index entries
 
 # Pandas settings
 PANDAS_SETTINGS = {
     'sep': '\t',
     'decimal': ',',
-    'thousands': '',  # CRITICAL: No thousands separator!
-    'on_bad_lines': 'skip',
-    'engine': 'python'
-    # Note: low_memory not supported with python engine
+    'thousands': None,  # CRITICAL: No thousands separator!
+    'on_bad_lines': 'skip'
+}
+
+# Parser backend: 'c' (default), 'pyarrow' (multithreaded, optional
+# dependency) or 'python' (slowest, last fallback for malformed files)
+PARSER_ENGINE = 'c'
+
+# Quantile backend for p50/p95 metrics: 'exact' (keeps and partitions
+# error vectors) or 'sketch' (mergeable log-bucket sketch, ~1% error)
+QUANTILE_BACKEND = 'exact'
+
+# Sampling segments: an interval longer than SEGMENT_GAP_FACTOR × the
+# dominant Δt is a gap, unless it repeats at least SEGMENT_MIN_INTERVALS
+# times in a row (then it is a segment with a different sampling interval)
+SEGMENT_GAP_FACTOR = 1.5
+SEGMENT_MIN_INTERVALS = 3
+
+# Streaming segment statistics (SegmentStats): intervals within this
+# relative tolerance of each other count as the same Δt (timestamp
+# jitter of a few ms), and only the first SEGMENT_MAX_GAPS gaps are kept
+# with their times
+SEGMENT_DT_TOLERANCE = 0.01
+SEGMENT_MAX_GAPS = 1000
+
+# Streaming: merge the per-chunk pyramid blocks every N chunks
+STREAMING_COMPACT_CHUNKS = 20
+
+# Aggregation pyramid: level name → bin width in seconds (finest first).
+# Each level is reduced from the coarsest finer level that divides it.
+PYRAMID_LEVELS = {
+    '1min': 60,
+    '10min': 600,
+    '15min': 900,
+    '1h': 3600,
+    '1d': 86400
 }
+PYRAMID_REPORT_LEVELS = ['15min', '1d']  # Written as agg_<level> sheets
+
+# Demand: average power over a sliding window ending at every sample
+DEMAND_WINDOWS_S = [900, 3600]  # 15 min (tariff demand) and 1 h
+DEMAND_TOP_N = 10  # Highest non-overlapping windows reported
+DEMAND_MIN_COVERAGE = 0.9  # Windows with less recorded time are skipped
+
+# Metric scheduler
+METRIC_THREADS = 4  # Threads running independent metrics
 
 # Column mapping - aggregation preference
 AGG_PREFERENCE = ['priem', 'avg', 'mean', 'priemer']
 
+# Keyword lists ending with one of these select that aggregation instead
+AGG_KEYWORDS = ['min', 'max']
+
 # Column keywords for fuzzy matching
 # Each entry is a list of keywords that ALL must be present (AND logic)
 # For multi-language support, each language variant should be a separate entry
@@ -53,6 +112,14 @@ COLUMN_KEYWORDS = {
     'U_L2N': ['napatie', 'l2n'],
     'U_L3N': ['napatie', 'l3n'],
 
+    # Voltage extremes within each logging interval (events)
+    'U_L1N_min': ['napatie', 'l1n', 'min'],
+    'U_L2N_min': ['napatie', 'l2n', 'min'],
+    'U_L3N_min': ['napatie', 'l3n', 'min'],
+    'U_L1N_max': ['napatie', 'l1n', 'max'],
+    'U_L2N_max': ['napatie', 'l2n', 'max'],
+    'U_L3N_max': ['napatie', 'l3n', 'max'],
+
     # Frequency
     'F': ['frekvencia'],
 
@@ -66,6 +133,24 @@ COLUMN_KEYWORDS = {
     'THD_A_L3': ['thd', 'a', 'l3'],
 }
 
+# Harmonic block layout (normalized header names):
+# "<prefix><N> <phase> <agg>", e.g. "harmonicke kmity napatia2 l1n min"
+HARMONIC_PREFIX = 'harmonicke kmity napatia'
+HARMONIC_PHASES = ['l1n', 'l2n', 'l3n', 'ng']
+HARMONIC_AGGS = ['min', 'priem', 'max']
+
+# Harmonic analysis: levels are in % of the fundamental. Limits per
+# harmonic order (EN 50160, 95% of 10-minute means) apply to the phase
+# voltages; harmonics without an entry are reported but not checked.
+HARMONIC_LIMITS = {
+    2: 2.0, 3: 5.0, 4: 1.0, 5: 6.0, 6: 0.5, 7: 5.0, 8: 0.5, 9: 1.5,
+    10: 0.5, 11: 3.5, 12: 0.5, 13: 3.0, 14: 0.5, 15: 0.5, 16: 0.5, 17: 2.0,
+    18: 0.5, 19: 1.5, 20: 0.5, 21: 0.5, 22: 0.5, 23: 1.5, 24: 0.5, 25: 1.5
+}
+HARMONIC_THD_LIMIT = 8.0  # % of fundamental
+HARMONIC_LIMIT_PHASES = ['l1n', 'l2n', 'l3n']
+HARMONIC_SPECTRUM_S = 3600  # Bin width of the spectrum over time
+
 # Acceptance criteria thresholds
 THRESHOLDS = {
     'delta_E_percent': {
@@ -91,12 +176,42 @@ THRESHOLDS = {
     'mixed_sampling_threshold': 0.95  # Dominant Δt must be ≥95%
 }
 
+# Voltage/frequency compliance of 10-minute means (EN 50160 style):
+# at least min_percent of intervals within ±tolerance of nominal
+COMPLIANCE = {
+    'level': '10min',
+    'voltage_nominal': 230.0,
+    'voltage_tolerance_percent': 10.0,
+    'voltage_min_percent': 95.0,
+    'frequency_nominal': 50.0,
+    'frequency_tolerance_percent': 1.0,
+    'frequency_min_percent': 99.5
+}
+
+# Voltage events from the phase voltage min/max of every logging interval
+# (EN 50160 style, percent of nominal): dip below dip_percent, swell above
+# swell_percent, interruption when a dip's residual voltage is below
+# interruption_percent
+VOLTAGE_EVENTS = {
+    'nominal': 230.0,
+    'dip_percent': 90.0,
+    'swell_percent': 110.0,
+    'interruption_percent': 5.0
+}
+
 # Output settings
 OUTPUT_XLSX_SHEETS = [
     'summary',
     'validation',
     'timeseries_power',
     'data_quality',
+    'segments',
+    'agg_15min',
+    'agg_1d',
+    'demand',
+    'events',
+    'harmonics',
+    'harmonic_spectrum',
     'mapping_log'
 ]
 
@@ -108,3 +223,4 @@ OUTPUT_PNG_PLOTS = [
 # Plot settings
 PLOT_DPI = 150
 PLOT_FIGSIZE = (12, 6)
+PLOT_MAX_POINTS = 5000  # Plots use the finest pyramid level with at most this many bins
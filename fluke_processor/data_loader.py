@@ -1,34 +1,77 @@
 """
 Data Loader module for reading Fluke 435 data files
 
-Supports both single-pass and chunked processing modes.
+Supports both single-pass and chunked processing modes, and iterating
+over chunks for streaming analysis.
 Automatically selects optimal mode based on file size.
+Data can be read from a clean file or straight from a CleanStream.
+
+Parser backends: pandas C engine (default), pyarrow's multithreaded
+CSV reader, and the pandas python engine. All keep the same rows; when a
+backend fails on malformed rows the data is parsed again with the next
+one (pyarrow → C → python).
+
+Optionally the datum/cas string columns are replaced by a datetime64[ns]
+'timestamp' column while loading, chunk by chunk, so the string columns
+never exist for the whole file.
+
+for_window() seeks to a time window of a raw export (sidecar time index
+or bisection) and preprocesses and parses only that byte range.
 """
 
+import numpy as np
 import pandas as pd
 import logging
-from typing import Optional, List
+from typing import BinaryIO, Iterator, Optional, List, Sequence
 from pathlib import Path
-from .config import (PANDAS_SETTINGS, CHUNK_SIZE_DEFAULT,
+from .config import (PANDAS_SETTINGS, CHUNK_SIZE_DEFAULT, PARSER_ENGINE,
                      FILE_SIZE_THRESHOLD_MB, ENCODING_OUTPUT)
+from .timestamps import TimestampParser
+from .preprocessor import CleanStream
+from .time_index import TimeLike, locate_window
 
 logger = logging.getLogger(__name__)
 
+PARSER_ENGINES = ('c', 'pyarrow', 'python')
+
+# Engine used when parsing fails: pyarrow cannot pad short rows like
+# pandas, the C engine gives up on some malformed files
+FALLBACK_ENGINES = {'pyarrow': 'c', 'c': 'python'}
+
 
 class DataLoader:
     """
     Load Fluke 435 data with appropriate strategy (single-pass vs chunked)
     """
 
-    def __init__(self, filepath: str):
+    def __init__(self,
+                 filepath: str,
+                 stream: Optional[BinaryIO] = None,
+                 engine: str = PARSER_ENGINE):
         """
         Initialize loader
 
         Args:
-            filepath: Path to preprocessed (clean) data file
+            filepath: Path to preprocessed (clean) data file, or to the raw
+                      file when a stream is given
+            stream: Readable stream of clean UTF-8 data (e.g. CleanStream).
+                    If given, data is parsed from it instead of filepath.
+            engine: Parser backend: 'c', 'pyarrow' or 'python'
         """
 
+        if engine not in PARSER_ENGINES:
+            raise ValueError(f"Unknown parser engine '{engine}' "
+                             f"(choose from {', '.join(PARSER_ENGINES)})")
+
         self.filepath = Path(filepath)
+        self.stream = stream
+        self.engine = engine
+
+        # Sniffed on first chunk, then reused (with its caches) for all chunks
+        self.timestamp_parser = None
+
+        # (start, end) rows kept with parse_timestamps (see for_window)
+        self.window = None
 
         if not self.filepath.exists():
             raise FileNotFoundError(f"File not found: {filepath}")
@@ -36,6 +79,66 @@ class DataLoader:
         # Estimate file characteristics
         self.file_size_mb = self.filepath.stat().st_size / 1024 / 1024
 
+    @classmethod
+    def for_window(cls,
+                   filepath: str,
+                   start: Optional[TimeLike] = None,
+                   end: Optional[TimeLike] = None,
+                   columns: Optional[Sequence[int]] = None,
+                   engine: str = PARSER_ENGINE,
+                   workers: int = 1) -> 'DataLoader':
+        """
+        Loader over the rows of a time window of a raw export
+
+        The byte range of the window comes from the sidecar time index
+        (TimeIndex) or, without one, from a bisection of the file; only
+        that range is preprocessed and parsed. With parse_timestamps the
+        rows outside start <= timestamp < end are dropped.
+
+        Args:
+            filepath: Path to raw export (rows in time order)
+            start: First timestamp (None = from the beginning)
+            end: Timestamp after the window (None = to the end)
+            columns: Column indices to keep (None = all); load with
+                     ColumnMapper.get_projected_mapping() then
+            engine: Parser backend: 'c', 'pyarrow' or 'python'
+            workers: Worker processes for preprocessing
+
+        Returns:
+            DataLoader reading from a CleanStream of the window
+        """
+
+        offset_start, offset_end = locate_window(filepath, start, end)
+
+        stream = CleanStream(str(filepath), workers=workers, columns=columns,
+                             start=offset_start, end=offset_end)
+
+        loader = cls(filepath, stream=stream, engine=engine)
+        loader.window = (None if start is None else pd.Timestamp(start),
+                         None if end is None else pd.Timestamp(end))
+
+        return loader
+
+    def _in_window(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rows of df inside the window (df with 'timestamp' column)"""
+
+        start, end = self.window
+        ts = df['timestamp']
+
+        keep = ts.notna()
+        if start is not None:
+            keep &= ts >= start
+        if end is not None:
+            keep &= ts < end
+
+        return df[keep.to_numpy()]
+
+    @property
+    def source(self):
+        """Object passed to the CSV parser (stream or file path)"""
+
+        return self.stream if self.stream is not None else self.filepath
+
     def load_data(self,
                  use_cols: Optional[List[int]] = None,
                  chunk_size: Optional[int] = None,
@@ -70,55 +173,370 @@ class DataLoader:
             logger.info(f"Loading data (SINGLE-PASS mode)")
             return self._load_single_pass(use_cols)
 
-    def _load_single_pass(self, use_cols: Optional[List[int]]) -> pd.DataFrame:
-        """Load entire file in one pass"""
+    def _can_retry(self) -> bool:
+        """Whether the source can be parsed again (streams must be reopened)"""
+
+        return self.stream is None or hasattr(self.stream, 'reopen')
+
+    def _rewind(self):
+        """Start the source from the beginning for another parse"""
+
+        if self.stream is not None:
+            self.stream = self.stream.reopen()
+
+    def _read_header_names(self) -> List[str]:
+        """Read column names from the header of the clean file"""
+
+        with open(self.filepath, 'r', encoding=ENCODING_OUTPUT, errors='replace') as f:
+            return f.readline().rstrip('\r\n').split(PANDAS_SETTINGS['sep'])
+
+    def _read_pyarrow(self, use_cols: Optional[List[int]]) -> pd.DataFrame:
+        """Parse with pyarrow's multithreaded CSV reader"""
+
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        include = None
+        if use_cols is not None:
+            include = [f"f{idx}" for idx in sorted(set(use_cols))]
+
+        def on_bad_line(row):
+            # Same rows as the pandas engines: with on_bad_lines='skip' they
+            # only drop rows with too many fields, and only when all columns
+            # are read; short rows are padded with NaN. Anything else fails
+            # here and is parsed again by the fallback engine.
+            if (PANDAS_SETTINGS['on_bad_lines'] == 'skip' and use_cols is None and
+                    row.actual_columns > row.expected_columns):
+                return 'skip'
+            return 'error'
+
+        source = self.stream if self.stream is not None else str(self.filepath)
+
+        table = pa_csv.read_csv(
+            source,
+            read_options=pa_csv.ReadOptions(
+                use_threads=True,
+                skip_rows=1,
+                autogenerate_column_names=True,
+                encoding=ENCODING_OUTPUT
+            ),
+            parse_options=pa_csv.ParseOptions(
+                delimiter=PANDAS_SETTINGS['sep'],
+                invalid_row_handler=on_bad_line
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                decimal_point=PANDAS_SETTINGS['decimal'],
+                include_columns=include,
+                timestamp_parsers=[]
+            )
+        )
+
+        # Strings stay in Arrow memory instead of Python objects
+        df = table.to_pandas(types_mapper={pa.string(): pd.StringDtype('pyarrow')}.get)
+
+        # Positional names f<i> → header names (streams: col_<i>)
+        names = self._read_header_names() if self.stream is None else None
+        df.columns = [names[int(c[1:])] if names and int(c[1:]) < len(names)
+                      else f"col_{c[1:]}" for c in df.columns]
+
+        return df
 
-        df = pd.read_csv(
-            self.filepath,
+    def _read(self, engine: str, use_cols: Optional[List[int]]) -> pd.DataFrame:
+        """Parse whole source with given engine"""
+
+        if engine == 'pyarrow':
+            try:
+                return self._read_pyarrow(use_cols)
+            except ImportError:
+                logger.warning("pyarrow not installed, using pandas C engine")
+                engine = 'c'
+
+        return pd.read_csv(
+            self.source,
             encoding=ENCODING_OUTPUT,
             usecols=use_cols,
+            engine=engine,
             **PANDAS_SETTINGS
         )
 
+    def _load_single_pass(self, use_cols: Optional[List[int]]) -> pd.DataFrame:
+        """Load entire file in one pass"""
+
+        engine = self.engine
+        logger.info(f"Parser engine: {engine}")
+
+        while True:
+            try:
+                df = self._read(engine, use_cols)
+                break
+            except (pd.errors.ParserError, ValueError) as e:
+                fallback = FALLBACK_ENGINES.get(engine)
+                if fallback is None or not self._can_retry():
+                    raise
+
+                logger.warning(f"Parser '{engine}' failed ({e}), "
+                               f"retrying with '{fallback}' engine")
+                engine = fallback
+                self._rewind()
+
         logger.info(f"Loaded {len(df):,} rows, {len(df.columns)} columns")
         logger.info(f"Memory usage: {df.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MB")
 
         return df
 
-    def _load_chunked(self,
+    def _read_chunks(self,
+                     engine: str,
                      use_cols: Optional[List[int]],
                      chunk_size: int,
-                     verbose: bool) -> pd.DataFrame:
-        """Load file in chunks and concatenate"""
+                     skip: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Parse source chunk by chunk with given engine
 
-        chunks = []
-        total_rows = 0
+        Args:
+            engine: 'c' or 'python'
+            use_cols: List of column indices to load (None = all)
+            chunk_size: Rows per chunk
+            skip: Leading rows not to yield (parsed by a failed engine;
+                  all engines drop the same bad lines)
+        """
 
         reader = pd.read_csv(
-            self.filepath,
+            self.source,
             encoding=ENCODING_OUTPUT,
             usecols=use_cols,
             chunksize=chunk_size,
+            engine=engine,
             **PANDAS_SETTINGS
         )
 
-        for i, chunk in enumerate(reader, 1):
-            chunks.append(chunk)
+        with reader:
+            for chunk in reader:
+                if skip:
+                    n = min(skip, len(chunk))
+                    chunk = chunk.iloc[n:]
+                    skip -= n
+
+                    if len(chunk) == 0:
+                        continue
+
+                yield chunk
+
+    def iter_chunks(self,
+                    use_cols: Optional[List[int]] = None,
+                    chunk_size: int = CHUNK_SIZE_DEFAULT,
+                    verbose: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Yield data chunk by chunk without keeping earlier chunks
+
+        Args:
+            use_cols: List of column indices to load (None = all)
+            chunk_size: Rows per chunk
+            verbose: Print progress information
+
+        Yields:
+            DataFrame chunks with continuous index
+        """
+
+        total_rows = 0
+
+        # pyarrow reads whole tables, chunked reading uses the C engine
+        engine = 'c' if self.engine == 'pyarrow' else self.engine
+        logger.info(f"Parser engine: {engine}")
+
+        reader = self._read_chunks(engine, use_cols, chunk_size)
+
+        i = 0
+        while True:
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                break
+            except (pd.errors.ParserError, ValueError) as e:
+                fallback = FALLBACK_ENGINES.get(engine)
+                if fallback is None or not self._can_retry():
+                    raise
+
+                # Parse again from the top, the rows already yielded are skipped
+                logger.warning(f"Parser '{engine}' failed after {total_rows:,} rows ({e}), "
+                               f"retrying with '{fallback}' engine")
+                engine = fallback
+                self._rewind()
+                reader = self._read_chunks(engine, use_cols, chunk_size, skip=total_rows)
+                continue
+
+            i += 1
             total_rows += len(chunk)
 
             if verbose and i % 10 == 0:
                 logger.info(f"  Loaded chunk {i} ({total_rows:,} rows so far)")
 
-        df = pd.concat(chunks, ignore_index=True)
+            yield chunk
+
+        logger.info(f"Read {total_rows:,} rows in {i} chunks")
+
+    @staticmethod
+    def _concat_chunks(chunks: Iterator[pd.DataFrame]) -> tuple[pd.DataFrame, int]:
+        """
+        Concatenate chunks column by column
+
+        pd.concat() of a chunk list needs the chunks and the result in
+        memory at once (2x the data). Here each chunk is split into its
+        columns as it arrives and released, and every column is joined
+        and its pieces dropped before the next one, so the peak is the
+        data plus one column.
+
+        Args:
+            chunks: Chunk iterator (iter_chunks() / iter_with_mapping())
+
+        Returns:
+            Tuple of (DataFrame, number of chunks)
+        """
+
+        pieces = None
+        n_chunks = 0
+
+        for chunk in chunks:
+            if pieces is None:
+                pieces = {col: [] for col in chunk.columns}
+            for col in chunk.columns:
+                # Copy: a column view would keep the chunk's whole block alive
+                pieces[col].append(chunk[col].copy(deep=True))
+            n_chunks += 1
+            del chunk
+
+        if pieces is None:
+            raise ValueError("No chunks read")
 
-        logger.info(f"Loaded {len(df):,} rows from {len(chunks)} chunks")
+        columns = {}
+        for col in list(pieces):
+            columns[col] = pd.concat(pieces.pop(col), ignore_index=True)
+
+        return pd.DataFrame(columns, copy=False), n_chunks
+
+    def _load_chunked(self,
+                     use_cols: Optional[List[int]],
+                     chunk_size: int,
+                     verbose: bool) -> pd.DataFrame:
+        """Load file in chunks and concatenate"""
+
+        df, n_chunks = self._concat_chunks(self.iter_chunks(use_cols, chunk_size, verbose))
+
+        logger.info(f"Loaded {len(df):,} rows from {n_chunks} chunks")
         logger.info(f"Memory usage: {df.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MB")
 
         return df
 
+    @staticmethod
+    def _check_required(column_mapping: dict, required: Optional[List[str]]):
+        """Raise ValueError if a required logical column is not mapped"""
+
+        if required:
+            missing = [name for name in required
+                      if column_mapping.get(name) is None]
+            if missing:
+                raise ValueError(f"Required columns not found: {missing}")
+
+    @staticmethod
+    def _logical_names(column_mapping: dict) -> List[str]:
+        """Logical column names in the order pandas returns use_cols"""
+
+        reverse_mapping = {idx: name
+                          for name, idx in column_mapping.items()
+                          if idx is not None}
+
+        return [reverse_mapping.get(idx, f"col_{idx}")
+                for idx in sorted(reverse_mapping)]
+
+    @staticmethod
+    def _coerce_numeric(df: pd.DataFrame,
+                        text_cols: tuple = ('datum', 'cas')) -> pd.DataFrame:
+        """
+        Parse measurement columns that stayed text because of stray
+        non-numeric cells; those cells become NaN
+        """
+
+        for name in df.columns:
+            values = df[name]
+            if name in text_cols or not (pd.api.types.is_string_dtype(values) or
+                                         values.dtype == object):
+                continue
+
+            numeric = pd.to_numeric(
+                values.str.replace(PANDAS_SETTINGS['decimal'], '.', regex=False),
+                errors='coerce')
+
+            invalid = int((numeric.isna() & values.notna()).sum())
+            if invalid:
+                logger.warning(f"Column '{name}': {invalid} non-numeric values set to NaN")
+
+            df[name] = numeric.astype(np.float64)
+
+        return df
+
+    def _attach_timestamp(self,
+                          df: pd.DataFrame,
+                          date_col: str = 'datum',
+                          time_col: str = 'cas') -> pd.DataFrame:
+        """Replace date/time string columns by a datetime64[ns] 'timestamp' column"""
+
+        if len(df) == 0 and self.timestamp_parser is None:
+            # Empty window or file: nothing to sniff the format from
+            timestamp = pd.Series(dtype='datetime64[ns]', index=df.index)
+        else:
+            if self.timestamp_parser is None:
+                self.timestamp_parser = TimestampParser.sniff(df[date_col], df[time_col])
+
+            timestamp = self.timestamp_parser.parse(df[date_col], df[time_col])
+
+        df = df.drop(columns=[date_col, time_col])
+        df.insert(0, 'timestamp', timestamp)
+
+        return df
+
+    def iter_with_mapping(self,
+                          column_mapping: dict,
+                          required: List[str] = None,
+                          chunk_size: Optional[int] = None,
+                          verbose: bool = False,
+                          parse_timestamps: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Yield chunks of mapped columns renamed to logical names
+
+        Streaming counterpart of load_with_mapping(): only one chunk is
+        held in memory at a time.
+
+        Args:
+            column_mapping: Dict of {logical_name: column_index}
+            required: List of required logical column names
+            chunk_size: Rows per chunk (None = default)
+            verbose: Print progress information
+            parse_timestamps: Replace datum/cas by a 'timestamp' column
+
+        Yields:
+            DataFrame chunks with logical column names
+        """
+
+        self._check_required(column_mapping, required)
+
+        indices = [idx for idx in column_mapping.values() if idx is not None]
+        names = self._logical_names(column_mapping)
+
+        for chunk in self.iter_chunks(indices, chunk_size or CHUNK_SIZE_DEFAULT, verbose):
+            chunk.columns = names
+            chunk = self._coerce_numeric(chunk)
+
+            if parse_timestamps:
+                chunk = self._attach_timestamp(chunk)
+
+                if self.window is not None:
+                    chunk = self._in_window(chunk)
+
+            yield chunk
+
     def load_with_mapping(self,
                          column_mapping: dict,
                          required: List[str] = None,
+                         parse_timestamps: bool = False,
                          **kwargs) -> tuple[pd.DataFrame, dict]:
         """
         Load data using column mapping
@@ -126,6 +544,8 @@ class DataLoader:
         Args:
             column_mapping: Dict of {logical_name: column_index}
             required: List of required logical column names
+            parse_timestamps: Replace datum/cas string columns by a
+                              datetime64[ns] 'timestamp' column during load
             **kwargs: Additional arguments for load_data()
 
         Returns:
@@ -137,31 +557,49 @@ class DataLoader:
         indices = [idx for idx in column_mapping.values() if idx is not None]
 
         # Check required columns
-        if required:
-            missing = [name for name in required
-                      if column_mapping.get(name) is None]
-            if missing:
-                raise ValueError(f"Required columns not found: {missing}")
-
-        # Load data
-        df = self.load_data(use_cols=indices, **kwargs)
+        self._check_required(column_mapping, required)
+        if parse_timestamps:
+            self._check_required(column_mapping, ['datum', 'cas'])
 
         # Create reverse mapping for renaming
         reverse_mapping = {idx: name
                           for name, idx in column_mapping.items()
                           if idx is not None}
 
-        # Rename columns
-        # Pandas returns columns in order of use_cols, so we need to map by position
-        idx_to_position = {idx: pos for pos, idx in enumerate(sorted(indices))}
-        new_column_names = []
+        if parse_timestamps and self.engine != 'pyarrow':
+            # pandas engines: strings are converted chunk by chunk
+            chunk_size = kwargs.get('chunk_size') or CHUNK_SIZE_DEFAULT
+            logger.info(f"Loading data (CHUNKED mode with timestamp parsing, "
+                        f"chunk_size={chunk_size:,})")
 
-        for idx in sorted(indices):
-            logical_name = reverse_mapping.get(idx, f"col_{idx}")
-            new_column_names.append(logical_name)
+            df, _ = self._concat_chunks(self.iter_with_mapping(column_mapping,
+                                                               chunk_size=chunk_size,
+                                                               verbose=kwargs.get('verbose', False),
+                                                               parse_timestamps=True))
 
+            dates = self.timestamp_parser.cache_info()[0] if self.timestamp_parser else 0
+            logger.info(f"Loaded {len(df):,} rows from chunks, "
+                        f"timestamps parsed ({dates} distinct dates)")
+            logger.info(f"Memory usage: {df.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MB")
+
+            return df, reverse_mapping
+
+        # Load data
+        df = self.load_data(use_cols=indices, **kwargs)
+
+        # Rename columns
+        # Pandas returns columns in order of use_cols, so we need to map by position
+        new_column_names = self._logical_names(column_mapping)
         df.columns = new_column_names
+        df = self._coerce_numeric(df)
 
         logger.info(f"Renamed {len(new_column_names)} columns to logical names")
 
+        if parse_timestamps:
+            # pyarrow: strings are Arrow-backed, converted in one go
+            df = self._attach_timestamp(df)
+
+            if self.window is not None:
+                df = self._in_window(df).reset_index(drop=True)
+
         return df, reverse_mapping
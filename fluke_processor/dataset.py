@@ -0,0 +1,272 @@
+"""
+Dataset module with a lazy query API
+
+FlukeDataset describes a query on a raw export without reading it:
+select() picks logical columns, between() a time range and resample()
+a bin width. Nothing is read until compute() (or iter_chunks()), which
+pushes the query down:
+
+- Column projection into preprocessing and parsing (only the selected
+  fields are cleaned and parsed)
+- The time range into byte offsets of the raw file (sidecar time
+  index or bisection, DataLoader.for_window), so only the lines of the
+  range are read; rows are filtered exactly after parsing
+- Resampling into chunk-wise pyramid aggregation (count/sum/min/max per
+  bin), so the raw rows of the range are never held together
+
+Rows are expected in time order (as exported by the instrument).
+
+Example:
+    ds = FlukeDataset('export.txt')
+    week = ds.select('P_total').between('2025-10-01', '2025-10-08').compute()
+"""
+
+import copy
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from .config import CHUNK_SIZE_DEFAULT, PARSER_ENGINE
+from .column_mapper import ColumnMapper
+from .data_loader import DataLoader
+from .time_index import TimeLike, locate_window
+from .segments import SegmentStats
+from .pyramid import AggregationPyramid
+
+logger = logging.getLogger(__name__)
+
+TIME_COLUMNS = ['datum', 'cas']
+
+
+class FlukeDataset:
+    """
+    Lazy query on a raw Fluke 435 export (every query method returns a
+    new dataset, the file is read by compute())
+    """
+
+    def __init__(self,
+                 filepath: str,
+                 cache_dir: Optional[str] = None,
+                 parser: str = PARSER_ENGINE,
+                 workers: int = 1,
+                 chunk_size: int = CHUNK_SIZE_DEFAULT):
+        """
+        Open dataset (reads the header and maps the columns only)
+
+        Args:
+            filepath: Path to raw Fluke export (TSV, CP1250)
+            cache_dir: Directory for persisted column mappings (None = off)
+            parser: CSV parser backend: 'c', 'pyarrow' or 'python'
+            workers: Worker processes for preprocessing
+            chunk_size: Rows per parsed chunk
+
+        Raises:
+            FileNotFoundError if the file does not exist
+            ValueError if the date/time columns are not found
+        """
+
+        self.filepath = Path(filepath)
+
+        if not self.filepath.exists():
+            raise FileNotFoundError(f"File not found: {filepath}")
+
+        self.parser = parser
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+        self.mapper = ColumnMapper.from_file(str(self.filepath))
+        self.mapping = self.mapper.auto_map(cache_dir=cache_dir)
+
+        missing = [name for name in TIME_COLUMNS if self.mapping.get(name) is None]
+        if missing:
+            raise ValueError(f"Critical columns not found: {missing}")
+
+        # Query (set by select/between/resample on copies)
+        self.names: Optional[List[str]] = None
+        self.start: Optional[pd.Timestamp] = None
+        self.end: Optional[pd.Timestamp] = None
+        self.rule: Optional[str] = None
+        self.width_s: Optional[int] = None
+
+    @property
+    def available(self) -> List[str]:
+        """Mapped logical columns (without date and time)"""
+
+        return [name for name, idx in self.mapping.items()
+                if idx is not None and name not in TIME_COLUMNS]
+
+    @property
+    def columns(self) -> List[str]:
+        """Selected logical columns (all mapped columns if none selected)"""
+
+        return self.available if self.names is None else list(self.names)
+
+    def __repr__(self) -> str:
+        return (f"FlukeDataset({self.filepath.name}, columns={len(self.columns)}, "
+                f"between=({self.start}, {self.end}), resample={self.rule})")
+
+    def _derive(self, **query) -> 'FlukeDataset':
+        """Copy of this dataset with changed query attributes"""
+
+        dataset = copy.copy(self)
+        dataset.__dict__.update(query)
+
+        return dataset
+
+    def select(self, *names: str) -> 'FlukeDataset':
+        """
+        Restrict to logical columns (e.g. 'P_total', 'U_L1N')
+
+        Args:
+            *names: Logical column names (or one list of names)
+
+        Returns:
+            New dataset
+
+        Raises:
+            ValueError for columns that are not mapped (or not selected
+            by an earlier select())
+        """
+
+        if len(names) == 1 and not isinstance(names[0], str):
+            names = tuple(names[0])
+
+        unknown = [name for name in names if name not in self.columns]
+        if unknown:
+            raise ValueError(f"Columns not available: {', '.join(unknown)} "
+                             f"(choose from {', '.join(self.columns)})")
+
+        return self._derive(names=list(dict.fromkeys(names)))
+
+    def between(self,
+                start: Optional[TimeLike] = None,
+                end: Optional[TimeLike] = None) -> 'FlukeDataset':
+        """
+        Restrict to rows with start <= timestamp < end
+
+        Repeated calls narrow the range.
+
+        Args:
+            start: First timestamp (None = from the beginning)
+            end: Timestamp after the range (None = to the end)
+
+        Returns:
+            New dataset
+        """
+
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+
+        if self.start is not None:
+            start = self.start if start is None else max(start, self.start)
+        if self.end is not None:
+            end = self.end if end is None else min(end, self.end)
+
+        return self._derive(start=start, end=end)
+
+    def resample(self, rule: str = '15min') -> 'FlukeDataset':
+        """
+        Aggregate rows into time bins (same statistics as the pyramid
+        sheets: samples, <col>_mean/_min/_max, E_<col>_kWh)
+
+        Args:
+            rule: Bin width as a pandas timedelta string (e.g. '10min', '1h')
+
+        Returns:
+            New dataset
+
+        Raises:
+            ValueError if the width is not a positive whole number of seconds
+        """
+
+        width_s = pd.Timedelta(rule).total_seconds()
+
+        if width_s <= 0 or width_s != int(width_s):
+            raise ValueError(f"Resample width must be whole seconds, got '{rule}'")
+
+        return self._derive(rule=rule, width_s=int(width_s))
+
+    def byte_range(self) -> Tuple[int, Optional[int]]:
+        """
+        Byte range of the time range in the raw file (sidecar time index
+        or bisection, see time_index.locate_window)
+
+        Returns:
+            Tuple of (start offset, end offset or None for end of file)
+        """
+
+        return locate_window(str(self.filepath), self.start, self.end)
+
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        """
+        Yield the query rows chunk by chunk (before resampling)
+
+        Yields:
+            DataFrame chunks with timestamp and the selected columns
+        """
+
+        names = TIME_COLUMNS + self.columns
+        logger.info(f"Query: {len(self.columns)} of {len(self.available)} columns, "
+                    f"from {self.start or 'start'} to {self.end or 'end'}")
+
+        loader = DataLoader.for_window(str(self.filepath), self.start, self.end,
+                                       columns=self.mapper.get_mapped_indices(names=names),
+                                       engine=self.parser,
+                                       workers=self.workers)
+        chunks = loader.iter_with_mapping(
+            self.mapper.get_projected_mapping(names=names),
+            required=TIME_COLUMNS,
+            chunk_size=self.chunk_size,
+            parse_timestamps=True
+        )
+
+        try:
+            for chunk in chunks:
+                if len(chunk):
+                    yield chunk[['timestamp'] + self.columns]
+        finally:
+            loader.stream.close()
+
+    def compute(self) -> pd.DataFrame:
+        """
+        Run the query
+
+        Returns:
+            DataFrame with timestamp and the selected columns, or with
+            resample() the aggregates per bin indexed by bin start
+        """
+
+        if self.width_s is None:
+            chunks = list(self.iter_chunks())
+
+            if not chunks:
+                return pd.DataFrame({'timestamp': pd.Series(dtype='datetime64[ns]'),
+                                     **{name: pd.Series(dtype=np.float64) for name in self.columns}})
+
+            df = pd.concat(chunks, ignore_index=True)
+            logger.info(f"Query returned {len(df):,} rows")
+
+            return df
+
+        # Finest-level blocks per chunk, merged by build()
+        pyramid = AggregationPyramid({self.rule: self.width_s})
+        segments = SegmentStats()
+        blocks = []
+
+        for chunk in self.iter_chunks():
+            ts = chunk['timestamp']
+            chunk = chunk[ts.notna().to_numpy()]
+
+            if len(chunk) == 0:
+                continue
+
+            ts_ns = chunk['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            segments.update(ts_ns)
+
+            blocks.append(pyramid.aggregate(ts_ns, pyramid.frame_columns(chunk), segments))
+
+        if not blocks:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='timestamp'))
+
+        return pyramid.build(*blocks).frame(self.rule)
@@ -0,0 +1,247 @@
+"""
+Demand module with the rolling-window demand engine
+
+Demand is the average power over a sliding window (e.g. 15 minutes)
+ending at every sample. It comes from cumulative sums of energy and of
+recorded time along the timestamp axis: the demand of any window is a
+difference of two cumulative values, so the cost is O(n) regardless of
+the window length. Samples carry the Δt weights of the segment table,
+and windows with too little recorded time (gaps, start of the
+measurement) are skipped.
+
+Per window length and power column the engine reports the peak demand,
+daily peaks and the N highest non-overlapping demand windows.
+"""
+
+import math
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Mapping, Sequence, Tuple
+from .config import DEMAND_MIN_COVERAGE, DEMAND_TOP_N
+
+logger = logging.getLogger(__name__)
+
+DAY_NS = 86400 * 10**9
+
+
+def window_label(window_s: float) -> str:
+    """Short name of a window length, e.g. 900 → '15min', 3600 → '1h'"""
+
+    if window_s % 3600 == 0:
+        return f"{int(window_s // 3600)}h"
+    if window_s % 60 == 0:
+        return f"{int(window_s // 60)}min"
+    return f"{window_s:g}s"
+
+
+class DemandEngine:
+    """
+    Rolling demand over one timestamp axis, for any number of windows
+    and power columns
+    """
+
+    def __init__(self, ts_ns: np.ndarray, weights_h: np.ndarray):
+        """
+        Initialize engine
+
+        Args:
+            ts_ns: int64 nanosecond timestamps in time order
+            weights_h: Hours represented by every row
+                       (SegmentTable.row_weights_h())
+        """
+
+        self.ts_ns = ts_ns
+        self.weights_h = weights_h
+        self._window_start: Dict[float, np.ndarray] = {}
+
+    def window_start(self, window_s: float) -> np.ndarray:
+        """
+        Number of rows before the window ending at every row
+
+        Row j is inside the window of row i when ts[j] > ts[i] - window.
+        The window starts ts - window form a second sorted run; a stable
+        sort (timsort) merges the two runs in linear time and the merged
+        rank gives the count of timestamps ≤ every window start.
+
+        Args:
+            window_s: Window length in seconds
+
+        Returns:
+            int64 array; rows start[i] .. i form the window of row i
+        """
+
+        if window_s not in self._window_start:
+            n = len(self.ts_ns)
+            window_starts = self.ts_ns - int(window_s * 1e9)
+
+            merged = np.argsort(np.concatenate((self.ts_ns, window_starts)), kind='stable')
+            rank = np.empty(2 * n, dtype=np.int64)
+            rank[merged] = np.arange(2 * n)
+
+            self._window_start[window_s] = rank[n:] - np.arange(n)
+
+        return self._window_start[window_s]
+
+    def cumulative(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cumulative energy (Wh) and recorded time (h), with a leading 0
+
+        Args:
+            values: Power per row in W (NaN = not recorded)
+
+        Returns:
+            (cum_energy, cum_time), n + 1 values each
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        weights = np.where(valid, self.weights_h, 0.0)
+
+        cum_energy = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0) * weights)))
+        cum_time = np.concatenate(([0.0], np.cumsum(weights)))
+
+        return cum_energy, cum_time
+
+    def demand(self, values, window_s: float) -> np.ndarray:
+        """
+        Rolling demand ending at every row
+
+        Args:
+            values: Power per row in W (NaN = not recorded), or its
+                    cumulative() result to reuse for several windows
+            window_s: Window length in seconds
+
+        Returns:
+            Demand in kW per row (energy / recorded time of the window),
+            NaN where less than DEMAND_MIN_COVERAGE of the window is recorded
+        """
+
+        cum_energy, cum_time = values if isinstance(values, tuple) else self.cumulative(values)
+
+        start = self.window_start(window_s)
+        end = np.arange(1, len(cum_energy))
+
+        energy_Wh = cum_energy[end] - cum_energy[start]
+        recorded_h = cum_time[end] - cum_time[start]
+
+        complete = recorded_h >= window_s / 3600 * DEMAND_MIN_COVERAGE
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(complete, energy_Wh / recorded_h / 1000, np.nan)
+
+    def daily_peaks(self, demand: np.ndarray) -> List[Dict]:
+        """
+        Highest demand of every day (by window end)
+
+        Returns:
+            List of {date, demand_kW, end} for days with a valid window
+        """
+
+        valid = np.flatnonzero(~np.isnan(demand))
+        if len(valid) == 0:
+            return []
+
+        days = self.ts_ns[valid] // DAY_NS
+        starts = np.flatnonzero(np.diff(days, prepend=days[0] - 1))
+
+        peaks = np.maximum.reduceat(demand[valid], starts)
+
+        # First row of each day reaching its peak
+        at_peak = demand[valid] == np.repeat(peaks, np.diff(starts, append=len(valid)))
+        day_of_hit = np.searchsorted(starts, np.flatnonzero(at_peak), side='right') - 1
+        _, first = np.unique(day_of_hit, return_index=True)
+        peak_rows = valid[np.flatnonzero(at_peak)[first]]
+
+        return [{
+            'date': pd.Timestamp(int(day) * DAY_NS),
+            'demand_kW': float(peak),
+            'end': pd.Timestamp(int(self.ts_ns[row]))
+        } for day, peak, row in zip(days[starts], peaks, peak_rows)]
+
+    def top_windows(self, demand: np.ndarray, window_s: float,
+                    top_n: int = DEMAND_TOP_N) -> List[Dict]:
+        """
+        N highest demand windows that do not overlap
+
+        Picks the highest window, masks every window overlapping it and
+        repeats: N vectorized passes, no loop over windows.
+
+        Returns:
+            List of {rank, start, end, demand_kW}, highest first
+        """
+
+        window_ns = int(window_s * 1e9)
+        remaining = np.where(np.isnan(demand), -np.inf, demand)
+        result = []
+
+        for rank in range(1, top_n + 1):
+            row = int(np.argmax(remaining))
+            if not np.isfinite(remaining[row]):
+                break
+
+            end = int(self.ts_ns[row])
+            result.append({
+                'rank': rank,
+                'start': pd.Timestamp(end - window_ns),
+                'end': pd.Timestamp(end),
+                'demand_kW': float(remaining[row])
+            })
+
+            # Windows ending within one window length overlap this one
+            lo = np.searchsorted(self.ts_ns, end - window_ns, side='right')
+            hi = np.searchsorted(self.ts_ns, end + window_ns, side='left')
+            remaining[lo:hi] = -np.inf
+
+        return result
+
+    def analyze(self,
+                columns: Mapping[str, np.ndarray],
+                windows_s: Sequence[float],
+                top_n: int = DEMAND_TOP_N) -> Dict:
+        """
+        Peak, daily peak and top-N demand for several windows and columns
+
+        Args:
+            columns: Dict of {power column: values per row in W}
+            windows_s: Window lengths in seconds
+            top_n: Number of highest non-overlapping windows
+
+        Returns:
+            Dict of {window label: {column: result}} with window_s,
+            max_kW, max_at, mean_kW, windows, daily_peaks and top
+        """
+
+        results = {window_label(w): {} for w in windows_s}
+
+        for name, values in columns.items():
+            cumulative = self.cumulative(values)
+
+            for window_s in windows_s:
+                label = window_label(window_s)
+                demand = self.demand(cumulative, window_s)
+                n_valid = int((~np.isnan(demand)).sum())
+
+                if n_valid == 0:
+                    logger.warning(f"Demand {label} ({name}): no window with enough recorded time")
+                    results[label][name] = {'window_s': window_s, 'windows': 0,
+                                            'max_kW': math.nan, 'max_at': None,
+                                            'mean_kW': math.nan, 'daily_peaks': [], 'top': []}
+                    continue
+
+                peak_row = int(np.nanargmax(demand))
+
+                results[label][name] = {
+                    'window_s': window_s,
+                    'windows': n_valid,
+                    'max_kW': float(demand[peak_row]),
+                    'max_at': pd.Timestamp(int(self.ts_ns[peak_row])),
+                    'mean_kW': float(np.nanmean(demand)),
+                    'daily_peaks': self.daily_peaks(demand),
+                    'top': self.top_windows(demand, window_s, top_n)
+                }
+
+                logger.info(f"Demand {label} ({name}): peak {demand[peak_row]:.2f} kW "
+                            f"at {results[label][name]['max_at']}")
+
+        return results
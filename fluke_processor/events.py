@@ -0,0 +1,257 @@
+"""
+Events module with the vectorized voltage event detector
+
+Thresholds the phase voltage min/max of every logging interval for all
+phases at once: one (n, 2 × phases) boolean matrix, a column per phase
+for dips (min below the dip threshold) and one per phase for swells (max
+above the swell threshold). Run-length encoding of the matrix columns
+turns consecutive flagged samples into events; a dip whose residual
+voltage falls below the interruption threshold is an interruption.
+
+Events are kept as compact arrays (column, start/end row and time,
+duration, extreme voltage). Runs are split at gaps in the recording.
+The logging interval only tells that the extreme occurred somewhere
+within it, so the duration (recorded time of the flagged intervals) is
+an upper bound of the real event duration.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Mapping, Optional
+from .config import VOLTAGE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# Per-event arrays of EventTable
+FIELDS = {
+    'column': np.int16,      # Mask column: phase (dips) or phases + phase (swells)
+    'start_row': np.int64,   # First flagged row
+    'end_row': np.int64,     # Row after the last flagged row
+    'start_ns': np.int64,    # Timestamp of first flagged row
+    'end_ns': np.int64,      # Timestamp of last flagged row
+    'duration_s': np.float64,
+    'extreme_V': np.float64  # Residual (dips) or peak (swells) voltage
+}
+
+
+def _reduce_runs(ufunc: np.ufunc, values: np.ndarray,
+                 start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """
+    Reduce values[start[i]:end[i]] for sorted, non-overlapping runs
+
+    One reduceat over interleaved (start, end) indices; the reductions
+    between runs are dropped.
+    """
+
+    if len(start) == 0:
+        return np.empty(0, dtype=values.dtype)
+
+    idx = np.column_stack((start, end)).ravel()
+    if idx[-1] == len(values):
+        idx = idx[:-1]  # Last run reaches the end of the array
+
+    return ufunc.reduceat(values, idx)[::2]
+
+
+class EventTable:
+    """
+    Voltage dips, swells and interruptions as compact per-event arrays
+    """
+
+    def __init__(self, phases: List[str], nominal: float = VOLTAGE_EVENTS['nominal']):
+        """
+        Initialize empty table
+
+        Args:
+            phases: Phase names (e.g. ['L1N', 'L2N', 'L3N'])
+            nominal: Nominal voltage in V
+        """
+
+        self.phases = list(phases)
+        self.nominal = nominal
+        self.n_rows = 0
+
+        for name, dtype in FIELDS.items():
+            setattr(self, name, np.empty(0, dtype=dtype))
+
+    @classmethod
+    def detect(cls,
+               ts_ns: np.ndarray,
+               u_min: Mapping[str, np.ndarray],
+               u_max: Mapping[str, np.ndarray],
+               weights_h: np.ndarray,
+               after_gap: Optional[np.ndarray] = None,
+               nominal: float = VOLTAGE_EVENTS['nominal']) -> 'EventTable':
+        """
+        Detect events in one block of rows
+
+        Args:
+            ts_ns: int64 nanosecond timestamps in time order
+            u_min: Dict of {phase: minimum voltage per row}
+            u_max: Dict of {phase: maximum voltage per row} (same phases)
+            weights_h: Hours represented by every row
+                       (SegmentTable.row_weights_h())
+            after_gap: Boolean per row, True for rows that follow a gap
+            nominal: Nominal voltage in V
+
+        Returns:
+            EventTable instance
+        """
+
+        phases = list(u_min)
+        table = cls(phases, nominal)
+        n = len(ts_ns)
+        k = len(phases)
+        table.n_rows = n
+
+        if n == 0 or k == 0:
+            return table
+
+        # Columns of the F-ordered matrix are contiguous (one per phase and kind)
+        values = [np.asarray(u_min[p], dtype=np.float64) for p in phases] + \
+                 [np.asarray(u_max[p], dtype=np.float64) for p in phases]
+
+        mask = np.empty((n, 2 * k), dtype=bool, order='F')
+        for j in range(k):
+            np.less(values[j], nominal * VOLTAGE_EVENTS['dip_percent'] / 100, out=mask[:, j])
+            np.greater(values[k + j], nominal * VOLTAGE_EVENTS['swell_percent'] / 100,
+                       out=mask[:, k + j])
+
+        # Run-length encoding: first and last flagged row of every run
+        first = mask.copy(order='F')
+        first[1:] &= ~mask[:-1]
+        last = mask.copy(order='F')
+        last[:-1] &= ~mask[1:]
+
+        if after_gap is not None and after_gap.any():
+            rows = np.flatnonzero(after_gap)
+            first[rows] = mask[rows]
+            rows = rows[rows > 0] - 1
+            last[rows] = mask[rows]
+
+        # Transposed F-order matrix is C-contiguous: runs come column by column
+        column, start = np.divmod(np.flatnonzero(first.T), n)
+        end = np.flatnonzero(last.T) % n + 1
+
+        extreme = np.empty(len(start))
+        duration_h = np.empty(len(start))
+        bounds = np.searchsorted(column, np.arange(2 * k + 1))
+
+        for j in range(2 * k):
+            runs = slice(bounds[j], bounds[j + 1])
+            reducer = np.fmin if j < k else np.fmax
+            extreme[runs] = _reduce_runs(reducer, values[j], start[runs], end[runs])
+            duration_h[runs] = _reduce_runs(np.add, weights_h, start[runs], end[runs])
+
+        table.column = column.astype(np.int16)
+        table.start_row = start.astype(np.int64)
+        table.end_row = end.astype(np.int64)
+        table.start_ns = ts_ns[start]
+        table.end_ns = ts_ns[end - 1]
+        table.duration_s = duration_h * 3600
+        table.extreme_V = extreme
+
+        return table
+
+    def __len__(self) -> int:
+        return len(self.start_row)
+
+    def append(self, other: 'EventTable', continues: bool = True) -> 'EventTable':
+        """
+        Append the events of the following rows (next chunk)
+
+        Events open at the end of this table and at the start of other
+        (same phase and kind) are merged into one.
+
+        Args:
+            other: Table of the next block of rows
+            continues: False if the first row of other follows a gap
+
+        Returns:
+            self
+        """
+
+        keep = np.ones(len(other), dtype=bool)
+
+        if continues and len(self) and len(other):
+            open_rows = np.flatnonzero(self.end_row == self.n_rows)
+            open_columns = {int(self.column[i]): i for i in open_rows}
+
+            for j in np.flatnonzero(other.start_row == 0):
+                i = open_columns.get(int(other.column[j]))
+                if i is None:
+                    continue
+
+                reducer = np.fmin if self.column[i] < len(self.phases) else np.fmax
+                self.end_row[i] = other.end_row[j] + self.n_rows
+                self.end_ns[i] = other.end_ns[j]
+                self.duration_s[i] += other.duration_s[j]
+                self.extreme_V[i] = reducer(self.extreme_V[i], other.extreme_V[j])
+                keep[j] = False
+
+        for name in FIELDS:
+            values = getattr(other, name)[keep]
+            if name in ('start_row', 'end_row'):
+                values = values + self.n_rows
+            setattr(self, name, np.concatenate((getattr(self, name), values)))
+
+        self.n_rows += other.n_rows
+
+        return self
+
+    def kinds(self) -> np.ndarray:
+        """Event kind per event: 'dip', 'swell' or 'interruption'"""
+
+        k = len(self.phases)
+        interruption = self.extreme_V < self.nominal * VOLTAGE_EVENTS['interruption_percent'] / 100
+
+        return np.where(self.column >= k, 'swell',
+                        np.where(interruption, 'interruption', 'dip'))
+
+    def summary(self) -> Dict:
+        """
+        Event counts and worst events
+
+        Returns:
+            Dict with dips, swells, interruptions counts, lowest residual
+            and highest swell voltage, longest event duration
+        """
+
+        kinds = self.kinds()
+        low = kinds != 'swell'
+        high = ~low
+
+        return {
+            'dips': int((kinds == 'dip').sum()),
+            'swells': int(high.sum()),
+            'interruptions': int((kinds == 'interruption').sum()),
+            'min_residual_V': float(self.extreme_V[low].min()) if low.any() else np.nan,
+            'max_swell_V': float(self.extreme_V[high].max()) if high.any() else np.nan,
+            'longest_event_s': float(self.duration_s.max()) if len(self) else 0.0
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Table as a DataFrame
+
+        Returns:
+            DataFrame with kind, phase, start, end (timestamps of first and
+            last flagged row), duration_s, extreme_V, percent of nominal
+            and samples, one row per event in time order
+        """
+
+        k = len(self.phases)
+
+        df = pd.DataFrame({
+            'kind': self.kinds(),
+            'phase': np.array(self.phases, dtype=object)[self.column % k] if k else [],
+            'start': self.start_ns.view('datetime64[ns]'),
+            'end': self.end_ns.view('datetime64[ns]'),
+            'duration_s': self.duration_s,
+            'extreme_V': self.extreme_V,
+            'percent_of_nominal': self.extreme_V / self.nominal * 100,
+            'samples': self.end_row - self.start_row
+        })
+
+        return df.sort_values(['start', 'phase'], kind='stable', ignore_index=True)
@@ -4,6 +4,7 @@ Exporter module for generating XLSX reports and PNG plots
 Creates comprehensive reports with multiple sheets and visualizations.
 """
 
+import numpy as np
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
@@ -12,7 +13,11 @@ import matplotlib.dates as mdates
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional
-from .config import PLOT_DPI, PLOT_FIGSIZE
+from .config import PLOT_DPI, PLOT_FIGSIZE, PLOT_MAX_POINTS, PYRAMID_REPORT_LEVELS
+from .segments import SegmentTable
+from .events import EventTable
+from .harmonics import HarmonicAnalyzer
+from .pyramid import AggregationPyramid
 
 logger = logging.getLogger(__name__)
 
@@ -36,18 +41,27 @@ class Exporter:
         logger.info(f"Output directory: {self.output_dir}")
 
     def export_xlsx(self,
-                   df: pd.DataFrame,
+                   df: Optional[pd.DataFrame],
                    summary: Dict,
                    mapping_log: List[Dict],
-                   filename: str = 'fluke_analysis.xlsx'):
+                   filename: str = 'fluke_analysis.xlsx',
+                   segments: Optional[SegmentTable] = None,
+                   pyramid: Optional[AggregationPyramid] = None,
+                   events: Optional[EventTable] = None,
+                   harmonics: Optional[HarmonicAnalyzer] = None):
         """
         Export comprehensive XLSX report with multiple sheets
 
         Args:
-            df: Main dataframe with timeseries
+            df: Main dataframe with timeseries (None = no timeseries sheet,
+                e.g. in streaming mode)
             summary: Summary dict from Calculator
             mapping_log: Column mapping log
             filename: Output filename
+            segments: Segment table (None = no segments sheet)
+            pyramid: Aggregation pyramid (None = no agg_<level> sheets)
+            events: Voltage event table (None = no events sheet)
+            harmonics: Harmonic analyzer (None = no harmonic sheets)
         """
 
         filepath = self.output_dir / filename
@@ -61,12 +75,33 @@ class Exporter:
             self._write_validation_sheet(writer, summary)
 
             # Sheet 3: Timeseries (power)
-            self._write_timeseries_sheet(writer, df)
+            if df is not None:
+                self._write_timeseries_sheet(writer, df)
 
             # Sheet 4: Data quality
             self._write_data_quality_sheet(writer, summary)
 
-            # Sheet 5: Mapping log
+            # Sheet 5: Sampling segments and gaps
+            if segments is not None:
+                self._write_segments_sheet(writer, segments)
+
+            # Sheets 6+: Aggregates (15 min, daily)
+            if pyramid is not None:
+                self._write_aggregate_sheets(writer, pyramid)
+
+            # Rolling demand peaks
+            if 'demand' in summary:
+                self._write_demand_sheet(writer, summary['demand'])
+
+            # Voltage events
+            if events is not None:
+                self._write_events_sheet(writer, events)
+
+            # Harmonic levels vs limits and spectrum over time
+            if harmonics is not None:
+                self._write_harmonic_sheets(writer, harmonics)
+
+            # Last sheet: Mapping log
             self._write_mapping_log_sheet(writer, mapping_log)
 
         logger.info(f"Exported XLSX: {filepath}")
@@ -82,6 +117,8 @@ class Exporter:
         rows.append(['End Time', summary.get('measurement_end', 'N/A')])
         rows.append(['Duration (hours)', f"{summary.get('duration_hours', 0):.2f}"])
         rows.append(['Total Samples', f"{summary.get('total_samples', 0):,}"])
+        if 'timestamp_order' in summary:
+            rows.append(['Time Order Breaks', f"{summary['timestamp_order']['order_breaks']:,}"])
         rows.append(['', ''])
 
         # Sampling
@@ -92,6 +129,13 @@ class Exporter:
             rows.append(['Dominant Interval (min)', f"{s.get('dt_mode_min', 0):.2f}"])
             rows.append(['Mixed Sampling', 'YES' if s.get('mixed_sampling') else 'NO'])
             rows.append(['Dominant Ratio', f"{s.get('dominant_ratio', 0):.1%}"])
+            if 'segments' in summary:
+                seg = summary['segments']
+                rows.append(['Segments', f"{seg.get('segments', 0):,}"])
+                rows.append(['Gaps', f"{seg.get('gaps', 0):,}"])
+                rows.append(['Missing Time (hours)', f"{seg.get('gap_hours', 0):.2f}"])
+                rows.append(['Longest Gap (s)', f"{seg.get('longest_gap_s', 0):.0f}"])
+                rows.append(['Coverage', f"{seg.get('coverage_percent', 0):.1f}%"])
             rows.append(['', ''])
 
         # Energy
@@ -145,6 +189,55 @@ class Exporter:
                 rows.append(['Max (%)', f"{vi.get('imbalance_max_percent', 0):.2f}"])
                 rows.append(['', ''])
 
+        # Voltage/frequency compliance
+        if 'compliance' in summary:
+            c = summary['compliance']
+            rows.append([f"=== COMPLIANCE ({c.get('level', '')} MEANS) ===", ''])
+            if 'voltage_in_range_percent' in c:
+                rows.append(['Voltage In Range (%)', f"{c['voltage_in_range_percent']:.1f}"])
+            if 'frequency_in_range_percent' in c:
+                rows.append(['Frequency In Range (%)', f"{c['frequency_in_range_percent']:.1f}"])
+            rows.append(['Intervals', f"{c.get('intervals', 0):,}"])
+            rows.append(['', ''])
+
+        # Peak demand
+        if 'demand' in summary:
+            rows.append(['=== PEAK DEMAND (P_total) ===', ''])
+            for label, columns in summary['demand'].items():
+                d = columns.get('P_total')
+                if d is None or d.get('max_at') is None:
+                    continue
+                rows.append([f"Max {label} Demand (kW)", f"{d['max_kW']:.2f}"])
+                rows.append([f"Max {label} Demand At", str(d['max_at'])])
+            rows.append(['', ''])
+
+        # Voltage events
+        if 'events' in summary:
+            ev = summary['events']
+            rows.append(['=== VOLTAGE EVENTS ===', ''])
+            rows.append(['Dips', f"{ev.get('dips', 0):,}"])
+            rows.append(['Swells', f"{ev.get('swells', 0):,}"])
+            rows.append(['Interruptions', f"{ev.get('interruptions', 0):,}"])
+            rows.append(['Min Residual Voltage (V)', f"{ev.get('min_residual_V', float('nan')):.1f}"])
+            rows.append(['Max Swell Voltage (V)', f"{ev.get('max_swell_V', float('nan')):.1f}"])
+            rows.append(['Longest Event (s)', f"{ev.get('longest_event_s', 0):.0f}"])
+            rows.append(['', ''])
+
+        # Harmonics
+        if 'harmonics' in summary:
+            h = summary['harmonics']
+            rows.append(['=== HARMONICS (% OF FUNDAMENTAL) ===', ''])
+            for phase, values in h['phases'].items():
+                rows.append([f"THD {phase} P95 (%)", f"{values['THD_p95_percent']:.2f}"])
+                if 'THD_measured_p95_percent' in values:
+                    rows.append([f"THD {phase} P95 Measured (%)",
+                                 f"{values['THD_measured_p95_percent']:.2f}"])
+                rows.append([f"Dominant Harmonic {phase}",
+                             f"H{values['dominant_harmonic']} "
+                             f"({values['dominant_share_percent']:.0f}% of samples)"])
+            rows.append(['Limit Violations (P95)', f"{h['violations']:,}"])
+            rows.append(['', ''])
+
         # Acceptance criteria
         if 'acceptance' in summary:
             rows.append(['=== ACCEPTANCE CRITERIA ===', ''])
@@ -209,7 +302,7 @@ class Exporter:
             if col in df.columns:
                 export_cols.append(col)
 
-        df_export = df[export_cols].copy()
+        df_export = df[export_cols]
 
         # Limit rows if too many (Excel has limits)
         if len(df_export) > 1_000_000:
@@ -244,36 +337,151 @@ class Exporter:
                                  columns=['Rank', 'Interval (s)', 'Count', 'Percent'])
         df_quality.to_excel(writer, sheet_name='data_quality', index=False)
 
+    def _write_segments_sheet(self, writer, segments: SegmentTable):
+        """Write sampling segments sheet (one row per Δt run or gap; per Δt
+        and kept gap for streaming SegmentStats)"""
+
+        df_segments = segments.to_frame()
+
+        if len(df_segments) > 1_000_000:
+            logger.warning(f"Segment table has {len(df_segments):,} rows, truncating to 1M for Excel")
+            df_segments = df_segments.iloc[:1_000_000]
+
+        df_segments.to_excel(writer, sheet_name='segments', index=False)
+
+    def _write_aggregate_sheets(self, writer, pyramid: AggregationPyramid):
+        """Write min/mean/max and energy per interval (one sheet per level)"""
+
+        for level in PYRAMID_REPORT_LEVELS:
+            if level not in pyramid.levels:
+                continue
+
+            df_level = pyramid.frame(level)
+
+            if len(df_level) > 1_000_000:
+                logger.warning(f"Level {level} has {len(df_level):,} bins, truncating to 1M for Excel")
+                df_level = df_level.iloc[:1_000_000]
+
+            df_level.to_excel(writer, sheet_name=f"agg_{level}")
+
+    def _write_demand_sheet(self, writer, demand: Dict):
+        """Write top-N and daily peak demand windows (one row per window)"""
+
+        rows = []
+        for label, columns in demand.items():
+            for name, d in columns.items():
+                for top in d.get('top', []):
+                    rows.append([label, name, 'top', top['rank'],
+                                 top['start'], top['end'], top['demand_kW']])
+                for peak in d.get('daily_peaks', []):
+                    rows.append([label, name, 'daily peak', peak['date'].date(),
+                                 peak['end'] - pd.Timedelta(seconds=d['window_s']),
+                                 peak['end'], peak['demand_kW']])
+
+        df_demand = pd.DataFrame(rows, columns=['Window', 'Column', 'Type', 'Rank / Date',
+                                                'Start', 'End', 'Demand (kW)'])
+        df_demand.to_excel(writer, sheet_name='demand', index=False)
+
+    def _write_events_sheet(self, writer, events: EventTable):
+        """Write voltage events sheet (one row per dip, swell or interruption)"""
+
+        df_events = events.to_frame()
+
+        if len(df_events) > 1_000_000:
+            logger.warning(f"Event table has {len(df_events):,} rows, truncating to 1M for Excel")
+            df_events = df_events.iloc[:1_000_000]
+
+        df_events.to_excel(writer, sheet_name='events', index=False)
+
+    def _write_harmonic_sheets(self, writer, harmonics: HarmonicAnalyzer):
+        """Write per-harmonic levels vs limits and the spectrum over time"""
+
+        harmonics.levels_frame().to_excel(writer, sheet_name='harmonics', index=False)
+
+        df_spectrum = harmonics.spectrum_frame()
+        if len(df_spectrum):
+            df_spectrum.to_excel(writer, sheet_name='harmonic_spectrum')
+
     def _write_mapping_log_sheet(self, writer, mapping_log: List[Dict]):
         """Write column mapping log sheet"""
 
         df_mapping = pd.DataFrame(mapping_log)
         df_mapping.to_excel(writer, sheet_name='mapping_log', index=False)
 
+    @staticmethod
+    def _plot_series(df: Optional[pd.DataFrame],
+                     cols: List[str],
+                     segments: Optional[SegmentTable] = None,
+                     pyramid: Optional[AggregationPyramid] = None):
+        """
+        Time axis, values and min/max bands to plot
+
+        With a pyramid the finest level of at most PLOT_MAX_POINTS bins is
+        plotted (bin means, min/max as a band; lines break at gaps).
+        Otherwise raw rows are plotted, with a NaN before every row that
+        follows a gap so lines are not drawn across missing data.
+
+        Returns:
+            (x, {column: y}, {column: (min, max)}) for available columns
+        """
+
+        if pyramid is not None:
+            level = pyramid.frame(pyramid.select_level(PLOT_MAX_POINTS), break_gaps=True)
+            available = [c for c in cols if f"{c}_mean" in level.columns]
+
+            x = level.index.to_numpy()
+            ys = {c: level[f"{c}_mean"].to_numpy(dtype=np.float64) for c in available}
+            bands = {c: (level[f"{c}_min"].to_numpy(dtype=np.float64),
+                         level[f"{c}_max"].to_numpy(dtype=np.float64)) for c in available}
+
+            return x, ys, bands
+
+        x = df['timestamp'].to_numpy()
+        ys = {c: df[c].to_numpy(dtype=np.float64) for c in cols if c in df.columns}
+
+        rows = segments.gap_rows() if segments is not None else []
+        if len(rows) and segments.n_rows == len(df):
+            x = np.insert(x, rows, x[rows])
+            ys = {c: np.insert(y, rows, np.nan) for c, y in ys.items()}
+
+        return x, ys, {}
+
     def plot_power_timeseries(self,
                              df: pd.DataFrame,
-                             filename: str = 'timeseries_power.png'):
+                             filename: str = 'timeseries_power.png',
+                             segments: Optional[SegmentTable] = None,
+                             pyramid: Optional[AggregationPyramid] = None):
         """
         Plot power timeseries (P and S)
 
         Args:
-            df: DataFrame with timestamp, P_total, S_total
+            df: DataFrame with timestamp, P_total, S_total (None if
+                plotted from pyramid)
             filename: Output filename
+            segments: Segment table of df (lines are broken at gaps)
+            pyramid: Aggregation pyramid to plot instead of raw rows
         """
 
         filepath = self.output_dir / filename
 
         fig, ax = plt.subplots(figsize=PLOT_FIGSIZE)
 
+        x, ys, bands = self._plot_series(df, ['P_total', 'S_total'], segments, pyramid)
+
         # Plot P and S
-        if 'P_total' in df.columns:
-            ax.plot(df['timestamp'], df['P_total'] / 1000,
+        if 'P_total' in ys:
+            ax.plot(x, ys['P_total'] / 1000,
                    label='P (kW)', linewidth=1, color='blue')
 
-        if 'S_total' in df.columns:
-            ax.plot(df['timestamp'], df['S_total'] / 1000,
+        if 'S_total' in ys:
+            ax.plot(x, ys['S_total'] / 1000,
                    label='S (kVA)', linewidth=1, alpha=0.7, color='red')
 
+        for col, color in [('P_total', 'blue'), ('S_total', 'red')]:
+            if col in bands:
+                ax.fill_between(x, bands[col][0] / 1000, bands[col][1] / 1000,
+                                color=color, alpha=0.15, linewidth=0)
+
         ax.set_xlabel('Time')
         ax.set_ylabel('Power [kW / kVA]')
         ax.legend(loc='best')
@@ -291,26 +499,33 @@ class Exporter:
 
     def plot_pf_comparison(self,
                           df: pd.DataFrame,
-                          filename: str = 'timeseries_pf.png'):
+                          filename: str = 'timeseries_pf.png',
+                          segments: Optional[SegmentTable] = None,
+                          pyramid: Optional[AggregationPyramid] = None):
         """
         Plot power factor comparison (measured vs calculated)
 
         Args:
-            df: DataFrame with timestamp, PF_total, PF_calc
+            df: DataFrame with timestamp, PF_total, PF_calc (None if
+                plotted from pyramid)
             filename: Output filename
+            segments: Segment table of df (lines are broken at gaps)
+            pyramid: Aggregation pyramid to plot instead of raw rows
         """
 
         filepath = self.output_dir / filename
 
         fig, ax = plt.subplots(figsize=PLOT_FIGSIZE)
 
+        x, ys, _ = self._plot_series(df, ['PF_total', 'PF_calc'], segments, pyramid)
+
         # Plot measured and calculated PF
-        if 'PF_total' in df.columns:
-            ax.plot(df['timestamp'], df['PF_total'],
+        if 'PF_total' in ys:
+            ax.plot(x, ys['PF_total'],
                    label='PF measured', linewidth=1, color='blue')
 
-        if 'PF_calc' in df.columns:
-            ax.plot(df['timestamp'], df['PF_calc'],
+        if 'PF_calc' in ys:
+            ax.plot(x, ys['PF_calc'],
                    label='PF calculated', linewidth=1,
                    linestyle='--', alpha=0.7, color='red')
 
@@ -0,0 +1,456 @@
+"""
+Harmonics module for the structured harmonic column block
+
+The export holds harmonics 2-50 as a regular block of columns:
+harmonic N × phase (L1N, L2N, L3N, NG) × aggregation (Min, Priem, Max).
+The decoder recognizes this block from the header and loads it into
+one contiguous float32 array shaped (samples, harmonic, phase, agg),
+whole or block by block.
+
+The analyzer reduces the blocks to THD, per-harmonic p95/max against
+limit tables, the dominant harmonic per phase and the spectrum over
+time, so a campaign never has to fit in memory as one cube.
+"""
+
+import re
+import math
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+from .config import (HARMONIC_PREFIX, HARMONIC_PHASES, HARMONIC_AGGS,
+                     PREPROCESS_BLOCK_SIZE, HARMONIC_LIMITS, HARMONIC_THD_LIMIT,
+                     HARMONIC_LIMIT_PHASES, HARMONIC_SPECTRUM_S)
+from .column_mapper import ColumnMapper
+from .preprocessor import iter_clean_blocks
+from .sketch import QuantileSketchArray
+
+logger = logging.getLogger(__name__)
+
+
+class HarmonicDecoder:
+    """
+    Decode harmonic column layout and load harmonic data as a dense cube
+    """
+
+    def __init__(self, columns: List[str]):
+        """
+        Initialize decoder from header columns
+
+        Args:
+            columns: List of column names (raw or clean header)
+        """
+
+        pattern = re.compile(
+            r'^' + re.escape(HARMONIC_PREFIX) + r'\s?(\d+) (' +
+            '|'.join(HARMONIC_PHASES) + r') (' + '|'.join(HARMONIC_AGGS) + r')$'
+        )
+
+        found = {}
+        for i, col in enumerate(columns):
+            m = pattern.match(ColumnMapper._normalize(col))
+            if m:
+                found[(int(m.group(1)), m.group(2), m.group(3))] = i
+
+        self.harmonics = np.array(sorted({h for h, _, _ in found}), dtype=np.int16)
+        self.phases = list(HARMONIC_PHASES)
+        self.aggs = list(HARMONIC_AGGS)
+
+        # index[h, p, a] = column index (-1 = missing)
+        self.index = np.full((len(self.harmonics), len(self.phases), len(self.aggs)),
+                             -1, dtype=np.int64)
+
+        for (h, phase, agg), col_idx in found.items():
+            h_pos = int(np.searchsorted(self.harmonics, h))
+            self.index[h_pos, self.phases.index(phase), self.aggs.index(agg)] = col_idx
+
+        self.available = len(found) > 0
+
+        if self.available:
+            logger.info(f"Harmonic block: {len(found)} columns, harmonics "
+                        f"{self.harmonics[0]}-{self.harmonics[-1]}, "
+                        f"{(self.index < 0).sum()} missing")
+        else:
+            logger.warning("No harmonic columns found in header")
+
+    @classmethod
+    def from_file(cls, filepath: str, encoding: str = None):
+        """
+        Create decoder by reading header from file
+
+        Args:
+            filepath: Path to data file
+            encoding: File encoding (None = auto-detect)
+
+        Returns:
+            HarmonicDecoder instance
+        """
+
+        return cls(ColumnMapper.from_file(filepath, encoding=encoding).columns)
+
+    def column_indices(self) -> List[int]:
+        """Get sorted list of column indices in the harmonic block"""
+
+        return sorted(int(i) for i in self.index.ravel() if i >= 0)
+
+    def _parse_block(self, text: str, n_cols: int) -> np.ndarray:
+        """
+        Parse projected lines of numbers into a (rows, n_cols) float32 array
+
+        All fields are converted in one call; lines that do not have
+        exactly n_cols numeric fields fall back to per-field parsing.
+        """
+
+        text = text.replace(',', '.')
+        lines = text.split('\n')
+        n_rows = len(lines) - lines.count('')
+
+        try:
+            values = np.array(text.split(), dtype=np.float32)
+        except ValueError:
+            values = None
+
+        if values is not None and values.size == n_rows * n_cols:
+            return values.reshape(n_rows, n_cols)
+
+        # Fallback: malformed or short lines → NaN
+        rows = []
+        for line in lines:
+            if not line:
+                continue
+            row = np.full(n_cols, np.nan, dtype=np.float32)
+            for j, field in enumerate(line.split('\t')[:n_cols]):
+                try:
+                    row[j] = float(field)
+                except ValueError:
+                    pass
+            rows.append(row)
+
+        return np.array(rows, dtype=np.float32).reshape(-1, n_cols)
+
+    def iter_load(self,
+                  filepath: str,
+                  block_size: int = PREPROCESS_BLOCK_SIZE,
+                  workers: int = 1) -> Iterator[np.ndarray]:
+        """
+        Yield the harmonic cube block by block (bounded memory)
+
+        Works on raw and clean files alike: only the harmonic columns are
+        projected and cleaned (see preprocessor), the header line is skipped.
+
+        Args:
+            filepath: Path to raw or clean data file
+            block_size: Bytes read per block
+            workers: Number of worker processes for cleaning
+
+        Yields:
+            C-contiguous float32 arrays shaped (rows, harmonic, phase, agg);
+            missing columns are NaN. Rows follow the file's data lines;
+            truncated lines that end before the harmonic block are skipped.
+        """
+
+        if not self.available:
+            raise ValueError("No harmonic columns found in header")
+
+        columns = self.column_indices()
+        n_cols = len(columns)
+
+        # Projected column of every (harmonic, phase, agg) cell
+        positions = np.searchsorted(columns, self.index.clip(min=0)).ravel()
+        missing = self.index < 0
+
+        header_skipped = False
+
+        for text, _ in iter_clean_blocks(Path(filepath), block_size, workers, columns):
+            if not header_skipped:
+                text = text.split('\n', 1)[1] if '\n' in text else ''
+                header_skipped = True
+            if not text:
+                continue
+
+            flat = self._parse_block(text, n_cols)
+            cube = flat[:, positions].reshape((len(flat),) + self.index.shape)
+            cube[:, missing] = np.nan
+
+            yield cube
+
+    def load(self,
+             filepath: str,
+             block_size: int = PREPROCESS_BLOCK_SIZE,
+             workers: int = 1) -> np.ndarray:
+        """
+        Load harmonic block into a dense array
+
+        Args:
+            filepath: Path to raw or clean data file
+            block_size: Bytes read per block
+            workers: Number of worker processes for cleaning
+
+        Returns:
+            C-contiguous float32 array shaped (samples, harmonic, phase, agg)
+            (see iter_load)
+        """
+
+        blocks = list(self.iter_load(filepath, block_size, workers))
+
+        cube = (np.concatenate(blocks) if blocks
+                else np.empty((0,) + self.index.shape, dtype=np.float32))
+
+        logger.info(f"Loaded harmonic cube {cube.shape} "
+                    f"({cube.nbytes / 1024 / 1024:.1f} MB)")
+
+        return np.ascontiguousarray(cube)
+
+
+class HarmonicAnalyzer:
+    """
+    THD, per-harmonic distribution against limits, dominant harmonic and
+    spectrum over time, reduced block by block from the harmonic cube
+    """
+
+    def __init__(self,
+                 harmonics: Sequence[int],
+                 phases: Sequence[str] = HARMONIC_PHASES,
+                 aggs: Sequence[str] = HARMONIC_AGGS,
+                 spectrum_s: int = HARMONIC_SPECTRUM_S):
+        """
+        Initialize empty accumulators
+
+        Args:
+            harmonics: Harmonic orders of the cube's harmonic axis
+            phases: Phase names of the cube's phase axis
+            aggs: Aggregation names of the cube's last axis
+            spectrum_s: Bin width of the spectrum over time in seconds
+        """
+
+        self.harmonics = np.asarray(harmonics, dtype=np.int16)
+        self.phases = list(phases)
+        self.mean_pos = list(aggs).index('priem')
+        self.max_pos = list(aggs).index('max')
+        self.spectrum_s = spectrum_s
+
+        n_h, n_p = len(self.harmonics), len(self.phases)
+
+        self.rows = 0
+        self.levels = QuantileSketchArray(n_h * n_p)  # Mean level per harmonic and phase
+        self.level_sum = np.zeros((n_h, n_p))
+        self.level_count = np.zeros((n_h, n_p), dtype=np.int64)
+        self.level_max = np.full((n_h, n_p), np.nan)
+
+        self.thd = QuantileSketchArray(n_p)
+        self.thd_sum = np.zeros(n_p)
+        self.thd_count = np.zeros(n_p, dtype=np.int64)
+        self.thd_max = np.full(n_p, np.nan)
+
+        self.dominant = np.zeros((n_p, n_h), dtype=np.int64)  # Samples led by each harmonic
+        self.spectrum_blocks = []  # (bin, sums, counts) per block
+
+    @classmethod
+    def from_decoder(cls, decoder: HarmonicDecoder, **kwargs) -> 'HarmonicAnalyzer':
+        """Analyzer for the cube layout of a decoder"""
+
+        return cls(decoder.harmonics, decoder.phases, decoder.aggs, **kwargs)
+
+    def update(self, block: np.ndarray,
+               ts_ns: Optional[np.ndarray] = None) -> 'HarmonicAnalyzer':
+        """
+        Reduce one block of the cube
+
+        Args:
+            block: float32 array shaped (rows, harmonic, phase, agg)
+            ts_ns: int64 nanosecond timestamps of the rows (spectrum over
+                   time only when given)
+
+        Returns:
+            self
+        """
+
+        rows = len(block)
+        if rows == 0:
+            return self
+
+        self.rows += rows
+        n_h, n_p = len(self.harmonics), len(self.phases)
+
+        mean = block[..., self.mean_pos]
+        valid = ~np.isnan(mean)
+        filled = np.where(valid, mean, np.float32(0))
+
+        # Per-harmonic level distribution and maximum (Max aggregation)
+        self.levels.update(mean.reshape(rows, n_h * n_p))
+        self.level_sum += filled.sum(axis=0, dtype=np.float64)
+        self.level_count += valid.sum(axis=0)
+        self.level_max = np.fmax(self.level_max, np.fmax.reduce(block[..., self.max_pos], axis=0))
+
+        # THD recomputed from the harmonic levels: sqrt(Σ H_n²)
+        any_valid = valid.any(axis=1)
+        thd = np.sqrt(np.einsum('rhp,rhp->rp', filled, filled))
+        thd[~any_valid] = np.nan
+
+        self.thd.update(thd)
+        self.thd_sum += np.where(any_valid, thd, 0).sum(axis=0, dtype=np.float64)
+        self.thd_count += any_valid.sum(axis=0)
+        self.thd_max = np.fmax(self.thd_max, np.fmax.reduce(thd, axis=0))
+
+        # Dominant harmonic of every sample and phase
+        leader = np.where(valid, mean, -np.inf).argmax(axis=1)
+        index = (leader + np.arange(n_p) * n_h)[any_valid]
+        self.dominant += np.bincount(index, minlength=n_p * n_h).reshape(n_p, n_h)
+
+        # Spectrum over time: mean level per time bin
+        if ts_ns is not None:
+            bins = ts_ns // int(self.spectrum_s * 1e9)
+
+            order = None
+            if (np.diff(bins) < 0).any():
+                order = np.argsort(bins, kind='stable')
+                bins = bins[order]
+
+            starts = np.flatnonzero(np.diff(bins, prepend=bins[0] - 1))
+            sums = np.add.reduceat(filled if order is None else filled[order],
+                                   starts, axis=0, dtype=np.float64)
+            counts = np.add.reduceat((valid if order is None else valid[order]).astype(np.int64),
+                                     starts, axis=0)
+
+            self.spectrum_blocks.append((bins[starts], sums, counts))
+
+        return self
+
+    def consume(self, blocks: Iterator[np.ndarray],
+                ts_ns: Optional[np.ndarray] = None) -> 'HarmonicAnalyzer':
+        """
+        Reduce all blocks (e.g. HarmonicDecoder.iter_load)
+
+        Args:
+            blocks: Iterable of cube blocks in row order
+            ts_ns: int64 timestamps of all rows (NaT rows are skipped);
+                   the spectrum is dropped if the rows do not match
+
+        Returns:
+            self
+        """
+
+        offset = 0
+        nat = np.iinfo(np.int64).min
+
+        for block in blocks:
+            rows = len(block)
+            block_ts = None
+
+            if ts_ns is not None and offset + rows <= len(ts_ns):
+                block_ts = ts_ns[offset:offset + rows]
+                keep = block_ts != nat
+                if not keep.all():
+                    block, block_ts = block[keep], block_ts[keep]
+
+            offset += rows
+            self.update(block, block_ts)
+
+        # Trailing rows without timestamp (e.g. a truncated last line) may be missing
+        if ts_ns is not None and (offset > len(ts_ns) or (ts_ns[offset:] != nat).any()):
+            logger.warning(f"Harmonic block has {offset:,} rows, data has {len(ts_ns):,}: "
+                           f"spectrum over time skipped")
+            self.spectrum_blocks = []
+
+        return self
+
+    def spectrum_frame(self) -> pd.DataFrame:
+        """
+        Mean harmonic levels per time bin
+
+        Returns:
+            DataFrame indexed by bin start with one H<n>_<phase> column per
+            harmonic and phase (empty without timestamps)
+        """
+
+        columns = [f"H{h}_{p.upper()}" for h in self.harmonics for p in self.phases]
+
+        if not self.spectrum_blocks:
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name='timestamp'))
+
+        bins = np.concatenate([b for b, _, _ in self.spectrum_blocks])
+        sums = np.concatenate([s for _, s, _ in self.spectrum_blocks])
+        counts = np.concatenate([c for _, _, c in self.spectrum_blocks])
+
+        # Bins split across blocks are merged
+        order = np.argsort(bins, kind='stable')
+        bins = bins[order]
+        starts = np.flatnonzero(np.diff(bins, prepend=bins[0] - 1))
+        sums = np.add.reduceat(sums[order], starts, axis=0)
+        counts = np.add.reduceat(counts[order], starts, axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = (sums / counts).reshape(len(starts), -1)
+
+        index = pd.DatetimeIndex((bins[starts] * int(self.spectrum_s * 1e9)).view('datetime64[ns]'),
+                                 name='timestamp')
+
+        return pd.DataFrame(means, index=index, columns=columns)
+
+    def levels_frame(self) -> pd.DataFrame:
+        """
+        Level statistics of every harmonic and phase against the limits
+
+        Returns:
+            DataFrame with harmonic, phase, mean, p95, max, limit and
+            status (PASS / ALERT, empty when no limit applies)
+        """
+
+        n_h, n_p = len(self.harmonics), len(self.phases)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.level_sum / self.level_count
+
+        limits = np.array([[HARMONIC_LIMITS.get(int(h), np.nan) if p in HARMONIC_LIMIT_PHASES
+                            else np.nan for p in self.phases] for h in self.harmonics])
+        p95 = self.levels.quantile(0.95).reshape(n_h, n_p)
+
+        status = np.where(np.isnan(limits) | np.isnan(p95), '',
+                          np.where(p95 <= limits, 'PASS', 'ALERT'))
+
+        return pd.DataFrame({
+            'harmonic': np.repeat(self.harmonics, n_p),
+            'phase': np.tile([p.upper() for p in self.phases], n_h),
+            'mean_percent': mean.ravel(),
+            'p95_percent': p95.ravel(),
+            'max_percent': self.level_max.ravel(),
+            'limit_percent': limits.ravel(),
+            'status': status.ravel()
+        })
+
+    def result(self) -> Dict:
+        """
+        Summary of all reductions
+
+        Returns:
+            Dict with samples, per-phase THD (mean, p95, max, status),
+            dominant harmonic and its share of samples, and the number of
+            harmonic limit violations (p95 above limit)
+        """
+
+        thd_p95 = self.thd.quantile(0.95)
+        levels = self.levels_frame()
+
+        phases = {}
+        for i, p in enumerate(self.phases):
+            samples = self.dominant[i].sum()
+            leader = int(self.dominant[i].argmax())
+            checked = p in HARMONIC_LIMIT_PHASES
+
+            phases[p.upper()] = {
+                'THD_mean_percent': float(self.thd_sum[i] / self.thd_count[i]) if self.thd_count[i] else math.nan,
+                'THD_p95_percent': float(thd_p95[i]),
+                'THD_max_percent': float(self.thd_max[i]),
+                'THD_status': ('' if not checked or math.isnan(thd_p95[i]) else
+                               'PASS' if thd_p95[i] <= HARMONIC_THD_LIMIT else 'ALERT'),
+                'dominant_harmonic': int(self.harmonics[leader]) if samples else None,
+                'dominant_share_percent': float(self.dominant[i, leader] / samples * 100) if samples else math.nan
+            }
+
+        return {
+            'samples': self.rows,
+            'phases': phases,
+            'violations': int((levels['status'] == 'ALERT').sum()),
+            'violating_harmonics': sorted({int(h) for h in levels.loc[levels['status'] == 'ALERT', 'harmonic']})
+        }
@@ -0,0 +1,402 @@
+"""
+Metrics module with the fused single-pass metrics kernel
+
+Packs the mapped numeric columns into one contiguous (n, k) float64
+matrix (column-major) with phase columns side by side, then computes energies, power
+balance, PF, S² = P² + Q² error, voltage imbalance and frequency
+statistics with whole-matrix reductions. Percentiles of every error
+vector come from a single np.partition call, or from a pluggable
+quantile backend (see sketch.ErrorAccumulator).
+
+Every metric group can also be computed on its own (compute()); groups
+only read the packed matrix, so the metric scheduler runs them in
+parallel threads.
+
+Results use the same keys as the individual Calculator methods.
+"""
+
+import math
+import logging
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional
+from .config import THRESHOLDS
+from .segments import SegmentTable
+
+logger = logging.getLogger(__name__)
+
+PHASES = ['L1N', 'L2N', 'L3N']
+
+# Matrix layout: each total followed by its phases, so phase blocks are slices
+LAYOUT = (['P_total'] + [f"P_{p}" for p in PHASES] +
+          ['S_total'] + [f"S_{p}" for p in PHASES] +
+          ['Q_total', 'PF_total'] +
+          [f"U_{p}" for p in PHASES] +
+          ['F'])
+
+QUANTILES = (0.50, 0.95)
+
+# Metric groups of MetricsKernel.compute(), in result order
+GROUPS = ['energy', 'pf', 'balance', 'vector', 'frequency', 'imbalance']
+
+
+def error_summary(values: np.ndarray) -> Dict[str, float]:
+    """
+    Mean, p50, p95 and max of an error vector (NaN skipped)
+
+    All order statistics come from one np.partition call; quantiles are
+    interpolated linearly like pandas' quantile().
+
+    Returns:
+        Dict with mean, p50, p95, max
+    """
+
+    values = values[~np.isnan(values)]
+    m = values.size
+
+    if m == 0:
+        return {'mean': math.nan, 'p50': math.nan, 'p95': math.nan, 'max': math.nan}
+
+    ranks = [q * (m - 1) for q in QUANTILES]
+    kth = sorted({int(math.floor(r)) for r in ranks} |
+                 {min(int(math.floor(r)) + 1, m - 1) for r in ranks} | {m - 1})
+
+    part = np.partition(values, kth)
+
+    result = {'mean': float(values.mean()), 'max': float(part[m - 1])}
+
+    for q, rank in zip(QUANTILES, ranks):
+        lo = int(math.floor(rank))
+        hi = min(lo + 1, m - 1)
+        result[f"p{int(q * 100)}"] = float(part[lo] + (rank - lo) * (part[hi] - part[lo]))
+
+    return result
+
+
+class MetricsKernel:
+    """
+    Compute all Calculator metrics in one vectorized pass
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Pack available metric columns into a contiguous matrix
+
+        Args:
+            df: DataFrame with logical column names
+        """
+
+        self.columns: List[str] = [c for c in LAYOUT if c in df.columns]
+        self.slot = {c: j for j, c in enumerate(self.columns)}
+
+        # Column-major: every column and phase block is contiguous
+        self.X = np.empty((len(df), len(self.columns)), dtype=np.float64, order='F')
+        for j, col in enumerate(self.columns):
+            self.X[:, j] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        self.has_nan = np.isnan(self.X).any(axis=0)
+        self.stats = self._column_stats()
+
+        # Calculated PF already in the frame (Calculator.add_pf_calc)
+        self.pf_calc: Optional[np.ndarray] = None
+        if 'PF_calc' in df.columns:
+            self.pf_calc = df['PF_calc'].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def has(self, *cols: str) -> bool:
+        return all(c in self.slot for c in cols)
+
+    def col(self, name: str) -> np.ndarray:
+        return self.X[:, self.slot[name]]
+
+    def block(self, names: List[str]) -> np.ndarray:
+        """Adjacent columns as a (n, len(names)) view"""
+
+        start = self.slot[names[0]]
+        return self.X[:, start:start + len(names)]
+
+    def _column_stats(self) -> Dict[str, np.ndarray]:
+        """Sum/mean/min/max of all columns (NaN skipped, like pandas)"""
+
+        X = self.X
+        n = len(X)
+
+        if n:
+            stats = {'sum': X.sum(axis=0), 'min': X.min(axis=0), 'max': X.max(axis=0)}
+        else:
+            k = X.shape[1]
+            stats = {'sum': np.zeros(k), 'min': np.full(k, np.nan), 'max': np.full(k, np.nan)}
+
+        counts = np.full(X.shape[1], n, dtype=np.int64)
+
+        # Only columns with missing values need a second, NaN-aware pass
+        for j in np.flatnonzero(self.has_nan):
+            values = X[:, j][~np.isnan(X[:, j])]
+            counts[j] = values.size
+            stats['sum'][j] = values.sum()
+            stats['min'][j] = values.min() if values.size else np.nan
+            stats['max'][j] = values.max() if values.size else np.nan
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats['mean'] = stats['sum'] / counts
+
+        return stats
+
+    def _row_sum(self, names: List[str]) -> np.ndarray:
+        """Row sums of adjacent columns (NaN counted as 0, like pandas)"""
+
+        block = self.block(names)
+        if self.has_nan[[self.slot[c] for c in names]].any():
+            return np.nansum(block, axis=1)
+        return block.sum(axis=1)
+
+    def _stat(self, name: str, key: str) -> float:
+        return float(self.stats[key][self.slot[name]])
+
+    def pf_calc_values(self) -> Optional[np.ndarray]:
+        """Calculated PF = P / S per row (None without P_total and S_total)"""
+
+        if self.pf_calc is None and self.has('P_total', 'S_total'):
+            self.pf_calc = np.clip(self.col('P_total') / (self.col('S_total') + 1e-6), -1, 1)
+
+        return self.pf_calc
+
+    def run(self,
+            dt_h: float,
+            summarize: Optional[Callable[[str, np.ndarray], Dict]] = None,
+            segments: Optional[SegmentTable] = None,
+            groups: List[str] = GROUPS) -> Dict:
+        """
+        Compute all available metrics
+
+        Args:
+            dt_h: Sampling interval in hours (for energy integration)
+            summarize: Function (name, error vector) → dict with mean, p50,
+                       p95, max (default: exact error_summary)
+            segments: Segment table for energy with per-segment Δt
+                      (default: every sample counts for dt_h)
+            groups: Metric groups to compute (default: all GROUPS)
+
+        Returns:
+            Dict of results with Calculator keys (energy_total,
+            energy_comparison, pf, power_balance_P/S, vector_validation,
+            frequency, voltage_imbalance)
+        """
+
+        results = {}
+
+        for group in groups:
+            results.update(self.compute(group, dt_h, summarize, segments))
+
+        return results
+
+    def compute(self,
+                group: str,
+                dt_h: float,
+                summarize: Optional[Callable[[str, np.ndarray], Dict]] = None,
+                segments: Optional[SegmentTable] = None) -> Dict:
+        """
+        Compute one metric group
+
+        Groups only read the packed matrix, so different groups may run
+        concurrently (call pf_calc_values() first for 'pf').
+
+        Args:
+            group: One of GROUPS
+            dt_h, summarize, segments: See run()
+
+        Returns:
+            Dict of results (empty if the group's columns are missing)
+        """
+
+        if summarize is None:
+            summarize = lambda name, values: error_summary(values)
+
+        if group == 'energy':
+            return self._energy(dt_h, segments)
+        if group == 'pf':
+            return self._pf(summarize)
+        if group == 'balance':
+            return self._balance(summarize)
+        if group == 'vector':
+            return self._vector(summarize)
+        if group == 'frequency':
+            return self._frequency()
+        if group == 'imbalance':
+            return self._imbalance(summarize)
+
+        raise ValueError(f"Unknown metric group '{group}' (choose from {', '.join(GROUPS)})")
+
+    def _energy(self, dt_h: float, segments: Optional[SegmentTable]) -> Dict:
+        """Energy of P_total and ΔE against the sum of the phases"""
+
+        results = {}
+
+        def energy(power_col):
+            if segments is not None:
+                E_kWh = segments.integrate(self.col(power_col)) / 1000
+            else:
+                E_kWh = self._stat(power_col, 'sum') * dt_h / 1000
+            logger.info(f"Energy ({power_col}): {E_kWh:.2f} kWh")
+            return {
+                'power_column': power_col,
+                'E_kWh': E_kWh,
+                'P_mean_W': self._stat(power_col, 'mean'),
+                'P_min_W': self._stat(power_col, 'min'),
+                'P_max_W': self._stat(power_col, 'max'),
+                'dt_h': dt_h
+            }
+
+        P_phases = [f"P_{p}" for p in PHASES]
+
+        if self.has('P_total'):
+            results['energy_total'] = energy('P_total')
+
+            if self.has(*P_phases):
+                E_total = results['energy_total']['E_kWh']
+                E_phase_sum = sum(energy(c)['E_kWh'] for c in P_phases)
+                delta_E_percent = abs(E_phase_sum - E_total) / E_total * 100
+
+                thresholds = THRESHOLDS['delta_E_percent']
+                results['energy_comparison'] = {
+                    'E_total_kWh': E_total,
+                    'E_phase_sum_kWh': E_phase_sum,
+                    'delta_E_percent': delta_E_percent,
+                    'status': 'PASS' if delta_E_percent <= thresholds['pass'] else
+                              ('INFO' if delta_E_percent <= thresholds['info'] else 'ALERT')
+                }
+
+                logger.info(f"Energy comparison: ΔE = {delta_E_percent:.2f}% "
+                            f"[{results['energy_comparison']['status']}]")
+
+        return results
+
+    def _pf(self, summarize: Callable[[str, np.ndarray], Dict]) -> Dict:
+        """Calculated PF against the measured PF_total"""
+
+        if not self.has('P_total', 'S_total', 'PF_total'):
+            return {}
+
+        pf_calc = self.pf_calc_values()
+
+        pf_valid = pf_calc[~np.isnan(pf_calc)]
+        diff = summarize('PF_diff', np.abs(self.col('PF_total') - pf_calc))
+
+        result = {
+            'PF_calc_mean': float(pf_valid.mean()) if pf_valid.size else math.nan,
+            'PF_calc_min': float(pf_valid.min()) if pf_valid.size else math.nan,
+            'PF_calc_max': float(pf_valid.max()) if pf_valid.size else math.nan,
+            'PF_measured_mean': self._stat('PF_total', 'mean'),
+            'PF_diff_mean': diff['mean'],
+            'PF_diff_p50': diff['p50'],
+            'PF_diff_p95': diff['p95'],
+            'PF_diff_max': diff['max']
+        }
+
+        logger.info(f"PF difference: mean={diff['mean']:.4f}, p95={diff['p95']:.4f}")
+
+        return {'pf': result}
+
+    def _balance(self, summarize: Callable[[str, np.ndarray], Dict]) -> Dict:
+        """Power balance: sum of phases vs total"""
+
+        results = {}
+
+        for quantity in ['P', 'S']:
+            total_col = f"{quantity}_total"
+            phase_cols = [f"{quantity}_{p}" for p in PHASES]
+
+            if not self.has(total_col, *phase_cols):
+                continue
+
+            total = self.col(total_col)
+            rel_err = np.abs(self._row_sum(phase_cols) - total) / (np.abs(total) + 1e-6)
+            err = summarize(f"balance_{total_col}", rel_err)
+
+            results[f"power_balance_{quantity}"] = {
+                'available': True,
+                'total_col': total_col,
+                'phase_cols': phase_cols,
+                'rel_err_mean': err['mean'],
+                'rel_err_p50': err['p50'],
+                'rel_err_p95': err['p95'],
+                'rel_err_max': err['max']
+            }
+
+            logger.info(f"Power balance ({total_col}): mean={err['mean']:.3f}, p95={err['p95']:.3f}")
+
+        return results
+
+    def _vector(self, summarize: Callable[[str, np.ndarray], Dict]) -> Dict:
+        """Vector validation S² = P² + Q² (only where S > 1 VA)"""
+
+        if not self.has('P_total', 'Q_total', 'S_total'):
+            return {}
+
+        S = self.col('S_total')
+        mask = S > 1
+        S_calc = np.sqrt(self.col('P_total')[mask] ** 2 + self.col('Q_total')[mask] ** 2)
+        err = summarize('vector_rel_err', np.abs(S[mask] - S_calc) / S[mask])
+
+        result = {
+            'available': True,
+            'samples_used': int(mask.sum()),
+            'rel_err_mean': err['mean'],
+            'rel_err_p50': err['p50'],
+            'rel_err_p95': err['p95'],
+            'rel_err_max': err['max']
+        }
+
+        logger.info(f"Vector validation (S²=P²+Q²): mean={err['mean']:.3f}, p95={err['p95']:.3f}")
+
+        return {'vector_validation': result}
+
+    def _frequency(self) -> Dict:
+        """Frequency statistics"""
+
+        if not self.has('F'):
+            return {}
+
+        F = self.col('F')
+        F = F[~np.isnan(F)] if self.has_nan[self.slot['F']] else F
+
+        result = {
+            'available': True,
+            'F_mean_Hz': self._stat('F', 'mean'),
+            'F_min_Hz': self._stat('F', 'min'),
+            'F_max_Hz': self._stat('F', 'max'),
+            'F_std_Hz': float(F.std(ddof=1)) if F.size > 1 else math.nan
+        }
+
+        logger.info(f"Frequency: {result['F_mean_Hz']:.3f} Hz (±{result['F_std_Hz']:.3f})")
+
+        return {'frequency': result}
+
+    def _imbalance(self, summarize: Callable[[str, np.ndarray], Dict]) -> Dict:
+        """Voltage imbalance: max(|U_i - U_avg|) / U_avg * 100"""
+
+        U_cols = [f"U_{p}" for p in PHASES]
+        if not self.has(*U_cols):
+            return {}
+
+        U = self.block(U_cols)
+
+        with warnings.catch_warnings():
+            # All-NaN rows stay NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            U_avg = np.nanmean(U, axis=1, keepdims=True)
+            max_imbalance = np.nanmax(np.abs(U - U_avg) / U_avg * 100, axis=1)
+
+        err = summarize('voltage_imbalance', max_imbalance)
+
+        result = {
+            'available': True,
+            'imbalance_mean_percent': err['mean'],
+            'imbalance_p50_percent': err['p50'],
+            'imbalance_p95_percent': err['p95'],
+            'imbalance_max_percent': err['max']
+        }
+
+        logger.info(f"Voltage imbalance: mean={err['mean']:.2f}%, p95={err['p95']:.2f}%")
+
+        return {'voltage_imbalance': result}
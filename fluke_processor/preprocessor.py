@@ -7,16 +7,77 @@ Handles:
 - Missing zeros after minus (-,123 → -0,123)
 - Space-minus patterns ( \- → -)
 - Empty values (tab-tab → tab-0,0-tab)
+- Column projection (clean only the mapped columns)
 """
 
+import io
 import re
+import mmap
+import hashlib
 import logging
+from collections import deque
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional
-from .config import ENCODING_INPUT, ENCODING_OUTPUT
+from typing import Iterator, List, Optional, Sequence
+from .config import (ENCODING_INPUT, ENCODING_OUTPUT, PREPROCESS_BLOCK_SIZE,
+                     PREPROCESS_PREFETCH, ESTIMATE_BLOCK_SIZE, DATE_FORMATS, TIME_FORMATS)
 
 logger = logging.getLogger(__name__)
 
+# Bytes per block read in sampled row estimation
+SAMPLE_BLOCK_SIZE = 1024 * 1024
+SEEK_SCAN_SIZE = 64 * 1024  # find_time_offset: scan linearly below this
+FINGERPRINT_BYTES = 64 * 1024  # prefix_fingerprint: bytes hashed before offset
+
+# Bump when cleaning rules change (invalidates cached data)
+PREPROCESSOR_VERSION = 2
+
+# Literal byte fixes, applied in order to line-aligned blocks.
+# All patterns are ASCII, so they are safe on CP1250 and UTF-8 bytes alike.
+_LITERAL_FIXES = (
+    # 1. Space-minus patterns
+    (b' \\- ', b'-'),
+    (b'\\-', b'-'),
+    # 2. Negative missing zero at field start:  -,XXX  →  -0,XXX
+    (b'\t-,', b'\t-0,'),
+    (b'\n-,', b'\n-0,'),
+    # 3. Positive missing zero at field start:  ,XXX  →  0,XXX
+    (b'\t,', b'\t0,'),
+    (b'\n,', b'\n0,'),
+)
+
+# 4. Empty values: every tab followed by another tab opens an empty field.
+# The lookahead closes runs of any length in a single pass.
+_EMPTY_FIELD_RE = re.compile(rb'\t(?=\t)')
+
+
+def preprocess_block(block: bytes) -> bytes:
+    """
+    Apply all preprocessing fixes to a block of complete lines
+
+    The block must start at a line boundary and use '\\n' line endings.
+
+    Args:
+        block: Raw bytes (CP1250 or UTF-8)
+
+    Returns:
+        Cleaned bytes with all fixes applied
+    """
+
+    for old, new in _LITERAL_FIXES:
+        block = block.replace(old, new)
+
+    # Field-start fixes for the first line of the block
+    if block.startswith(b'-,'):
+        block = b'-0,' + block[2:]
+    elif block.startswith(b','):
+        block = b'0,' + block[1:]
+
+    return _EMPTY_FIELD_RE.sub(b'\t0,0', block)
+
 
 def preprocess_line(line: str) -> str:
     """
@@ -29,37 +90,428 @@ def preprocess_line(line: str) -> str:
         Cleaned line with all fixes applied
     """
 
-    # 1. Fix space-minus patterns
-    line = line.replace(' \\- ', '-')
-    line = line.replace('\\-', '-')
+    return preprocess_block(line.encode('utf-8')).decode('utf-8')
+
+
+def _normalize_newlines(block: bytes) -> bytes:
+    """Translate CRLF and lone CR to LF (same as text-mode universal newlines)"""
+
+    return block.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+
+def _iter_blocks(fin, block_size: int, limit: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Read binary file in large blocks cut at line boundaries
+
+    Args:
+        fin: Binary file positioned at a line start
+        block_size: Bytes per read
+        limit: Read at most this many bytes (None = to end of file)
+
+    Yields:
+        Blocks of complete lines (the last block may lack a final newline)
+    """
+
+    remainder = b''
+
+    while True:
+        if limit is not None:
+            data = fin.read(min(block_size, limit))
+            limit -= len(data)
+        else:
+            data = fin.read(block_size)
+
+        if not data:
+            if remainder:
+                yield remainder
+            return
+
+        data = remainder + data
+        cut = data.rfind(b'\n') + 1
+
+        if cut == 0:
+            remainder = data
+            continue
+
+        remainder = data[cut:]
+        yield data[:cut]
+
+
+def _count_lines(block: bytes) -> int:
+    """Count lines in block, including a final line without newline"""
+
+    count = block.count(b'\n')
+    if block and not block.endswith(b'\n'):
+        count += 1
+    return count
+
+
+def _count_error_lines(text: str) -> int:
+    """Count lines containing the U+FFFD replacement character"""
+
+    count = 0
+    pos = text.find('\ufffd')
+
+    while pos != -1:
+        count += 1
+        end = text.find('\n', pos)
+        if end == -1:
+            break
+        pos = text.find('\ufffd', end)
+
+    return count
+
+
+def project_block(block: bytes, columns: Sequence[int]) -> bytes:
+    """
+    Keep only selected fields of every line in a block
+
+    Only the line prefix up to the last selected field is split. A selected
+    field that was an interior empty field in the full line is written as
+    0,0 right away, because it may become the first or last field of the
+    narrow line, where the empty-field fix would not reach it.
+
+    Args:
+        block: Line-aligned bytes with '\\n' line endings
+        columns: Sorted field indices to keep
+
+    Returns:
+        Narrow block with the selected fields in index order
+    """
+
+    getter = itemgetter(*columns)
+    single = len(columns) == 1
+    first, last = columns[0], columns[-1]
+    max_split = last + 1
+
+    lines = block.split(b'\n')
+
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+
+        parts = line.split(b'\t', max_split)
+        n_parts = len(parts)
+
+        if n_parts > last:
+            fields = [getter(parts)] if single else list(getter(parts))
+            last_present = last
+        else:
+            # Short line: keep the selected fields it has, the parser
+            # fills the missing ones like in the full file
+            fields = [parts[c] for c in columns if c < n_parts]
+            if not fields:
+                lines[i] = b''
+                continue
+            last_present = columns[len(fields) - 1]
+
+        if first > 0 and n_parts > first + 1 and not fields[0]:
+            fields[0] = b'0,0'
+        if last_present > 0 and n_parts > last_present + 1 and not fields[-1]:
+            fields[-1] = b'0,0'
+
+        lines[i] = b'\t'.join(fields)
+
+    return b'\n'.join(lines)
+
+
+def clean_block(raw: bytes, columns: Optional[Sequence[int]] = None) -> tuple[str, dict]:
+    """
+    Clean a line-aligned block of raw bytes and collect its statistics
+
+    Args:
+        raw: Raw CP1250 bytes starting at a line boundary
+        columns: Sorted field indices to keep (None = all columns).
+                 Statistics then refer to the selected fields only.
+
+    Returns:
+        Tuple of (cleaned text, statistics_dict) where the dict holds
+        total_lines, lines_modified and encoding_errors for this block
+    """
+
+    raw = _normalize_newlines(raw)
+
+    if columns is not None:
+        raw = project_block(raw, columns)
+
+    clean = preprocess_block(raw)
+    text = clean.decode(ENCODING_INPUT, errors='replace')
+
+    if clean == raw:
+        lines_modified = 0
+    else:
+        lines_modified = sum(map(bytes.__ne__,
+                                 raw.split(b'\n'), clean.split(b'\n')))
+
+    stats = {
+        'total_lines': _count_lines(raw),
+        'lines_modified': lines_modified,
+        'encoding_errors': _count_error_lines(text)
+    }
+
+    return text, stats
+
+
+def _shard_offsets(filepath: Path, shard_size: int,
+                   start: int = 0, end: Optional[int] = None) -> List[int]:
+    """
+    Split file into byte ranges that start right after a line break
+
+    Args:
+        filepath: Path to file
+        shard_size: Approximate bytes per range
+        start: First byte (a line start)
+        end: Byte after the last range (None = file size)
+
+    Returns:
+        Sorted list of offsets, starting with start and ending with end
+    """
+
+    file_size = filepath.stat().st_size if end is None else end
+    offsets = [start]
+
+    with open(filepath, 'rb') as f:
+        pos = start + shard_size
+
+        while pos < file_size:
+            f.seek(pos)
+
+            # Scan forward to the end of the current line
+            while True:
+                data = f.read(64 * 1024)
+                if not data:
+                    pos = file_size
+                    break
+                nl = data.find(b'\n')
+                if nl != -1:
+                    pos = f.tell() - len(data) + nl + 1
+                    break
+
+            if pos >= file_size:
+                break
+
+            offsets.append(pos)
+            pos += shard_size
+
+    offsets.append(file_size)
+    return offsets
+
+
+def index_block(raw: bytes, offset: int, stride: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sparse time index entries of a line-aligned raw block
+
+    The first line and every stride-th line after it are indexed (lines
+    without a valid timestamp, such as the header, are skipped).
+
+    Args:
+        raw: Raw bytes starting at a line boundary
+        offset: File offset of the block
+        stride: Lines between entries
+
+    Returns:
+        Tuple of (int64 file offsets, int64 nanosecond timestamps)
+    """
+
+    starts = np.flatnonzero(np.frombuffer(raw, dtype=np.uint8) == ord('\n')) + 1
+    starts = np.concatenate(([0], starts[starts < len(raw)]))[::stride]
+
+    offsets, timestamps = [], []
+
+    for pos in starts.tolist():
+        end = raw.find(b'\n', pos)
+        ts = _parse_timestamp(raw[pos:end if end != -1 else len(raw)])
+
+        if ts is not None:
+            offsets.append(offset + pos)
+            timestamps.append(ts)
+
+    return (np.array(offsets, dtype=np.int64),
+            np.array(timestamps, dtype='datetime64[ns]').view(np.int64))
+
+
+def _clean_shard(filepath: str,
+                 start: int,
+                 end: int,
+                 columns: Optional[Sequence[int]],
+                 stride: Optional[int] = None) -> tuple[str, dict, Optional[tuple]]:
+    """Read, clean and index one byte range (process pool worker)"""
+
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        raw = f.read(end - start)
+
+    entries = index_block(raw, start, stride) if stride else None
+
+    return (*clean_block(raw, columns), entries)
+
+
+def iter_clean_blocks(input_path: Path,
+                       block_size: int,
+                       workers: int,
+                       columns: Optional[Sequence[int]] = None,
+                       start: int = 0,
+                       end: Optional[int] = None,
+                       index=None) -> Iterator[tuple[str, dict]]:
+    """
+    Yield (cleaned text, stats) per block, in file order
+
+    With workers > 1 the file is split into line-aligned shards that are
+    cleaned in a process pool; results are still yielded in order. Only
+    PREPROCESS_PREFETCH shards per worker are in flight, so a slow
+    consumer (the CSV parser reading a CleanStream) never holds more
+    than that many cleaned shards in memory.
+
+    With start > 0 the header line comes first, followed by the lines
+    from byte start on (tail of a growing file).
+
+    With an index (TimeIndex) the raw blocks are also indexed; the index
+    is saved once the whole range was read.
+    """
+
+    if end is not None:
+        end = max(end, start)
 
-    # 2. Fix negative missing zero:  -,XXX  →  -0,XXX
-    line = re.sub(r'(^|\t)-,', r'\g<1>-0,', line)
+    if start > 0:
+        yield clean_block(read_header(input_path), columns)
 
-    # 3. Fix positive missing zero:  ,XXX  →  0,XXX
-    line = re.sub(r'(^|\t),', r'\g<1>0,', line)
+    if workers <= 1:
+        with open(input_path, 'rb') as fin:
+            fin.seek(start)
+            pos = start
+            limit = None if end is None else end - start
+            for raw in _iter_blocks(fin, block_size, limit):
+                if index is not None:
+                    index.add(*index_block(raw, pos, index.stride))
+                pos += len(raw)
+                yield clean_block(raw, columns)
 
-    # 4. Fix empty values:  \t\t  →  \t0,0\t
-    # Apply multiple times to catch consecutive empties
-    for _ in range(3):
-        line = re.sub(r'\t\t', '\t0,0\t', line)
+        if index is not None:
+            index.save(pos)
+        return
 
-    return line
+    offsets = _shard_offsets(input_path, block_size, start, end)
+    logger.info(f"  Parallel mode: {len(offsets) - 1} shards, {workers} workers")
+
+    stride = index.stride if index is not None else None
+    shards = zip(offsets[:-1], offsets[1:])
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        def submit():
+            shard = next(shards, None)
+            if shard is not None:
+                pending.append(pool.submit(_clean_shard, str(input_path), *shard, columns, stride))
+
+        for _ in range(workers * PREPROCESS_PREFETCH):
+            submit()
+
+        try:
+            while pending:
+                text, stats, entries = pending.popleft().result()
+                submit()
+
+                if entries is not None:
+                    index.add(*entries)
+                yield text, stats
+        finally:
+            # Consumer stopped early: do not clean the remaining shards
+            for future in pending:
+                future.cancel()
+
+    if index is not None:
+        index.save(offsets[-1])
+
+
+def read_header(filepath: Path) -> bytes:
+    """First line of a file, with its line break"""
+
+    with open(filepath, 'rb') as f:
+        return f.readline()
+
+
+def prefix_fingerprint(filepath: Path, offset: int) -> str:
+    """
+    Hash of the header line and the FINGERPRINT_BYTES before offset
+
+    Cheap check that tells a file that only grew past offset (same
+    fingerprint) from a replaced one. Edits further before offset are
+    not detected; append.prefix_digest() hashes the whole prefix.
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+
+    with open(filepath, 'rb') as f:
+        digest.update(f.readline())
+        start = max(0, offset - FINGERPRINT_BYTES)
+        f.seek(start)
+        digest.update(f.read(offset - start))
+
+    return digest.hexdigest()
+
+
+def complete_size(filepath: Path) -> int:
+    """
+    Bytes up to the end of the last complete line
+
+    A logger export that is still being written may end in a partial
+    line; it is left for the next run.
+
+    Args:
+        filepath: Path to file
+
+    Returns:
+        Offset after the last line break (0 if there is none)
+    """
+
+    size = Path(filepath).stat().st_size
+
+    with open(filepath, 'rb') as f:
+        pos = size
+        while pos > 0:
+            step = min(SAMPLE_BLOCK_SIZE, pos)
+            f.seek(pos - step)
+            nl = f.read(step).rfind(b'\n')
+            if nl != -1:
+                return pos - step + nl + 1
+            pos -= step
+
+    return 0
+
+
+def default_clean_path(input_path: str) -> Path:
+    """Default path of the clean copy: <input stem>_clean.txt next to input"""
+
+    input_path = Path(input_path)
+    return input_path.parent / f"{input_path.stem}_clean.txt"
 
 
 def preprocess_file(input_path: str,
                    output_path: Optional[str] = None,
-                   verbose: bool = False) -> tuple[str, dict]:
+                   verbose: bool = False,
+                   block_size: int = PREPROCESS_BLOCK_SIZE,
+                   workers: int = 1,
+                   columns: Optional[Sequence[int]] = None,
+                   index=None) -> tuple[str, dict]:
     """
     Preprocess Fluke 435 data file
 
     Creates a clean UTF-8 copy with all formatting issues fixed.
     This is done as a separate step for traceability and audit.
 
+    The raw file is read in large line-aligned byte blocks; all fixes are
+    applied to whole blocks before a single CP1250 → UTF-8 conversion.
+
     Args:
         input_path: Path to raw input file (CP1250 encoded)
         output_path: Path for clean output file (UTF-8). If None, appends '_clean.txt'
         verbose: Print progress information
+        block_size: Bytes read per block (and per shard in parallel mode)
+        workers: Number of worker processes (1 = sequential)
+        columns: Column indices to keep (None = all). The clean file then
+                 holds only these columns, in index order.
+        index: TimeIndex of the raw file, built on the way (optional)
 
     Returns:
         Tuple of (output_path, statistics_dict)
@@ -75,7 +527,7 @@ def preprocess_file(input_path: str,
     input_path = Path(input_path)
 
     if output_path is None:
-        output_path = input_path.parent / f"{input_path.stem}_clean.txt"
+        output_path = default_clean_path(input_path)
     else:
         output_path = Path(output_path)
 
@@ -89,54 +541,324 @@ def preprocess_file(input_path: str,
 
     logger.info(f"Preprocessing: {input_path} → {output_path}")
 
-    try:
-        with open(input_path, 'r', encoding=ENCODING_INPUT, errors='replace') as fin:
-            with open(output_path, 'w', encoding=ENCODING_OUTPUT) as fout:
+    if columns is not None:
+        columns = sorted(set(columns))
+        logger.info(f"  Projecting {len(columns)} columns")
 
-                for line_no, line in enumerate(fin, 1):
-                    stats['total_lines'] += 1
-
-                    # Check for encoding errors
-                    if '�' in line:
-                        stats['encoding_errors'] += 1
+    try:
+        with open(output_path, 'w', encoding=ENCODING_OUTPUT) as fout:
 
-                    # Apply fixes
-                    original_line = line
-                    clean_line = preprocess_line(line)
+            for text, block_stats in iter_clean_blocks(input_path, block_size,
+                                                        workers, columns, index=index):
 
-                    if clean_line != original_line:
-                        stats['lines_modified'] += 1
+                # Merge per-block statistics
+                for key, value in block_stats.items():
+                    stats[key] += value
 
-                    fout.write(clean_line)
+                fout.write(text)
 
-                    # Progress reporting
-                    if verbose and line_no % 10000 == 0:
-                        logger.info(f"  Processed {line_no:,} lines...")
+                # Progress reporting
+                if verbose:
+                    logger.info(f"  Processed {stats['total_lines']:,} lines...")
 
     except Exception as e:
         logger.error(f"Error preprocessing file: {e}")
         raise
 
-    # Log summary
+    _log_summary(stats)
+
+    return str(output_path), stats
+
+
+def _log_summary(stats: dict):
+    """Log preprocessing statistics"""
+
     logger.info(f"Preprocessing complete:")
     logger.info(f"  Total lines: {stats['total_lines']:,}")
     logger.info(f"  Lines modified: {stats['lines_modified']:,} "
                 f"({stats['lines_modified']/stats['total_lines']*100:.1f}%)")
     logger.info(f"  Encoding errors: {stats['encoding_errors']:,}")
-    logger.info(f"  Output: {output_path}")
+    logger.info(f"  Output: {stats['output_file']}")
 
-    return str(output_path), stats
 
+class CleanStream(io.RawIOBase):
+    """
+    Readable stream of preprocessed UTF-8 data
 
-def estimate_file_info(filepath: str) -> dict:
+    Cleans the raw file block by block while it is being read, so the
+    CSV parser can consume it directly without a _clean.txt round trip.
+    The stream can be read only once.
     """
-    Quick scan of file to estimate size and row count
+
+    def __init__(self,
+                 input_path: str,
+                 clean_copy_path: Optional[str] = None,
+                 verbose: bool = False,
+                 block_size: int = PREPROCESS_BLOCK_SIZE,
+                 workers: int = 1,
+                 columns: Optional[Sequence[int]] = None,
+                 start: int = 0,
+                 end: Optional[int] = None,
+                 index=None):
+        """
+        Initialize stream
+
+        Args:
+            input_path: Path to raw input file (CP1250 encoded)
+            clean_copy_path: Optional path for an audit copy of the clean data
+            verbose: Print progress information
+            block_size: Bytes read per block (and per shard in parallel mode)
+            workers: Number of worker processes (1 = sequential)
+            columns: Column indices to keep (None = all), e.g. from
+                     ColumnMapper.get_mapped_indices()
+            start: Byte offset of the first data line (0 = whole file;
+                   otherwise the header line plus the tail from start)
+            end: Byte offset where to stop (None = end of file)
+            index: TimeIndex of the raw file, built while streaming and
+                   saved once all data was read (optional)
+        """
+
+        super().__init__()
+
+        # Arguments for reopen()
+        self._args = dict(input_path=input_path, clean_copy_path=clean_copy_path,
+                          verbose=verbose, block_size=block_size, workers=workers,
+                          columns=columns, start=start, end=end, index=index)
+
+        self.input_path = Path(input_path)
+        self.verbose = verbose
+
+        self.stats = {
+            'input_file': str(self.input_path),
+            'output_file': str(clean_copy_path) if clean_copy_path else '(stream)',
+            'total_lines': 0,
+            'lines_modified': 0,
+            'encoding_errors': 0
+        }
+
+        logger.info(f"Preprocessing (streaming): {self.input_path}")
+
+        if columns is not None:
+            columns = sorted(set(columns))
+            logger.info(f"  Projecting {len(columns)} columns")
+
+        if start > 0:
+            logger.info(f"  Reading from byte {start:,}")
+
+        self._blocks = iter_clean_blocks(self.input_path, block_size,
+                                          workers, columns, start, end, index)
+        self._copy = (open(clean_copy_path, 'w', encoding=ENCODING_OUTPUT)
+                      if clean_copy_path else None)
+        self._buffer = b''
+        self._offset = 0
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_block(self) -> bool:
+        """Load next cleaned block into buffer, False at end of data"""
+
+        try:
+            text, block_stats = next(self._blocks)
+        except StopIteration:
+            self._finish()
+            return False
+
+        for key, value in block_stats.items():
+            self.stats[key] += value
+
+        if self._copy is not None:
+            self._copy.write(text)
+
+        if self.verbose:
+            logger.info(f"  Processed {self.stats['total_lines']:,} lines...")
+
+        self._buffer = text.encode(ENCODING_OUTPUT)
+        self._offset = 0
+        return True
+
+    def _finish(self):
+        """Close audit copy and log summary once all data was read"""
+
+        if self._done:
+            return
+
+        self._done = True
+
+        if self._copy is not None:
+            self._copy.close()
+
+        _log_summary(self.stats)
+
+    def readinto(self, b) -> int:
+        while self._offset >= len(self._buffer):
+            if self._done or not self._next_block():
+                return 0
+
+        n = min(len(b), len(self._buffer) - self._offset)
+        b[:n] = self._buffer[self._offset:self._offset + n]
+        self._offset += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._blocks.close()
+            if self._copy is not None:
+                self._copy.close()
+        super().close()
+
+    def reopen(self) -> 'CleanStream':
+        """
+        Close this stream and return a new one over the same data (to
+        parse it again, e.g. with another parser engine)
+
+        Returns:
+            CleanStream from the first line
+        """
+
+        self.close()
+
+        args = dict(self._args)
+        index = args['index']
+
+        if index is not None:
+            # Entries of the aborted pass are not kept
+            args['index'] = type(index)(index.filepath, index.stride)
+
+        return CleanStream(**args)
+
+
+def _parse_timestamp(line: bytes) -> Optional[datetime]:
+    """Parse datum/cas from the first two fields of a raw data line"""
+
+    fields = line.split(b'\t', 2)
+    if len(fields) < 2:
+        return None
+
+    text = (fields[0].decode(ENCODING_INPUT, errors='replace').strip() + ' ' +
+            fields[1].decode(ENCODING_INPUT, errors='replace').strip())
+
+    for date_fmt in DATE_FORMATS:
+        for time_fmt in TIME_FORMATS:
+            try:
+                return datetime.strptime(text, f"{date_fmt} {time_fmt}")
+            except ValueError:
+                continue
+
+    return None
+
+
+def _last_timestamp(mm, max_lines: int = 10) -> Optional[datetime]:
+    """Parse timestamp of the last valid line by seeking from the tail"""
+
+    end = len(mm)
+
+    for _ in range(max_lines):
+        # Skip trailing line breaks
+        while end > 0 and mm[end - 1:end] in (b'\n', b'\r'):
+            end -= 1
+
+        if end == 0:
+            return None
+
+        start = mm.rfind(b'\n', 0, end) + 1
+        ts = _parse_timestamp(mm[start:end])
+
+        if ts is not None:
+            return ts
+
+        end = start
+
+    return None
+
+
+def find_time_offset(filepath: str, timestamp: datetime,
+                     lo: Optional[int] = None, hi: Optional[int] = None) -> int:
+    """
+    Byte offset of the first data line at or after a timestamp
+
+    Bisects over byte positions of a time-ordered raw file (as exported
+    by the instrument), parsing one line per step, so only a few blocks
+    of the file are read. Lines without a valid timestamp are skipped.
+
+    Args:
+        filepath: Path to raw file
+        timestamp: Timestamp to look for
+        lo: Line start known to be before the result (e.g. from TimeIndex)
+        hi: Line start known to be at or after the result
+
+    Returns:
+        Offset of a line start (file size if all lines are earlier)
+    """
+
+    if Path(filepath).stat().st_size == 0:
+        return 0
+
+    with open(filepath, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+
+        def line_at(pos: int) -> tuple[int, Optional[datetime]]:
+            """End of the line starting at pos and its timestamp"""
+
+            end = mm.find(b'\n', pos)
+            end = len(mm) if end == -1 else end
+            return end, _parse_timestamp(mm[pos:end])
+
+        # Lines before lo are earlier than timestamp, lines from hi on are not
+        if lo is None:
+            header_end = mm.find(b'\n')
+            lo = len(mm) if header_end == -1 else header_end + 1
+        hi = len(mm) if hi is None else min(hi, len(mm))
+
+        while hi - lo > SEEK_SCAN_SIZE:
+            pos = mm.find(b'\n', (lo + hi) // 2, hi) + 1
+
+            ts = None
+            while 0 < pos < hi:
+                end, ts = line_at(pos)
+                if ts is not None:
+                    break
+                pos = end + 1
+
+            if ts is None or pos >= hi:
+                break
+
+            if ts < timestamp:
+                lo = end + 1
+            else:
+                hi = pos
+
+        # Linear scan of the remaining range
+        pos = lo
+        while pos < hi:
+            end, ts = line_at(pos)
+            if ts is not None and ts >= timestamp:
+                return pos
+            pos = end + 1
+
+        return hi
+
+
+def estimate_file_info(filepath: str,
+                       sample: bool = False,
+                       sample_blocks: int = 32) -> dict:
+    """
+    Quick scan of file to estimate size, row count and measurement span
+
+    Line breaks are counted over a memory map in large blocks. In sample
+    mode only a few evenly spaced blocks are read and the row count is
+    extrapolated from their average line length. First and last timestamps
+    come from the second line and from a seek to the tail of the file.
 
     Args:
         filepath: Path to file
+        sample: Estimate row count from sampled blocks instead of counting
+        sample_blocks: Number of blocks read in sample mode
 
     Returns:
-        Dict with file_size_mb, estimated_rows, estimated_cols
+        Dict with file_size_mb, estimated_rows, estimated_cols,
+        rows_exact, first_timestamp, last_timestamp, span_hours
     """
 
     filepath = Path(filepath)
@@ -144,17 +866,53 @@ def estimate_file_info(filepath: str) -> dict:
     file_size = filepath.stat().st_size
     file_size_mb = file_size / 1024 / 1024
 
-    # Count lines (fast)
-    with open(filepath, 'rb') as f:
-        line_count = sum(1 for _ in f)
-
-    # Get column count from header
-    with open(filepath, 'r', encoding=ENCODING_INPUT, errors='replace') as f:
-        header = f.readline()
-        col_count = len(header.split('\t'))
-
-    return {
+    info = {
         'file_size_mb': file_size_mb,
-        'estimated_rows': line_count - 1,  # Exclude header
-        'estimated_cols': col_count
+        'estimated_rows': 0,
+        'estimated_cols': 0,
+        'rows_exact': True,
+        'first_timestamp': None,
+        'last_timestamp': None,
+        'span_hours': None
     }
+
+    if file_size == 0:
+        return info
+
+    with open(filepath, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+
+        # Header → column count
+        header_end = mm.find(b'\n')
+        header_end = file_size if header_end == -1 else header_end + 1
+        header = mm[:header_end].decode(ENCODING_INPUT, errors='replace')
+        info['estimated_cols'] = len(header.split('\t'))
+
+        # Count lines
+        if sample and file_size > sample_blocks * SAMPLE_BLOCK_SIZE:
+            step = file_size // sample_blocks
+            sampled = sum(mm[i * step:i * step + SAMPLE_BLOCK_SIZE].count(b'\n')
+                          for i in range(sample_blocks))
+            line_count = round(sampled / (sample_blocks * SAMPLE_BLOCK_SIZE) * file_size)
+            info['rows_exact'] = False
+        else:
+            line_count = sum(mm[pos:pos + ESTIMATE_BLOCK_SIZE].count(b'\n')
+                             for pos in range(0, file_size, ESTIMATE_BLOCK_SIZE))
+            if mm[file_size - 1:file_size] != b'\n':
+                line_count += 1  # Last line without newline
+
+        info['estimated_rows'] = max(line_count - 1, 0)  # Exclude header
+
+        # First and last timestamps
+        first_end = mm.find(b'\n', header_end)
+        first_end = file_size if first_end == -1 else first_end
+        first = _parse_timestamp(mm[header_end:first_end])
+        last = _last_timestamp(mm)
+
+    info['first_timestamp'] = first
+    info['last_timestamp'] = last
+
+    if first is not None and last is not None:
+        info['span_hours'] = (last - first).total_seconds() / 3600
+
+    return info
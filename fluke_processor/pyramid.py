@@ -0,0 +1,355 @@
+"""
+Pyramid module with multi-resolution aggregates
+
+Builds count/sum/min/max and energy per time bin at standard power
+quality intervals (1 min, 10 min, 15 min, 1 h, 1 day). Bin indices are
+computed once from the int64 timestamps for the finest level only; every
+coarser level is reduced from the coarsest finer level whose width
+divides its own (10 min and 15 min from 1 min, 1 h from 15 min, 1 day
+from 1 h), so raw rows are scanned once.
+
+Levels are sparse: bins without samples (gaps) are not stored.
+Reports, plots and compliance checks read the levels instead of the raw
+rows.
+"""
+
+import math
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Mapping, Optional
+from .config import PYRAMID_LEVELS, COMPLIANCE
+from .segments import SegmentTable
+
+logger = logging.getLogger(__name__)
+
+PYRAMID_VERSION = 1  # Bump when the stored layout changes (cache key)
+
+# Reducer of every stored statistic (column suffix)
+REDUCERS = {
+    'count': np.add,
+    'sum': np.add,
+    'gaps': np.add,
+    'Wh': np.add,
+    'min': np.fmin,  # NaN-ignoring
+    'max': np.fmax
+}
+
+
+def _bin_starts(bins: np.ndarray) -> np.ndarray:
+    """First position of every run of equal (sorted) bin indices"""
+
+    return np.flatnonzero(np.diff(bins, prepend=bins[0] - 1))
+
+
+def aggregate_rows(ts_ns: np.ndarray,
+                   columns: Mapping[str, np.ndarray],
+                   weights_h: Optional[np.ndarray] = None,
+                   width_s: int = min(PYRAMID_LEVELS.values()),
+                   energy_columns: Iterable[str] = (),
+                   after_gap: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Aggregate raw rows into bins of the finest level
+
+    Args:
+        ts_ns: int64 nanosecond timestamps (no NaT)
+        columns: Dict of {column name: float values per row}
+        weights_h: Hours represented by every row (SegmentTable.row_weights_h);
+                   energy columns are only computed when given
+        width_s: Bin width in seconds
+        energy_columns: Power columns (W) that also get energy per bin (Wh)
+        after_gap: Boolean per row, True for rows that follow a gap
+
+    Returns:
+        DataFrame indexed by bin start with samples, samples_gaps and
+        <col>_count/_sum/_min/_max (+ <col>_Wh) columns
+    """
+
+    if len(ts_ns) == 0:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='timestamp'))
+
+    width_ns = int(width_s * 1e9)
+    bins = ts_ns // width_ns
+
+    order = None
+    if (np.diff(bins) < 0).any():
+        order = np.argsort(bins, kind='stable')
+        bins = bins[order]
+
+    starts = _bin_starts(bins)
+    out = {'samples': np.diff(starts, append=len(bins))}
+
+    if after_gap is not None:
+        after_gap = after_gap[order] if order is not None else after_gap
+        out['samples_gaps'] = np.add.reduceat(after_gap.astype(np.int64), starts)
+    else:
+        out['samples_gaps'] = np.zeros(len(starts), dtype=np.int64)
+
+    for name, values in columns.items():
+        values = np.asarray(values, dtype=np.float64)
+        if order is not None:
+            values = values[order]
+
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+
+        out[f"{name}_count"] = np.add.reduceat(valid.astype(np.int64), starts)
+        out[f"{name}_sum"] = np.add.reduceat(filled, starts)
+        out[f"{name}_min"] = np.fmin.reduceat(values, starts)
+        out[f"{name}_max"] = np.fmax.reduceat(values, starts)
+
+        if weights_h is not None and name in energy_columns:
+            weights = weights_h[order] if order is not None else weights_h
+            out[f"{name}_Wh"] = np.add.reduceat(filled * weights, starts)
+
+    index = pd.DatetimeIndex((bins[starts] * width_ns).view('datetime64[ns]'), name='timestamp')
+
+    return pd.DataFrame(out, index=index)
+
+
+def rollup(level: pd.DataFrame, width_s: int) -> pd.DataFrame:
+    """
+    Reduce a level into coarser bins (also merges repeated bins)
+
+    Args:
+        level: Level DataFrame (from aggregate_rows or rollup)
+        width_s: Bin width of the result in seconds
+
+    Returns:
+        Level DataFrame with the same columns
+    """
+
+    if level.empty:
+        return level
+
+    width_ns = int(width_s * 1e9)
+    bins = level.index.asi8 // width_ns
+
+    if (np.diff(bins) < 0).any():
+        order = np.argsort(bins, kind='stable')
+        level = level.iloc[order]
+        bins = bins[order]
+
+    starts = _bin_starts(bins)
+
+    out = {}
+    for name in level.columns:
+        reducer = REDUCERS.get(name.rsplit('_', 1)[-1], np.add)
+        out[name] = reducer.reduceat(level[name].to_numpy(), starts)
+
+    index = pd.DatetimeIndex((bins[starts] * width_ns).view('datetime64[ns]'), name='timestamp')
+
+    return pd.DataFrame(out, index=index)
+
+
+class AggregationPyramid:
+    """
+    Min/mean/max and energy aggregates at several time resolutions
+    """
+
+    def __init__(self, levels: Mapping[str, int] = PYRAMID_LEVELS):
+        """
+        Initialize empty pyramid
+
+        Args:
+            levels: Dict of {level name: bin width in seconds}, finest first
+        """
+
+        self.widths = dict(sorted(levels.items(), key=lambda item: item[1]))
+        self.levels: Dict[str, pd.DataFrame] = {}
+        self.columns: List[str] = []
+        self.energy_columns: List[str] = []
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame,
+                   segments: Optional[SegmentTable] = None,
+                   levels: Mapping[str, int] = PYRAMID_LEVELS) -> 'AggregationPyramid':
+        """
+        Build pyramid from a DataFrame with a timestamp column
+
+        All float columns except dt are aggregated; power columns (P_*)
+        also get energy per bin when the segment table is given.
+
+        Args:
+            df: DataFrame with timestamp and logical column names
+            segments: Segment table of df (Δt weights and gaps)
+            levels: Dict of {level name: bin width in seconds}
+
+        Returns:
+            AggregationPyramid instance
+        """
+
+        pyramid = cls(levels)
+        ts_ns = df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        base = pyramid.aggregate(ts_ns, pyramid.frame_columns(df), segments)
+
+        return pyramid.build(base)
+
+    @staticmethod
+    def frame_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Float columns of a DataFrame to aggregate"""
+
+        return {c: df[c].to_numpy(dtype=np.float64, na_value=np.nan)
+                for c in df.columns
+                if c not in ('timestamp', 'dt') and pd.api.types.is_float_dtype(df[c])}
+
+    def aggregate(self, ts_ns: np.ndarray,
+                  columns: Mapping[str, np.ndarray],
+                  segments: Optional[SegmentTable] = None) -> pd.DataFrame:
+        """
+        Finest level of a block of rows (pass the blocks to build())
+
+        Args:
+            ts_ns: int64 nanosecond timestamps
+            columns: Dict of {column name: values per row}
+            segments: Segment table whose last rows are this block
+                      (energy columns and gaps only when given)
+
+        Returns:
+            Level DataFrame of the block
+        """
+
+        weights_h = after_gap = None
+
+        if segments is not None:
+            start_row = segments.n_rows - len(ts_ns)
+            weights_h = segments.row_weights_h(start_row)
+            after_gap = segments.after_gap(start_row)
+
+        for name in columns:
+            if name not in self.columns:
+                self.columns.append(name)
+                if weights_h is not None and name.startswith('P_'):
+                    self.energy_columns.append(name)
+
+        return aggregate_rows(ts_ns, columns, weights_h,
+                              width_s=next(iter(self.widths.values())),
+                              energy_columns=self.energy_columns,
+                              after_gap=after_gap)
+
+    def build(self, *bases: pd.DataFrame) -> 'AggregationPyramid':
+        """
+        Build all levels from finest-level blocks
+
+        Bins split across blocks (chunk boundaries) are merged.
+
+        Args:
+            *bases: Level DataFrames from aggregate()
+
+        Returns:
+            self
+        """
+
+        names = list(self.widths)
+        base = pd.concat(bases) if len(bases) > 1 else bases[0]
+
+        self.levels = {names[0]: rollup(base, self.widths[names[0]])}
+
+        for i, name in enumerate(names[1:], 1):
+            width = self.widths[name]
+
+            # Coarsest finer level whose bins nest into this one
+            parent = next(p for p in reversed(names[:i])
+                          if width % self.widths[p] == 0 or p == names[0])
+
+            self.levels[name] = rollup(self.levels[parent], width)
+
+        logger.info("Aggregation pyramid: " +
+                    ", ".join(f"{name} {len(level):,}" for name, level in self.levels.items()))
+
+        return self
+
+    def __len__(self) -> int:
+        """Number of bins of the finest level"""
+
+        return len(next(iter(self.levels.values()))) if self.levels else 0
+
+    def frame(self, level: str, break_gaps: bool = False) -> pd.DataFrame:
+        """
+        Aggregates of one level
+
+        Args:
+            level: Level name (e.g. '15min')
+            break_gaps: Insert a NaN row before every bin that follows a
+                        gap in the recording (plot lines break there)
+
+        Returns:
+            DataFrame indexed by bin start with samples, <col>_mean,
+            <col>_min, <col>_max and E_<col>_kWh columns
+        """
+
+        stats = self.levels[level]
+        out = {'samples': stats['samples']}
+
+        for name in self.columns:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[f"{name}_mean"] = stats[f"{name}_sum"] / stats[f"{name}_count"]
+            out[f"{name}_min"] = stats[f"{name}_min"]
+            out[f"{name}_max"] = stats[f"{name}_max"]
+
+        for name in self.energy_columns:
+            out[f"E_{name}_kWh"] = stats[f"{name}_Wh"] / 1000
+
+        result = pd.DataFrame(out, index=stats.index)
+
+        if break_gaps:
+            after_gap = result.index[stats['samples_gaps'].to_numpy() > 0]
+            if len(after_gap):
+                breaks = after_gap - pd.Timedelta(1, 'ns')
+                result = result.reindex(result.index.append(breaks)).sort_index(kind='stable')
+
+        return result
+
+    def select_level(self, max_bins: int) -> str:
+        """Finest level spanning at most max_bins bins (coarsest if none does)"""
+
+        for name, width in self.widths.items():
+            level = self.levels[name]
+            if len(level) == 0:
+                return name
+            span = (level.index[-1] - level.index[0]).total_seconds() / width + 1
+            if span <= max_bins:
+                return name
+
+        return list(self.widths)[-1]
+
+
+def check_compliance(pyramid: AggregationPyramid) -> Dict:
+    """
+    Voltage and frequency compliance from 10-minute means (EN 50160 style)
+
+    Share of non-empty 10-minute bins whose mean phase voltages (all
+    phases) and mean frequency are within the tolerance around nominal.
+
+    Args:
+        pyramid: Built pyramid with the COMPLIANCE['level'] level
+
+    Returns:
+        Dict with voltage/frequency in-range percent and PASS/ALERT status
+        (keys only for quantities present in the data)
+    """
+
+    level = pyramid.frame(COMPLIANCE['level'])
+    result = {'level': COMPLIANCE['level'], 'intervals': len(level)}
+
+    def in_range(means: pd.DataFrame, nominal: float, tolerance_percent: float) -> float:
+        means = means.dropna(how='any')
+        if means.empty:
+            return math.nan
+        ok = ((means - nominal).abs() <= nominal * tolerance_percent / 100).all(axis=1)
+        return float(ok.mean() * 100)
+
+    voltage_cols = [f"U_{p}_mean" for p in ['L1N', 'L2N', 'L3N'] if f"U_{p}_mean" in level.columns]
+    if voltage_cols:
+        percent = in_range(level[voltage_cols], COMPLIANCE['voltage_nominal'],
+                           COMPLIANCE['voltage_tolerance_percent'])
+        result['voltage_in_range_percent'] = percent
+        result['voltage_status'] = 'PASS' if percent >= COMPLIANCE['voltage_min_percent'] else 'ALERT'
+
+    if 'F_mean' in level.columns:
+        percent = in_range(level[['F_mean']], COMPLIANCE['frequency_nominal'],
+                           COMPLIANCE['frequency_tolerance_percent'])
+        result['frequency_in_range_percent'] = percent
+        result['frequency_status'] = 'PASS' if percent >= COMPLIANCE['frequency_min_percent'] else 'ALERT'
+
+    return result
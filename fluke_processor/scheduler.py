@@ -0,0 +1,469 @@
+"""
+Scheduler module with the metric dependency graph
+
+Every step of the analysis is a node declaring the logical columns it
+reads and the nodes it needs first: intermediate results (timestamps,
+the segment table with dt, the packed metrics matrix, PF_calc) and
+metrics (energy, PF, demand, events, ...). From the selected metrics the
+scheduler derives
+
+- the closure of required nodes and their run order,
+- the minimal column projection for the loader (a PF-only analysis
+  never parses voltage or frequency columns),
+
+and runs the nodes on a thread pool as soon as their dependencies are
+done. NumPy releases the GIL in the heavy loops, so independent metrics
+overlap. Nodes that change the shared DataFrame (new rows or columns)
+run alone.
+
+With a DataCache, metric results are memoized per metric under a key of
+the input file, the metric's columns and parameters and the version of
+the computing code. A rerun after a threshold or report change restores
+the results instead of recomputing them; intermediate results nobody
+needs any more (the packed metrics matrix) are not built.
+"""
+
+import time
+import hashlib
+import logging
+from functools import lru_cache
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+from .config import (METRIC_THREADS, COLUMN_KEYWORDS, THRESHOLDS, COMPLIANCE,
+                     VOLTAGE_EVENTS, DEMAND_WINDOWS_S, DEMAND_TOP_N, DEMAND_MIN_COVERAGE,
+                     PYRAMID_LEVELS, SEGMENT_GAP_FACTOR, SEGMENT_MIN_INTERVALS)
+from .pyramid import PYRAMID_VERSION
+
+logger = logging.getLogger(__name__)
+
+PHASES = ['L1N', 'L2N', 'L3N']
+
+# All measured quantities (the pyramid aggregates every loaded column)
+MEASURED = [c for c in COLUMN_KEYWORDS if c not in ('datum', 'cas')]
+
+# Modules whose code computes metric results (part of every memo key
+# and of the append state, see append)
+CODE_MODULES = ['calculator', 'metrics', 'timestamps', 'segments', 'sketch',
+                'pyramid', 'demand', 'events', 'data_loader', 'preprocessor',
+                'streaming']
+
+# Parameters every metric depends on (Δt segments)
+COMMON_PARAMS = {'gap_factor': SEGMENT_GAP_FACTOR, 'min_intervals': SEGMENT_MIN_INTERVALS}
+
+
+@lru_cache(maxsize=None)
+def code_version() -> str:
+    """Hash of the CODE_MODULES sources"""
+
+    h = hashlib.blake2b(digest_size=16)
+    for module in CODE_MODULES:
+        h.update((Path(__file__).parent / f"{module}.py").read_bytes())
+
+    return h.hexdigest()
+
+
+class MetricNode:
+    """
+    One step of the analysis: a metric or an intermediate result
+    """
+
+    def __init__(self,
+                 name: str,
+                 method: Optional[str],
+                 args: Sequence = (),
+                 columns: Sequence[str] = (),
+                 optional: Sequence[str] = (),
+                 requires: Sequence[str] = (),
+                 after: Sequence[str] = (),
+                 metric: bool = True,
+                 default: bool = True,
+                 exclusive: bool = False,
+                 results: Sequence[str] = (),
+                 attributes: Sequence[str] = (),
+                 accumulators: Sequence[str] = (),
+                 params: Optional[Dict[str, Any]] = None):
+        """
+        Initialize node
+
+        Args:
+            name: Node name (metric name on the command line)
+            method: Calculator method computing the node (None = done
+                    outside the graph, e.g. the harmonic second pass or
+                    the timeseries sheet)
+            args: Positional arguments of the method
+            columns: Logical columns the node cannot run without
+            optional: Logical columns used when mapped
+            requires: Nodes that must run first (selected with this one)
+            after: Nodes that must run first if selected
+            metric: Selectable metric (False = intermediate result)
+            default: Selected when no metrics are given
+            exclusive: Changes the shared DataFrame; runs alone
+            results: Calculator.results keys the node sets
+            attributes: Calculator attributes the node sets
+            accumulators: Calculator.accumulators the node sets
+            params: Settings the results depend on (memo key); nodes
+                    without outputs are not memoized
+        """
+
+        self.name = name
+        self.method = method
+        self.args = tuple(args)
+        self.columns = list(columns)
+        self.optional = list(optional)
+        self.requires = list(requires)
+        self.after = list(after)
+        self.metric = metric
+        self.default = default
+        self.exclusive = exclusive
+        self.results = list(results)
+        self.attributes = list(attributes)
+        self.accumulators = list(accumulators)
+        self.params = dict(params or {})
+
+    @property
+    def memoized(self) -> bool:
+        """Whether the results are memoized (metrics with outputs)"""
+
+        return self.metric and bool(self.results or self.attributes)
+
+
+NODES = [
+    # Intermediate results
+    MetricNode('timestamp', 'create_timestamp', columns=['datum', 'cas'],
+               metric=False, exclusive=True),
+    MetricNode('segments', 'analyze_sampling', requires=['timestamp'],
+               metric=False, exclusive=True),
+    MetricNode('PF_calc', 'add_pf_calc', columns=['P_total', 'S_total'],
+               requires=['timestamp'], metric=False, exclusive=True),
+    MetricNode('kernel', 'prepare_metrics', requires=['segments'], metric=False),
+
+    # Metrics of the fused kernel
+    MetricNode('energy', 'compute_metric', ['energy'], columns=['P_total'],
+               optional=[f"P_{p}" for p in PHASES], requires=['kernel'],
+               results=['energy_total', 'energy_comparison'],
+               params={'delta_E_percent': THRESHOLDS['delta_E_percent']}),
+    MetricNode('pf', 'compute_metric', ['pf'], columns=['P_total', 'S_total', 'PF_total'],
+               requires=['kernel', 'PF_calc'], results=['pf'], accumulators=['PF_diff']),
+    MetricNode('balance', 'compute_metric', ['balance'],
+               optional=[f"{q}_{p}" for q in 'PS' for p in ['total'] + PHASES],
+               requires=['kernel'], results=['power_balance_P', 'power_balance_S'],
+               accumulators=['balance_P_total', 'balance_S_total']),
+    MetricNode('vector', 'compute_metric', ['vector'], columns=['P_total', 'Q_total', 'S_total'],
+               requires=['kernel'], results=['vector_validation'],
+               accumulators=['vector_rel_err']),
+    MetricNode('frequency', 'compute_metric', ['frequency'], columns=['F'],
+               requires=['kernel'], results=['frequency']),
+    MetricNode('imbalance', 'compute_metric', ['imbalance'],
+               columns=[f"U_{p}" for p in PHASES], requires=['kernel'],
+               results=['voltage_imbalance'], accumulators=['voltage_imbalance']),
+
+    # Metrics over the timestamp axis
+    MetricNode('pyramid', 'build_pyramid', optional=MEASURED, requires=['segments'],
+               after=['PF_calc'], attributes=['pyramid'],
+               params={'levels': PYRAMID_LEVELS, 'version': PYRAMID_VERSION}),
+    MetricNode('compliance', 'analyze_compliance',
+               optional=[f"U_{p}" for p in PHASES] + ['F'], requires=['pyramid'],
+               results=['compliance'], params={'compliance': COMPLIANCE}),
+    MetricNode('demand', 'analyze_demand', columns=['P_total'],
+               optional=[f"P_{p}" for p in PHASES], requires=['segments'],
+               results=['demand'],
+               params={'windows_s': DEMAND_WINDOWS_S, 'top_n': DEMAND_TOP_N,
+                       'min_coverage': DEMAND_MIN_COVERAGE}),
+    MetricNode('events', 'analyze_events',
+               optional=[f"U_{p}{agg}" for p in PHASES for agg in ['', '_min', '_max']],
+               requires=['segments'], results=['events'], attributes=['events'],
+               params={'thresholds': VOLTAGE_EVENTS}),
+
+    # Report outputs: timeseries sheet, second pass over the harmonic
+    # columns (process_fluke --harmonics)
+    MetricNode('timeseries', None,
+               optional=[f"{q}_{p}" for q in 'PSQ' for p in ['total'] + PHASES] +
+                        ['PF_total'] + [f"U_{p}" for p in PHASES] + ['F']),
+    MetricNode('harmonics', None, optional=[f"THD_V_{p}" for p in PHASES], default=False)
+]
+
+
+class MetricScheduler:
+    """
+    Select metrics, project columns and run the dependency graph
+    """
+
+    def __init__(self,
+                 metrics: Optional[Iterable[str]] = None,
+                 skip: Iterable[str] = (),
+                 nodes: Sequence[MetricNode] = NODES):
+        """
+        Initialize scheduler
+
+        Args:
+            metrics: Metrics to run (None = all default metrics)
+            skip: Metrics not to run
+            nodes: Node definitions (graph)
+
+        Raises:
+            ValueError for unknown metric names
+        """
+
+        self.nodes: Dict[str, MetricNode] = {node.name: node for node in nodes}
+
+        names = self.metric_names(nodes)
+        unknown = [m for m in list(metrics or []) + list(skip) if m not in names]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)} "
+                             f"(choose from {', '.join(names)})")
+
+        if metrics is None:
+            metrics = [node.name for node in nodes if node.metric and node.default]
+
+        self.metrics: List[str] = [m for m in names if m in set(metrics) - set(skip)]
+        self.mapping: Optional[Mapping[str, Optional[int]]] = None
+
+    @staticmethod
+    def metric_names(nodes: Sequence[MetricNode] = NODES) -> List[str]:
+        """Names of all selectable metrics"""
+
+        return [node.name for node in nodes if node.metric]
+
+    def selected(self) -> List[str]:
+        """
+        Selected metrics with the closure of their required nodes
+
+        Returns:
+            Node names in run order (dependencies first)
+        """
+
+        needed = {n for metric in self.metrics for n in self._closure(metric)}
+
+        # Graph order of NODES is a valid topological order
+        return [name for name in self.nodes if name in needed]
+
+    def dependencies(self, name: str) -> List[str]:
+        """Nodes that must be done before name (in this selection)"""
+
+        node = self.nodes[name]
+        selected = set(self.selected())
+
+        return node.requires + [n for n in node.after if n in selected]
+
+    def resolve(self, mapping: Mapping[str, Optional[int]]) -> 'MetricScheduler':
+        """
+        Drop metrics whose columns are not mapped
+
+        Args:
+            mapping: Dict of {logical_name: column_index or None}
+
+        Returns:
+            self
+        """
+
+        self.mapping = mapping
+
+        def missing(name: str) -> List[str]:
+            return [c for c in self.nodes[name].columns if mapping.get(c) is None]
+
+        runnable = []
+        for metric in self.metrics:
+            # Intermediate nodes (e.g. PF_calc) count for the metric
+            absent = [c for n in self._closure(metric) for c in missing(n)]
+
+            if absent:
+                logger.warning(f"Metric '{metric}' skipped, columns not found: "
+                               f"{', '.join(dict.fromkeys(absent))}")
+            else:
+                runnable.append(metric)
+
+        self.metrics = runnable
+
+        return self
+
+    def _closure(self, name: str) -> List[str]:
+        """Node and all nodes it requires"""
+
+        result, stack = [], [name]
+        while stack:
+            n = stack.pop()
+            if n not in result:
+                result.append(n)
+                stack.extend(self.nodes[n].requires)
+
+        return result
+
+    def required_columns(self) -> List[str]:
+        """Columns the selected nodes cannot run without"""
+
+        columns = [c for name in self.selected() for c in self.nodes[name].columns]
+
+        return list(dict.fromkeys(columns))
+
+    def columns(self) -> List[str]:
+        """
+        Minimal column projection for the loader
+
+        Returns:
+            Logical column names the selected nodes read (optional
+            columns only if mapped, see resolve()). A metric pulled in
+            as a dependency only adds its required columns, e.g.
+            compliance alone aggregates only voltages and frequency.
+        """
+
+        columns = self.required_columns()
+
+        for name in self.selected():
+            columns += self.node_columns(name)
+
+        return list(dict.fromkeys(columns))
+
+    def node_columns(self, name: str) -> List[str]:
+        """Columns one selected node reads (see columns())"""
+
+        node = self.nodes[name]
+        optional = [] if node.metric and name not in self.metrics else node.optional
+
+        return [c for c in node.columns + optional
+                if self.mapping is None or self.mapping.get(c) is not None]
+
+    def params(self) -> Dict[str, Dict]:
+        """Parameters of the selected nodes (e.g. to check an append state)"""
+
+        return {name: {**COMMON_PARAMS, **self.nodes[name].params}
+                for name in self.selected()}
+
+    def memo_key(self, name: str, cache, data_key: str, quantiles: str) -> str:
+        """
+        Memo key of one metric's results
+
+        Args:
+            name: Metric name
+            cache: DataCache
+            data_key: Key of the input file and how it is parsed
+                      (DataCache.make_key, without column mapping)
+            quantiles: Quantile backend of the Calculator
+
+        Returns:
+            Hex key
+        """
+
+        node = self.nodes[name]
+        selected = self.selected()
+
+        # Columns (with their source index) of the node and its dependencies
+        columns = sorted({c for n in self._closure(name) for c in self.node_columns(n)} |
+                         {c for n in node.after if n in selected for c in self.node_columns(n)})
+
+        return cache.derive_key(data_key, 'metric',
+                                metric=name,
+                                columns={c: self.mapping.get(c) if self.mapping else None
+                                         for c in columns},
+                                after=[n for n in node.after if n in selected],
+                                params={**COMMON_PARAMS, **node.params},
+                                quantiles=quantiles,
+                                code=code_version())
+
+    def _restore(self, calc, name: str, entry: Dict):
+        """Put memoized outputs of a node into a Calculator"""
+
+        calc.results.update(entry['results'])
+        calc.accumulators.update(entry['accumulators'])
+
+        for attribute, value in entry['attributes'].items():
+            setattr(calc, attribute, value)
+
+    def _outputs(self, calc, name: str) -> Dict:
+        """Outputs of a node computed on a Calculator (memo entry)"""
+
+        node = self.nodes[name]
+
+        return {
+            'results': {k: calc.results[k] for k in node.results if k in calc.results},
+            'attributes': {a: getattr(calc, a) for a in node.attributes},
+            'accumulators': {a: calc.accumulators[a] for a in node.accumulators
+                             if a in calc.accumulators}
+        }
+
+    def run(self, calc, workers: int = METRIC_THREADS,
+            cache=None, data_key: Optional[str] = None) -> Dict[str, float]:
+        """
+        Run the selected nodes on a Calculator
+
+        A node starts as soon as its dependencies are done; exclusive
+        nodes wait until nothing else runs. Errors propagate.
+
+        Args:
+            calc: Calculator with the projected columns loaded
+            workers: Threads for independent nodes
+            cache: DataCache for memoized metric results (None = off)
+            data_key: Key of the input file for the memo keys (see memo_key())
+
+        Returns:
+            Dict of {node name: seconds} of the nodes computed
+        """
+
+        selected = self.selected()
+        done = {name for name in selected if self.nodes[name].method is None}
+        keys = {}
+
+        # Memoized metric results
+        if cache is not None and data_key is not None:
+            for name in selected:
+                if not self.nodes[name].memoized:
+                    continue
+
+                keys[name] = self.memo_key(name, cache, data_key, calc.quantiles)
+                entry = cache.load(keys[name])
+
+                if entry is not None:
+                    self._restore(calc, name, entry)
+                    done.add(name)
+                    logger.info(f"Metric '{name}' restored from cache")
+
+        # Intermediate results are computed only for a metric still to run;
+        # exclusive ones also shape the data (timestamps, dt, PF_calc)
+        needed = {n for name in selected if name not in done and self.nodes[name].metric
+                  for n in self._closure(name)}
+        pending = [name for name in selected if name not in done and
+                   (name in needed or self.nodes[name].exclusive)]
+
+        running = {}
+        seconds = {}
+
+        def execute(name: str) -> float:
+            node = self.nodes[name]
+            start = time.perf_counter()
+            getattr(calc, node.method)(*node.args)
+            return time.perf_counter() - start
+
+        def finish(name: str, elapsed: float):
+            done.add(name)
+            seconds[name] = elapsed
+            logger.debug(f"Metric node '{name}' done in {elapsed:.3f} s")
+
+            if name in keys:
+                cache.store(keys[name], self._outputs(calc, name))
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            while pending or running:
+                ready = [name for name in pending
+                         if all(d in done for d in self.dependencies(name))]
+                exclusive = [name for name in ready if self.nodes[name].exclusive]
+
+                if exclusive:
+                    # Runs alone in this thread once the running nodes finish
+                    if not running:
+                        name = exclusive[0]
+                        pending.remove(name)
+                        finish(name, execute(name))
+                        continue
+                else:
+                    for name in ready:
+                        pending.remove(name)
+                        running[pool.submit(execute, name)] = name
+
+                if not running:
+                    raise RuntimeError(f"Metric graph cannot progress: {', '.join(pending)}")
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    finish(running.pop(future), future.result())
+
+        return seconds
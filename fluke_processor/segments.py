@@ -0,0 +1,723 @@
+"""
+Segments module with the run-length encoded sampling table
+
+Consecutive rows with the same sampling interval Δt form a segment; the
+table stores only (first row, Δt) per segment, built in one pass over
+the timestamp diffs. A regular export is a single segment; every gap or
+change of sampling interval adds one or two.
+
+Sampling statistics, energy integration (each segment weighted with its
+own Δt), gap reporting and plotting all work on the table instead of
+re-deriving Δt from the timestamps.
+
+SegmentStats answers the same questions from running totals per Δt for
+streaming, where the table would grow with the number of rows.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+from .config import (SEGMENT_GAP_FACTOR, SEGMENT_MIN_INTERVALS, SEGMENT_DT_TOLERANCE,
+                     SEGMENT_MAX_GAPS)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DT_S = 60.0  # Sampling interval assumed when there is none (single row)
+
+
+class SegmentTable:
+    """
+    Run-length encoded (start, end, Δt) table of a timestamp column
+
+    Segment k covers rows start[k] .. end[k] - 1; Δt of a row is the time
+    since the previous row. The first row of a file has no previous row
+    and is counted with the interval that follows it.
+    """
+
+    def __init__(self):
+        self.start = np.empty(0, dtype=np.int64)     # First row of segment
+        self.dt_ns = np.empty(0, dtype=np.int64)     # Δt of every row in segment
+        self.start_ns = np.empty(0, dtype=np.int64)  # Timestamp of first row
+        self.end_ns = np.empty(0, dtype=np.int64)    # Timestamp of last row
+        self.n_rows = 0
+        self.first_row_open = False  # First row has no measured interval
+
+    @classmethod
+    def from_timestamps(cls, ts_ns: np.ndarray,
+                        prev_ns: Optional[int] = None) -> 'SegmentTable':
+        """
+        Build table from timestamps in one pass
+
+        Args:
+            ts_ns: int64 nanosecond timestamps in time order (no NaT)
+            prev_ns: Timestamp of the row before ts_ns[0] (when building
+                     chunk by chunk), None at the start of the data
+
+        Returns:
+            SegmentTable instance
+        """
+
+        table = cls()
+        n = len(ts_ns)
+
+        if n == 0:
+            return table
+
+        if prev_ns is not None:
+            row_dt = np.diff(ts_ns, prepend=np.int64(prev_ns))
+        else:
+            row_dt = np.diff(ts_ns, prepend=ts_ns[0])
+            row_dt[0] = row_dt[1] if n > 1 else 0
+            table.first_row_open = True
+
+        table.start = np.concatenate(([0], np.flatnonzero(row_dt[1:] != row_dt[:-1]) + 1))
+        table.dt_ns = row_dt[table.start]
+        table.start_ns = ts_ns[table.start]
+        table.end_ns = ts_ns[np.append(table.start[1:], n) - 1]
+        table.n_rows = n
+
+        return table
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @property
+    def end(self) -> np.ndarray:
+        """Row after the last row of each segment"""
+
+        return np.append(self.start[1:], self.n_rows)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Rows per segment"""
+
+        return np.diff(self.start, append=self.n_rows)
+
+    def append(self, other: 'SegmentTable') -> bool:
+        """
+        Append the table of the following rows (built with prev_ns)
+
+        Args:
+            other: Table of the next chunk
+
+        Returns:
+            True if the first segment of other continued the last one
+            (per-segment arrays of other then lose their first entry)
+        """
+
+        if len(other) == 0:
+            return False
+
+        if len(self) == 0:
+            self.__dict__.update({key: value.copy() if isinstance(value, np.ndarray) else value
+                                  for key, value in other.__dict__.items()})
+            return False
+
+        merged = bool(other.dt_ns[0] == self.dt_ns[-1])
+        skip = 1 if merged else 0
+
+        if merged:
+            self.end_ns[-1] = other.end_ns[0]
+
+        self.start = np.concatenate((self.start, other.start[skip:] + self.n_rows))
+        self.dt_ns = np.concatenate((self.dt_ns, other.dt_ns[skip:]))
+        self.start_ns = np.concatenate((self.start_ns, other.start_ns[skip:]))
+        self.end_ns = np.concatenate((self.end_ns, other.end_ns[skip:]))
+        self.n_rows += other.n_rows
+
+        return merged
+
+    def interval_counts(self) -> pd.Series:
+        """
+        Number of sampling intervals per Δt
+
+        Returns:
+            Series of counts indexed by Δt in seconds, most frequent first
+            (like value_counts() of the row Δt)
+        """
+
+        intervals = self.lengths
+        if self.first_row_open and len(intervals):
+            intervals = intervals.copy()
+            intervals[0] -= 1
+
+        keys, inverse = np.unique(self.dt_ns, return_inverse=True)
+        counts = np.bincount(inverse, weights=intervals, minlength=len(keys)).astype(np.int64)
+
+        series = pd.Series(counts, index=keys / 1e9, name='count')
+        series = series[series > 0].sort_values(ascending=False, kind='stable')
+        series.index.name = 'dt'
+
+        return series
+
+    def dt_mode_ns(self) -> int:
+        """Dominant sampling interval"""
+
+        counts = self.interval_counts()
+        if len(counts) == 0 or counts.index[0] <= 0:
+            return int(DEFAULT_DT_S * 1e9)
+        return int(round(counts.index[0] * 1e9))
+
+    def gap_mask(self) -> np.ndarray:
+        """
+        Segments that are gaps in the recording
+
+        A segment is a gap when its Δt exceeds SEGMENT_GAP_FACTOR × the
+        dominant Δt and it has fewer than SEGMENT_MIN_INTERVALS rows
+        (a longer run is a segment recorded with a different interval).
+        """
+
+        return ((self.dt_ns > SEGMENT_GAP_FACTOR * self.dt_mode_ns()) &
+                (self.lengths < SEGMENT_MIN_INTERVALS))
+
+    def weights_h(self) -> np.ndarray:
+        """
+        Time in hours represented by one row of each segment
+
+        The segment Δt, or the dominant Δt for gaps (a sample after a gap
+        covers one averaging interval, not the missing time) and for
+        duplicate or out-of-order timestamps.
+        """
+
+        dt_mode = self.dt_mode_ns()
+        nominal = (self.dt_ns > 0) & ~self.gap_mask()
+        return np.where(nominal, self.dt_ns, dt_mode) / 3.6e12
+
+    def row_weights_h(self, start_row: int = 0) -> np.ndarray:
+        """
+        Hours represented by every row (weights_h() expanded to rows)
+
+        Args:
+            start_row: First row to return (e.g. the rows of the last chunk)
+
+        Returns:
+            float64 array of n_rows - start_row weights
+        """
+
+        if len(self) == 0:
+            return np.empty(0)
+
+        first = int(np.searchsorted(self.start, start_row, side='right')) - 1
+        lengths = self.lengths[first:]
+        lengths[0] -= start_row - self.start[first]
+
+        return np.repeat(self.weights_h()[first:], lengths)
+
+    def sums(self, values) -> np.ndarray:
+        """
+        Sum of values per segment (NaN counted as 0)
+
+        Args:
+            values: Array-like with one value per row
+
+        Returns:
+            float64 array with one sum per segment
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+
+        if len(self) == 0:
+            return np.empty(0)
+
+        if np.isnan(values).any():
+            values = np.nan_to_num(values, nan=0.0)
+
+        return np.add.reduceat(values, self.start)
+
+    def integrate(self, values) -> float:
+        """
+        Integral of values over time in value × hours (e.g. W → Wh)
+
+        Args:
+            values: Array-like with one value per row
+
+        Returns:
+            Σ value × Δt over all rows, with per-segment Δt
+        """
+
+        return float(self.sums(values) @ self.weights_h())
+
+    def row_dt_s(self) -> np.ndarray:
+        """Δt in seconds of every row (NaN for the first row of the data)"""
+
+        dt_s = np.repeat(self.dt_ns / 1e9, self.lengths)
+        if self.first_row_open and len(dt_s):
+            dt_s[0] = np.nan
+        return dt_s
+
+    def gap_rows(self) -> np.ndarray:
+        """Rows that follow a gap"""
+
+        gaps = self.gap_mask()
+        starts, lengths = self.start[gaps], self.lengths[gaps]
+
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return np.repeat(starts, lengths) + offsets
+
+    def after_gap(self, start_row: int = 0) -> np.ndarray:
+        """
+        Boolean per row, True for rows that follow a gap
+
+        Args:
+            start_row: First row to return (e.g. the rows of the last chunk)
+
+        Returns:
+            bool array of n_rows - start_row flags
+        """
+
+        mask = np.zeros(self.n_rows - start_row, dtype=bool)
+        rows = self.gap_rows()
+        mask[rows[rows >= start_row] - start_row] = True
+
+        return mask
+
+    def quality(self) -> Dict:
+        """
+        Gap and coverage statistics
+
+        Returns:
+            Dict with number of segments and gaps, missing time, longest
+            gap and coverage (recorded / total time)
+        """
+
+        gaps = self.gap_mask()
+        lengths = self.lengths
+        dt_mode = self.dt_mode_ns()
+
+        missing_ns = float(((self.dt_ns[gaps] - dt_mode) * lengths[gaps]).sum())
+        covered_ns = float((self.weights_h() * lengths).sum() * 3.6e12)
+        total_ns = covered_ns + missing_ns
+
+        return {
+            'segments': len(self),
+            'gaps': int(lengths[gaps].sum()),
+            'gap_hours': missing_ns / 3.6e12,
+            'longest_gap_s': float(self.dt_ns[gaps].max() / 1e9) if gaps.any() else 0.0,
+            'coverage_percent': covered_ns / total_ns * 100 if total_ns > 0 else 100.0
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Table as a DataFrame
+
+        Returns:
+            DataFrame with start, end (timestamps of first and last row),
+            dt_s, rows and gap flag, one row per segment
+        """
+
+        return pd.DataFrame({
+            'start': self.start_ns.view('datetime64[ns]'),
+            'end': self.end_ns.view('datetime64[ns]'),
+            'dt_s': self.dt_ns / 1e9,
+            'rows': self.lengths,
+            'gap': self.gap_mask()
+        })
+
+
+class SegmentStats:
+    """
+    Bounded-memory segment statistics for streaming
+
+    Same questions as SegmentTable (sampling intervals, gaps, energy),
+    answered from running totals instead of one entry per segment. Rows
+    are folded into cells per Δt (intervals within SEGMENT_DT_TOLERANCE
+    of each other count as one Δt, so timestamp jitter does not split
+    the recording) and run length class (run shorter than
+    SEGMENT_MIN_INTERVALS or not). Per cell and power column both
+    Σ value × Δt and Σ value are kept, so the energy integral weights
+    every row like SegmentTable.integrate() once the dominant Δt is
+    known. Memory depends on the number of distinct intervals, not on
+    the number of rows; only the first SEGMENT_MAX_GAPS gaps are kept
+    with their times.
+
+    Row weights and gap flags (row_weights_h, after_gap) are available
+    for the rows of the last update, judged with the dominant Δt so far.
+    """
+
+    def __init__(self):
+        self.n_rows = 0
+        self.runs = 0               # Finished Δt runs
+        self.first_row_open = False
+        self.last_ns = None         # Timestamp of the last row
+
+        # Per Δt key: Δt of the first row seen, first and last timestamp
+        self.centers = np.empty(0, dtype=np.int64)
+        self.first_ns = np.empty(0, dtype=np.int64)
+        self.last_row_ns = np.empty(0, dtype=np.int64)
+
+        # Per cell [key, short run]
+        self.rows = np.zeros((0, 2), dtype=np.int64)
+        self.intervals = np.zeros((0, 2), dtype=np.int64)
+        self.dt_sum = np.zeros((0, 2))  # ns
+        self.dt_max = np.zeros((0, 2), dtype=np.int64)
+        self.sums = {}      # column → Σ value per cell
+        self.weighted = {}  # column → Σ value × Δt (ns) per cell
+
+        self.pending = None  # Run still open at the end of the data so far
+        self.gaps = []       # (start_ns, end_ns, dt_ns, rows) of the first gaps
+
+        # Rows of the last update
+        self._chunk_start = 0
+        self._chunk_weights_h = np.empty(0)
+        self._chunk_after_gap = np.empty(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return self.runs + (self.pending is not None)
+
+    def __getstate__(self) -> Dict:
+        # Per-row arrays of the last update are not part of the state
+        state = dict(self.__dict__)
+        state['_chunk_start'] = self.n_rows
+        state['_chunk_weights_h'] = np.empty(0)
+        state['_chunk_after_gap'] = np.empty(0, dtype=bool)
+        return state
+
+    def _add_key(self, dt_ns: int) -> int:
+        """New Δt key, returns its index"""
+
+        self.centers = np.append(self.centers, dt_ns)
+        self.first_ns = np.append(self.first_ns, np.iinfo(np.int64).max)
+        self.last_row_ns = np.append(self.last_row_ns, np.iinfo(np.int64).min)
+
+        row = np.zeros((1, 2))
+        self.rows = np.vstack((self.rows, row.astype(np.int64)))
+        self.intervals = np.vstack((self.intervals, row.astype(np.int64)))
+        self.dt_sum = np.vstack((self.dt_sum, row))
+        self.dt_max = np.vstack((self.dt_max, row.astype(np.int64) + np.iinfo(np.int64).min))
+
+        for cells in (self.sums, self.weighted):
+            for name in cells:
+                cells[name] = np.vstack((cells[name], row))
+
+        return len(self.centers) - 1
+
+    def _keys(self, row_dt: np.ndarray) -> np.ndarray:
+        """Δt key of every row (new keys are added)"""
+
+        unique, inverse = np.unique(row_dt, return_inverse=True)
+        ids = np.empty(len(unique), dtype=np.int64)
+
+        for i, dt in enumerate(unique.tolist()):
+            if len(self.centers):
+                distance = np.abs(self.centers - dt)
+                j = int(distance.argmin())
+                if distance[j] <= SEGMENT_DT_TOLERANCE * abs(int(self.centers[j])):
+                    ids[i] = j
+                    continue
+
+            ids[i] = self._add_key(dt)
+
+        return ids[inverse]
+
+    def _totals(self):
+        """Per-cell rows, intervals, Δt sums and the pending run's key/class"""
+
+        rows, intervals, dt_sum = self.rows.copy(), self.intervals.copy(), self.dt_sum.copy()
+
+        if self.pending is not None:
+            cell = (self.pending['key'], int(self.pending['rows'] < SEGMENT_MIN_INTERVALS))
+            rows[cell] += self.pending['rows']
+            intervals[cell] += self.pending['intervals']
+            dt_sum[cell] += self.pending['dt_sum']
+
+        return rows, intervals, dt_sum
+
+    def key_dt_ns(self) -> np.ndarray:
+        """Mean Δt of every key, rounded to milliseconds"""
+
+        rows, _, dt_sum = self._totals()
+        n = rows.sum(axis=1)
+
+        mean = np.where(n > 0, dt_sum.sum(axis=1) / np.maximum(n, 1), self.centers)
+        return (np.round(mean / 1e6) * 1e6).astype(np.int64)
+
+    def interval_counts(self) -> pd.Series:
+        """
+        Number of sampling intervals per Δt
+
+        Returns:
+            Series of counts indexed by Δt in seconds, most frequent first
+        """
+
+        _, intervals, _ = self._totals()
+        keys = self.key_dt_ns()
+        order = np.argsort(keys, kind='stable')
+
+        series = pd.Series(intervals.sum(axis=1)[order], index=keys[order] / 1e9, name='count')
+        series = series[series > 0].sort_values(ascending=False, kind='stable')
+        series.index.name = 'dt'
+
+        return series
+
+    def dt_mode_ns(self) -> int:
+        """Dominant sampling interval"""
+
+        counts = self.interval_counts()
+        if len(counts) == 0 or counts.index[0] <= 0:
+            return int(DEFAULT_DT_S * 1e9)
+        return int(round(counts.index[0] * 1e9))
+
+    def _gap_cells(self, dt_mode: int) -> np.ndarray:
+        """Cells that are gaps (short runs of a Δt above the gap threshold)"""
+
+        gaps = np.zeros(self.rows.shape, dtype=bool)
+        gaps[:, 1] = self.key_dt_ns() > SEGMENT_GAP_FACTOR * dt_mode
+        return gaps
+
+    def update(self, ts_ns: np.ndarray, columns: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Add the timestamps (and power columns to integrate) of the next rows
+
+        Args:
+            ts_ns: int64 nanosecond timestamps in time order (no NaT)
+            columns: Dict of {column name: values per row} for integrate()
+        """
+
+        n = len(ts_ns)
+        columns = columns or {}
+
+        self._chunk_start = self.n_rows
+        self._chunk_weights_h = np.empty(0)
+        self._chunk_after_gap = np.empty(0, dtype=bool)
+
+        if n == 0:
+            return
+
+        first_open = self.last_ns is None
+        if first_open:
+            row_dt = np.diff(ts_ns, prepend=ts_ns[0])
+            row_dt[0] = row_dt[1] if n > 1 else 0
+            self.first_row_open = True
+        else:
+            row_dt = np.diff(ts_ns, prepend=np.int64(self.last_ns))
+
+        self.n_rows += n
+        self.last_ns = int(ts_ns[-1])
+
+        for name in columns:
+            for cells in (self.sums, self.weighted):
+                cells.setdefault(name, np.zeros(self.rows.shape))
+
+        # Δt runs of the chunk (key changes)
+        keys = self._keys(row_dt)
+        starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+        lengths = np.diff(starts, append=n)
+
+        intervals = lengths.copy()
+        if first_open:
+            intervals[0] -= 1
+
+        values = {name: np.nan_to_num(np.asarray(v, dtype=np.float64), nan=0.0)
+                  for name, v in columns.items()}
+
+        runs = {
+            'key': keys[starts],
+            'rows': lengths.copy(),
+            'intervals': intervals,
+            'dt_sum': np.add.reduceat(row_dt.astype(np.float64), starts),
+            'dt_max': np.maximum.reduceat(row_dt, starts),
+            'start_ns': ts_ns[starts],
+            'end_ns': ts_ns[np.append(starts[1:], n) - 1],
+            'sums': {name: np.add.reduceat(v, starts) for name, v in values.items()},
+            'weighted': {name: np.add.reduceat(v * row_dt, starts) for name, v in values.items()}
+        }
+
+        # The open run of the previous rows continues or is finished
+        pending = self.pending
+
+        if pending is not None and self.first_row_open and self.n_rows == n + 1:
+            # A lone first row takes the interval that follows it
+            pending.update(key=keys[0], dt_sum=float(row_dt[0]), dt_max=int(row_dt[0]),
+                           weighted={name: v * row_dt[0] for name, v in pending['sums'].items()})
+        if pending is not None and pending['key'] == runs['key'][0]:
+            runs['rows'][0] += pending['rows']
+            runs['intervals'][0] += pending['intervals']
+            runs['dt_sum'][0] += pending['dt_sum']
+            runs['dt_max'][0] = max(runs['dt_max'][0], pending['dt_max'])
+            runs['start_ns'][0] = pending['start_ns']
+            for part in ('sums', 'weighted'):
+                for name in runs[part]:
+                    runs[part][name][0] += pending[part].get(name, 0.0)
+            pending = None
+
+        run_rows = runs['rows']  # Total rows of the chunk's runs
+
+        # Chunk rows: Δt weights and gap flags with the dominant Δt so far
+        self.pending = {field: (value[-1] if not isinstance(value, dict) else
+                                {name: v[-1] for name, v in value.items()})
+                        for field, value in runs.items()}
+        self._finish_runs(pending, {field: (value[:-1] if not isinstance(value, dict) else
+                                            {name: v[:-1] for name, v in value.items()})
+                                    for field, value in runs.items()})
+
+        dt_mode = self.dt_mode_ns()
+        short = np.repeat(run_rows < SEGMENT_MIN_INTERVALS, lengths)
+        after_gap = (row_dt > SEGMENT_GAP_FACTOR * dt_mode) & short
+
+        self._chunk_after_gap = after_gap
+        self._chunk_weights_h = np.where((row_dt > 0) & ~after_gap, row_dt, dt_mode) / 3.6e12
+
+    def _finish_runs(self, pending: Optional[Dict], runs: Dict):
+        """Add finished runs (and the previous open run) to the cells"""
+
+        for run in ([pending] if pending is not None else []) + [runs]:
+            keys = np.atleast_1d(run['key'])
+            if len(keys) == 0:
+                continue
+
+            rows = np.atleast_1d(run['rows'])
+            short = (rows < SEGMENT_MIN_INTERVALS).astype(np.int64)
+            cell = (keys, short)
+
+            np.add.at(self.rows, cell, rows)
+            np.add.at(self.intervals, cell, np.atleast_1d(run['intervals']))
+            np.add.at(self.dt_sum, cell, np.atleast_1d(run['dt_sum']))
+            np.maximum.at(self.dt_max, cell, np.atleast_1d(run['dt_max']))
+            np.minimum.at(self.first_ns, keys, np.atleast_1d(run['start_ns']))
+            np.maximum.at(self.last_row_ns, keys, np.atleast_1d(run['end_ns']))
+
+            for part in ('sums', 'weighted'):
+                for name, values in run[part].items():
+                    np.add.at(getattr(self, part)[name], cell, np.atleast_1d(values))
+
+            self.runs += len(keys)
+
+            # Gap candidates with the dominant Δt so far (checked again on report)
+            if len(self.gaps) < SEGMENT_MAX_GAPS:
+                dt = np.atleast_1d(run['dt_sum']) / rows
+                candidates = np.flatnonzero(short.astype(bool) &
+                                            (dt > SEGMENT_GAP_FACTOR * self.dt_mode_ns()))
+
+                for i in candidates[:SEGMENT_MAX_GAPS - len(self.gaps)].tolist():
+                    self.gaps.append((int(np.atleast_1d(run['start_ns'])[i]),
+                                      int(np.atleast_1d(run['end_ns'])[i]),
+                                      int(dt[i]), int(rows[i])))
+
+    def row_weights_h(self, start_row: int = 0) -> np.ndarray:
+        """
+        Hours represented by the rows of the last update
+
+        Args:
+            start_row: First row to return (within the last update)
+
+        Returns:
+            float64 array of n_rows - start_row weights
+        """
+
+        return self._chunk_weights_h[self._chunk_row(start_row):]
+
+    def after_gap(self, start_row: int = 0) -> np.ndarray:
+        """
+        Boolean per row of the last update, True for rows that follow a gap
+
+        Args:
+            start_row: First row to return (within the last update)
+
+        Returns:
+            bool array of n_rows - start_row flags
+        """
+
+        return self._chunk_after_gap[self._chunk_row(start_row):]
+
+    def _chunk_row(self, start_row: int) -> int:
+        if start_row < self._chunk_start:
+            raise ValueError(f"Row {start_row} is before the last update "
+                             f"(rows from {self._chunk_start} are kept)")
+        return start_row - self._chunk_start
+
+    def _cells(self, part: str, name: str) -> np.ndarray:
+        """Per-cell sums of a column including the open run"""
+
+        cells = getattr(self, part)[name].copy()
+
+        if self.pending is not None:
+            cell = (self.pending['key'], int(self.pending['rows'] < SEGMENT_MIN_INTERVALS))
+            cells[cell] += self.pending[part].get(name, 0.0)
+
+        return cells
+
+    def integrate(self, name: str) -> float:
+        """
+        Integral of a column over time in value × hours (e.g. W → Wh)
+
+        Args:
+            name: Column passed to update()
+
+        Returns:
+            Σ value × Δt over all rows (dominant Δt for gaps, duplicate
+            and out-of-order rows)
+        """
+
+        dt_mode = self.dt_mode_ns()
+        nominal = (self.key_dt_ns()[:, None] > 0) & ~self._gap_cells(dt_mode)
+
+        total = np.where(nominal, self._cells('weighted', name),
+                         self._cells('sums', name) * dt_mode).sum()
+
+        return float(total) / 3.6e12
+
+    def quality(self) -> Dict:
+        """
+        Gap and coverage statistics (same keys as SegmentTable.quality)
+        """
+
+        dt_mode = self.dt_mode_ns()
+        rows, _, dt_sum = self._totals()
+        gaps = self._gap_cells(dt_mode)
+        nominal = (self.key_dt_ns()[:, None] > 0) & ~gaps
+
+        gaps &= rows > 0
+
+        missing_ns = float((dt_sum[gaps] - rows[gaps] * dt_mode).sum())
+        covered_ns = float(np.where(nominal, dt_sum, rows * dt_mode).sum())
+        total_ns = covered_ns + missing_ns
+
+        dt_max = self.dt_max.copy()
+        if self.pending is not None:
+            cell = (self.pending['key'], int(self.pending['rows'] < SEGMENT_MIN_INTERVALS))
+            dt_max[cell] = max(dt_max[cell], self.pending['dt_max'])
+
+        return {
+            'segments': len(self),
+            'gaps': int(rows[gaps].sum()),
+            'gap_hours': missing_ns / 3.6e12,
+            'longest_gap_s': float(dt_max[gaps].max() / 1e9) if gaps.any() else 0.0,
+            'coverage_percent': covered_ns / total_ns * 100 if total_ns > 0 else 100.0
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Summary as a DataFrame (same columns as SegmentTable.to_frame)
+
+        Returns:
+            DataFrame with one row per Δt (first and last timestamp of
+            its rows, rows outside gaps) and one per kept gap
+        """
+
+        dt_mode = self.dt_mode_ns()
+        rows, _, _ = self._totals()
+        gaps = self._gap_cells(dt_mode)
+        keys = self.key_dt_ns()
+
+        first_ns, last_ns = self.first_ns.copy(), self.last_row_ns.copy()
+        if self.pending is not None:
+            key = self.pending['key']
+            first_ns[key] = min(first_ns[key], self.pending['start_ns'])
+            last_ns[key] = max(last_ns[key], self.pending['end_ns'])
+
+        regular = np.where(gaps, 0, rows).sum(axis=1)
+        keep = regular > 0
+
+        kept_gaps = [gap for gap in self.gaps if gap[2] > SEGMENT_GAP_FACTOR * dt_mode]
+        gap_rows = np.array(kept_gaps, dtype=np.int64).reshape(-1, 4)
+
+        df = pd.DataFrame({
+            'start': np.concatenate((first_ns[keep], gap_rows[:, 0])).view('datetime64[ns]'),
+            'end': np.concatenate((last_ns[keep], gap_rows[:, 1])).view('datetime64[ns]'),
+            'dt_s': np.concatenate((keys[keep], gap_rows[:, 2])) / 1e9,
+            'rows': np.concatenate((regular[keep], gap_rows[:, 3])),
+            'gap': np.concatenate((np.zeros(keep.sum(), dtype=bool), np.ones(len(gap_rows), dtype=bool)))
+        })
+
+        return df.sort_values('start', kind='stable', ignore_index=True)
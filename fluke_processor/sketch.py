@@ -0,0 +1,550 @@
+"""
+Sketch module with mergeable summary accumulators
+
+- RunningStats: count, sum, min, max and Welford mean/variance
+- QuantileSketch: log-bucket quantile sketch with bounded relative error
+- QuantileSketchArray: dense QuantileSketch per channel (many at once)
+- ExactQuantiles: exact backend with the same interface
+- ErrorAccumulator: mean/p50/p95/max of an error vector on either backend
+
+All accept NumPy arrays chunk by chunk, can be merged (chunks, files,
+sites) and serialized to plain dicts (JSON compatible).
+"""
+
+import math
+import numpy as np
+from typing import Dict, Optional
+
+# Default relative accuracy of QuantileSketch (1%)
+SKETCH_ALPHA = 0.01
+
+# Values with smaller magnitude are counted as zero
+SKETCH_MIN_VALUE = 1e-12
+
+
+class RunningStats:
+    """
+    Online count/sum/min/max/mean/std (NaN values are skipped)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from mean
+
+    def update(self, values) -> 'RunningStats':
+        """
+        Add a chunk of values
+
+        Args:
+            values: Array-like of numbers
+
+        Returns:
+            self
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+
+        n = values.size
+        if n == 0:
+            return self
+
+        chunk_mean = values.mean()
+        chunk = RunningStats()
+        chunk.count = n
+        chunk.sum = float(values.sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        chunk.mean = float(chunk_mean)
+        chunk.m2 = float(((values - chunk_mean) ** 2).sum())
+
+        return self.merge(chunk)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """
+        Merge another accumulator into this one (Chan et al.)
+
+        Returns:
+            self
+        """
+
+        if other.count == 0:
+            return self
+
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+
+        n = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / n
+        self.count = n
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        return self
+
+    def get_std(self, ddof: int = 1) -> float:
+        """Standard deviation (sample std by default, like pandas)"""
+
+        if self.count <= ddof:
+            return math.nan
+        return math.sqrt(self.m2 / (self.count - ddof))
+
+    def get_mean(self) -> float:
+        return self.mean if self.count else math.nan
+
+    def get_min(self) -> float:
+        return self.min if self.count else math.nan
+
+    def get_max(self) -> float:
+        return self.max if self.count else math.nan
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RunningStats':
+        stats = cls()
+        stats.__dict__.update(data)
+        return stats
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with bounded relative error
+
+    Values are counted in logarithmic buckets (DDSketch layout): every
+    bucket value is within `alpha` relative error of the samples it holds.
+    Memory depends on the value range, not on the number of samples
+    (a few hundred buckets for typical error vectors).
+    """
+
+    def __init__(self, alpha: float = SKETCH_ALPHA):
+        """
+        Initialize sketch
+
+        Args:
+            alpha: Relative accuracy (0.01 = 1%)
+        """
+
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+
+        self.count = 0
+        self.zero_count = 0
+        self.positive = {}  # bucket key → count
+        self.negative = {}  # bucket key of |x| → count
+
+    def _add_to_store(self, store: Dict[int, int], magnitudes: np.ndarray):
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        unique, counts = np.unique(keys, return_counts=True)
+
+        for key, count in zip(unique.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+    def update(self, values) -> 'QuantileSketch':
+        """
+        Add a chunk of values (NaN values are skipped)
+
+        Returns:
+            self
+        """
+
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+
+        if values.size == 0:
+            return self
+
+        self.count += int(values.size)
+
+        small = np.abs(values) < SKETCH_MIN_VALUE
+        self.zero_count += int(small.sum())
+
+        pos = values[(values > 0) & ~small]
+        neg = values[(values < 0) & ~small]
+
+        if pos.size:
+            self._add_to_store(self.positive, pos)
+        if neg.size:
+            self._add_to_store(self.negative, -neg)
+
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """
+        Merge another sketch into this one
+
+        Returns:
+            self
+        """
+
+        if other.alpha != self.alpha:
+            raise ValueError(f"Cannot merge sketches with different alpha "
+                             f"({self.alpha} vs {other.alpha})")
+
+        self.count += other.count
+        self.zero_count += other.zero_count
+
+        for store, other_store in ((self.positive, other.positive),
+                                   (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+
+        return self
+
+    def _value(self, key: int) -> float:
+        """Representative value of a bucket"""
+
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _buckets(self):
+        """Yield (value, count) in ascending value order"""
+
+        for key in sorted(self.negative, reverse=True):
+            yield -self._value(key), self.negative[key]
+
+        if self.zero_count:
+            yield 0.0, self.zero_count
+
+        for key in sorted(self.positive):
+            yield self._value(key), self.positive[key]
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate quantile
+
+        Interpolates linearly between the two neighbouring ranks, like
+        pandas' default quantile().
+
+        Args:
+            q: Quantile in [0, 1]
+
+        Returns:
+            Estimated value (NaN for an empty sketch)
+        """
+
+        if self.count == 0:
+            return math.nan
+
+        rank = q * (self.count - 1)
+        lower_rank = math.floor(rank)
+        frac = rank - lower_rank
+
+        lower = None
+        seen = 0
+
+        for value, count in self._buckets():
+            seen += count
+            if lower is None and seen > lower_rank:
+                lower = value
+            if lower is not None and (frac == 0 or seen > lower_rank + 1):
+                return lower + frac * (value - lower)
+
+        return lower
+
+    def to_dict(self) -> Dict:
+        """Serialize to a JSON compatible dict"""
+
+        return {
+            'alpha': self.alpha,
+            'count': self.count,
+            'zero_count': self.zero_count,
+            'positive': sorted(self.positive.items()),
+            'negative': sorted(self.negative.items())
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'QuantileSketch':
+        """Restore sketch from to_dict() output"""
+
+        sketch = cls(alpha=data['alpha'])
+        sketch.count = data['count']
+        sketch.zero_count = data['zero_count']
+        sketch.positive = {int(k): int(c) for k, c in data['positive']}
+        sketch.negative = {int(k): int(c) for k, c in data['negative']}
+        return sketch
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class QuantileSketchArray:
+    """
+    Log-bucket quantile sketches of many channels in one dense array
+
+    Same bucket layout as QuantileSketch, for non-negative values in a
+    known range: counts are kept as a (channels, buckets) array, so a chunk
+    of all channels is added with a single bincount. Values below
+    min_value count as zero, values above max_value fall into the top
+    bucket.
+    """
+
+    def __init__(self, channels: int,
+                 min_value: float = 1e-3,
+                 max_value: float = 1e3,
+                 alpha: float = SKETCH_ALPHA):
+        """
+        Initialize sketches
+
+        Args:
+            channels: Number of independent sketches
+            min_value: Smallest non-zero value resolved
+            max_value: Largest value resolved
+            alpha: Relative accuracy (0.01 = 1%)
+        """
+
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+
+        self.min_value = min_value
+        self.max_value = max_value
+        self.key_min = math.floor(math.log(min_value) / self._log_gamma)
+        self.key_max = math.ceil(math.log(max_value) / self._log_gamma)
+
+        # Bucket 0 holds zeros, bucket i > 0 the key key_min + i - 1
+        self.counts = np.zeros((channels, self.key_max - self.key_min + 2), dtype=np.int64)
+
+    @property
+    def channels(self) -> int:
+        return self.counts.shape[0]
+
+    def update(self, values) -> 'QuantileSketchArray':
+        """
+        Add a chunk of values (NaN values are skipped)
+
+        Args:
+            values: Array shaped (rows, channels), float32 or float64
+
+        Returns:
+            self
+        """
+
+        values = np.asarray(values).reshape(-1, self.channels)
+        n_buckets = self.counts.shape[1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            keys = np.ceil(np.log(values) / values.dtype.type(self._log_gamma))
+
+        buckets = np.clip(keys - (self.key_min - 1), 1, n_buckets - 1)
+        valid = ~np.isnan(values)
+        buckets[(values < self.min_value) | ~valid] = 0
+
+        index = (buckets.astype(np.int64) + np.arange(self.channels) * n_buckets)[valid]
+
+        self.counts += np.bincount(index, minlength=self.counts.size).reshape(self.counts.shape)
+
+        return self
+
+    def merge(self, other: 'QuantileSketchArray') -> 'QuantileSketchArray':
+        """
+        Merge sketches of the same layout (e.g. another chunk or file)
+
+        Returns:
+            self
+        """
+
+        if (other.alpha, other.key_min, other.counts.shape) != (self.alpha, self.key_min, self.counts.shape):
+            raise ValueError("Cannot merge sketch arrays with different layout")
+
+        self.counts += other.counts
+        return self
+
+    def count(self) -> np.ndarray:
+        """Number of values per channel"""
+
+        return self.counts.sum(axis=1)
+
+    def quantile(self, q: float) -> np.ndarray:
+        """
+        Estimate quantile of every channel
+
+        Interpolates between the two neighbouring ranks like
+        QuantileSketch.quantile().
+
+        Args:
+            q: Quantile in [0, 1]
+
+        Returns:
+            float64 array with one value per channel (NaN if empty)
+        """
+
+        count = self.count()
+        cumulative = np.cumsum(self.counts, axis=1)
+
+        rank = q * np.maximum(count - 1, 0)
+        lower_rank = np.floor(rank)
+        frac = rank - lower_rank
+
+        # First bucket whose cumulative count exceeds the rank
+        last = self.counts.shape[1] - 1
+        lower = np.minimum((cumulative <= lower_rank[:, None]).sum(axis=1), last)
+        upper = np.minimum((cumulative <= lower_rank[:, None] + 1).sum(axis=1), last)
+
+        keys = np.arange(self.key_min - 1, self.key_max + 1)
+        values = 2 * self.gamma ** keys.astype(np.float64) / (self.gamma + 1)
+        values[0] = 0.0
+
+        result = values[lower] + frac * (values[upper] - values[lower])
+        result[count == 0] = np.nan
+
+        return result
+
+    def to_dict(self) -> Dict:
+        """Serialize to a JSON compatible dict"""
+
+        return {
+            'alpha': self.alpha,
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'counts': self.counts.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'QuantileSketchArray':
+        """Restore sketches from to_dict() output"""
+
+        sketches = cls(len(data['counts']), data['min_value'], data['max_value'], data['alpha'])
+        sketches.counts = np.asarray(data['counts'], dtype=np.int64).reshape(sketches.counts.shape)
+        return sketches
+
+
+class ExactQuantiles:
+    """
+    Exact quantiles: keeps all values (8 bytes per sample)
+
+    Same interface as QuantileSketch, for use as the exact backend.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.count = 0
+
+    def update(self, values) -> 'ExactQuantiles':
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+
+        if values.size:
+            self._chunks.append(values)
+            self.count += int(values.size)
+
+        return self
+
+    def merge(self, other: 'ExactQuantiles') -> 'ExactQuantiles':
+        self._chunks.extend(other._chunks)
+        self.count += other.count
+        return self
+
+    def values(self) -> np.ndarray:
+        """All values collected so far"""
+
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+        return self._chunks[0] if self._chunks else np.empty(0)
+
+    def quantile(self, q: float) -> float:
+        """Exact quantile with linear interpolation (like pandas)"""
+
+        if self.count == 0:
+            return math.nan
+        return float(np.quantile(self.values(), q))
+
+    def to_dict(self) -> Dict:
+        return {'values': self.values().tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ExactQuantiles':
+        return cls().update(data['values'])
+
+    def __len__(self) -> int:
+        return self.count
+
+
+QUANTILE_BACKENDS = {
+    'exact': ExactQuantiles,
+    'sketch': QuantileSketch
+}
+
+
+class ErrorAccumulator:
+    """
+    Mean/p50/p95/max of an error vector with a pluggable quantile backend
+
+    Mergeable and serializable; with the 'sketch' backend the state is a
+    few KB regardless of the number of samples.
+    """
+
+    def __init__(self, backend: str = 'sketch'):
+        """
+        Initialize accumulator
+
+        Args:
+            backend: Quantile backend name from QUANTILE_BACKENDS
+        """
+
+        if backend not in QUANTILE_BACKENDS:
+            raise ValueError(f"Unknown quantile backend '{backend}' "
+                             f"(choose from {', '.join(QUANTILE_BACKENDS)})")
+
+        self.backend = backend
+        self.stats = RunningStats()
+        self.quantiles = QUANTILE_BACKENDS[backend]()
+
+    def update(self, values) -> 'ErrorAccumulator':
+        self.stats.update(values)
+        self.quantiles.update(values)
+        return self
+
+    def merge(self, other: 'ErrorAccumulator') -> 'ErrorAccumulator':
+        if other.backend != self.backend:
+            raise ValueError(f"Cannot merge '{other.backend}' into '{self.backend}' accumulator")
+
+        self.stats.merge(other.stats)
+        self.quantiles.merge(other.quantiles)
+        return self
+
+    def summary(self) -> Dict[str, float]:
+        """Dict with mean, p50, p95, max (NaN if empty)"""
+
+        return {
+            'mean': self.stats.get_mean(),
+            'p50': self.quantiles.quantile(0.50),
+            'p95': self.quantiles.quantile(0.95),
+            'max': self.stats.get_max()
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'backend': self.backend,
+            'stats': self.stats.to_dict(),
+            'quantiles': self.quantiles.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ErrorAccumulator':
+        acc = cls(backend=data['backend'])
+        acc.stats = RunningStats.from_dict(data['stats'])
+        acc.quantiles = QUANTILE_BACKENDS[data['backend']].from_dict(data['quantiles'])
+        return acc
+
+
+def merge_all(items) -> Optional[object]:
+    """Merge a sequence of accumulators of the same type (copies the first)"""
+
+    result = None
+    for item in items:
+        if result is None:
+            result = type(item).from_dict(item.to_dict())
+        else:
+            result.merge(item)
+    return result
@@ -0,0 +1,505 @@
+"""
+Streaming module for bounded-memory analysis
+
+StreamingCalculator computes the Calculator metrics chunk by chunk:
+every chunk updates online accumulators (running sums, min/max, Welford
+mean/std, quantile sketches by default) and is then dropped. Memory use depends on
+the chunk size, not on the number of rows in the file (plus the finest
+aggregation pyramid level, one bin per minute of measurement). Sampling
+intervals, gaps and energy are kept as running totals per Δt
+(SegmentStats), not per segment.
+
+Rows are expected in time order (as exported by the instrument); they
+are not sorted across chunks.
+"""
+
+import math
+import logging
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional
+from .config import THRESHOLDS, STREAMING_COMPACT_CHUNKS
+from .calculator import Calculator, _log_compliance, _log_events, _log_harmonics
+from .sketch import RunningStats, ErrorAccumulator
+from .segments import SegmentStats
+from .pyramid import AggregationPyramid, check_compliance, rollup
+from .events import EventTable
+from .harmonics import HarmonicDecoder, HarmonicAnalyzer
+from .timestamps import TimestampParser, check_order, MAX_REPORTED_BREAKS
+
+logger = logging.getLogger(__name__)
+
+PHASES = ['L1N', 'L2N', 'L3N']
+
+
+def _prefixed(summary: Dict, prefix: str, suffix: str = '') -> Dict:
+    """Summary keys in Calculator layout, e.g. rel_err_p95"""
+
+    return {f"{prefix}_{key}{suffix}": value for key, value in summary.items()}
+
+
+class StreamingCalculator:
+    """
+    Calculate energy, power quality metrics and validations in one pass
+    over data chunks
+    """
+
+    def __init__(self, quantiles: str = 'sketch', metrics: Optional[Iterable[str]] = None):
+        """
+        Initialize calculator
+
+        Args:
+            quantiles: Quantile backend for p50/p95 metrics: 'sketch'
+                       (bounded memory) or 'exact' (keeps error vectors)
+            metrics: Metrics and intermediate results to compute
+                     (MetricScheduler.selected()); None = all
+        """
+
+        self.results = {}
+        self.quantiles = quantiles
+        self.metrics = None if metrics is None else set(metrics)
+
+        self.timestamp_parser = None
+        self.total_rows = 0
+        self.invalid_rows = 0
+        self.order_breaks = 0
+        self.duplicates = 0
+        self.breaks = []  # First MAX_REPORTED_BREAKS order breaks
+
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.min_timestamp = None
+        self.max_timestamp = None
+
+        self.segments = SegmentStats()  # Δt totals and energy sums
+        self.columns = set()
+
+        self.power = {}        # column → RunningStats
+        self.pyramid = AggregationPyramid()
+        self.pyramid_blocks = []  # Finest-level aggregates per chunk
+        self.events = None        # EventTable, extended chunk by chunk
+        self.harmonics = None     # HarmonicAnalyzer (analyze_harmonics)
+        self.pf_calc = RunningStats()
+        self.pf_measured = RunningStats()
+        self.pf_diff = ErrorAccumulator(quantiles)
+        self.balance = {}      # 'P' / 'S' → ErrorAccumulator
+        self.vector = ErrorAccumulator(quantiles)
+        self.frequency = RunningStats()
+        self.imbalance = ErrorAccumulator(quantiles)
+
+    def _enabled(self, metric: str) -> bool:
+        """Whether a metric (or intermediate result) is selected"""
+
+        return self.metrics is None or metric in self.metrics
+
+    def _parse_timestamp(self, chunk: pd.DataFrame,
+                         date_col: str, time_col: str) -> pd.Series:
+        """Timestamps of a chunk (format sniffed on the first chunk)"""
+
+        if 'timestamp' in chunk.columns:
+            return chunk['timestamp']
+
+        if self.timestamp_parser is None:
+            self.timestamp_parser = TimestampParser.sniff(chunk[date_col], chunk[time_col])
+
+        return self.timestamp_parser.parse(chunk[date_col], chunk[time_col])
+
+    def update(self, chunk: pd.DataFrame,
+               date_col: str = 'datum', time_col: str = 'cas'):
+        """
+        Update all accumulators with one chunk
+
+        Args:
+            chunk: DataFrame chunk with logical column names
+            date_col: Name of date column
+            time_col: Name of time column
+        """
+
+        ts = self._parse_timestamp(chunk, date_col, time_col)
+
+        valid = ts.notna().to_numpy()
+        self.invalid_rows += int((~valid).sum())
+
+        chunk = chunk[valid]
+        ts = ts[valid]
+
+        if len(chunk) == 0:
+            return
+
+        self.columns.update(chunk.columns)
+        row_offset = self.total_rows
+        self.total_rows += len(chunk)
+
+        # Sampling interval and time order, continued across chunk boundaries
+        ts_ns = ts.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+        def col(name):
+            return chunk[name].to_numpy(dtype=np.float64)
+
+        power_cols = [name for name in ['P_total'] + [f"P_{p}" for p in PHASES]
+                      if name in chunk.columns and self._enabled('energy')]
+        self.segments.update(ts_ns, {name: col(name) for name in power_cols})
+
+        prev_ns = self.last_timestamp.value if self.last_timestamp is not None else None
+        if prev_ns is not None:
+            ts_ns = np.concatenate(([prev_ns], ts_ns))
+            row_offset -= 1
+
+        order = check_order(ts_ns, MAX_REPORTED_BREAKS - len(self.breaks))
+        self.order_breaks += order['order_breaks']
+        self.duplicates += order['duplicates']
+
+        for b in order['breaks']:
+            self.breaks.append({**b, 'row': b['row'] + row_offset})
+
+        first, last = ts.iloc[0], ts.iloc[-1]
+        if self.first_timestamp is None:
+            self.first_timestamp = first
+        self.last_timestamp = last
+
+        ts_min, ts_max = ts.min(), ts.max()
+        self.min_timestamp = ts_min if self.min_timestamp is None else min(self.min_timestamp, ts_min)
+        self.max_timestamp = ts_max if self.max_timestamp is None else max(self.max_timestamp, ts_max)
+
+        # Finest pyramid level; Δt weights use the dominant Δt seen so far
+        if self._enabled('pyramid'):
+            pyramid_columns = AggregationPyramid.frame_columns(chunk)
+            if 'P_total' in chunk.columns and 'S_total' in chunk.columns and self._enabled('PF_calc'):
+                pyramid_columns['PF_calc'] = np.clip(col('P_total') / (col('S_total') + 1e-6), -1, 1)
+
+            self.pyramid_blocks.append(self.pyramid.aggregate(
+                ts_ns[-len(chunk):], pyramid_columns, self.segments))
+
+            if len(self.pyramid_blocks) >= STREAMING_COMPACT_CHUNKS:
+                self.compact()
+
+        # Energy (integrated by self.segments) and power statistics
+        for name in power_cols:
+            self.power.setdefault(name, RunningStats()).update(col(name))
+
+        # Power factor
+        if 'P_total' in chunk.columns and 'S_total' in chunk.columns and self._enabled('pf'):
+            pf_calc = np.clip(col('P_total') / (col('S_total') + 1e-6), -1, 1)
+            self.pf_calc.update(pf_calc)
+
+            if 'PF_total' in chunk.columns:
+                pf_measured = col('PF_total')
+                self.pf_measured.update(pf_measured)
+                self.pf_diff.update(np.abs(pf_measured - pf_calc))
+
+        # Power balance: sum of phases vs total
+        for quantity in ['P', 'S']:
+            cols = [f"{quantity}_{p}" for p in PHASES]
+            total_col = f"{quantity}_total"
+
+            if all(c in chunk.columns for c in cols + [total_col]) and self._enabled('balance'):
+                phase_sum = chunk[cols].sum(axis=1).to_numpy(dtype=np.float64)
+                total = col(total_col)
+                rel_err = np.abs(phase_sum - total) / (np.abs(total) + 1e-6)
+                self.balance.setdefault(quantity, ErrorAccumulator(self.quantiles)).update(rel_err)
+
+        # Vector validation S² = P² + Q²
+        if all(c in chunk.columns for c in ['P_total', 'Q_total', 'S_total']) and self._enabled('vector'):
+            S = col('S_total')
+            S_calc = np.sqrt(col('P_total') ** 2 + col('Q_total') ** 2)
+            mask = S > 1
+            self.vector.update(np.abs(S[mask] - S_calc[mask]) / S[mask])
+
+        # Frequency
+        if 'F' in chunk.columns and self._enabled('frequency'):
+            self.frequency.update(col('F'))
+
+        # Voltage imbalance
+        voltage_cols = [f"U_{p}" for p in PHASES]
+        if all(c in chunk.columns for c in voltage_cols) and self._enabled('imbalance'):
+            U = chunk[voltage_cols].to_numpy(dtype=np.float64)
+            with warnings.catch_warnings():
+                # All-NaN rows stay NaN
+                warnings.simplefilter('ignore', RuntimeWarning)
+                U_avg = np.nanmean(U, axis=1, keepdims=True)
+                max_imb = np.nanmax(np.abs(U - U_avg) / U_avg * 100, axis=1)
+            self.imbalance.update(max_imb)
+
+        # Voltage events (open events continue into the next chunk)
+        if all(c in chunk.columns for c in voltage_cols) and self._enabled('events'):
+            self._update_events(chunk, ts_ns[-len(chunk):])
+
+    def _update_events(self, chunk: pd.DataFrame, ts_ns: np.ndarray):
+        """Detect voltage events of a chunk and append them to self.events"""
+
+        def column(name: str) -> np.ndarray:
+            return chunk[name if name in chunk.columns else name.rsplit('_', 1)[0]].to_numpy(
+                dtype=np.float64, na_value=np.nan)
+
+        start_row = self.segments.n_rows - len(chunk)
+        after_gap = self.segments.after_gap(start_row)
+
+        events = EventTable.detect(ts_ns,
+                                   {p: column(f"U_{p}_min") for p in PHASES},
+                                   {p: column(f"U_{p}_max") for p in PHASES},
+                                   self.segments.row_weights_h(start_row),
+                                   after_gap)
+
+        if self.events is None:
+            self.events = events
+        else:
+            self.events.append(events, continues=not after_gap[0])
+
+    def consume(self, chunks: Iterable[pd.DataFrame],
+                date_col: str = 'datum', time_col: str = 'cas') -> Dict:
+        """
+        Update accumulators with all chunks and compute results
+
+        Args:
+            chunks: Iterable of DataFrame chunks (e.g. DataLoader.iter_with_mapping)
+            date_col: Name of date column
+            time_col: Name of time column
+
+        Returns:
+            Results dict (same keys as Calculator.results)
+        """
+
+        for chunk in chunks:
+            self.update(chunk, date_col, time_col)
+
+        return self.finalize()
+
+    def compact(self):
+        """
+        Merge the per-chunk pyramid blocks into one finest-level block
+
+        Called every STREAMING_COMPACT_CHUNKS chunks and before the state
+        is stored (append mode); results are unchanged since rollup
+        merges split bins.
+        """
+
+        if len(self.pyramid_blocks) > 1:
+            width = next(iter(self.pyramid.widths.values()))
+            self.pyramid_blocks = [rollup(pd.concat(self.pyramid_blocks), width)]
+
+    def _sampling_result(self) -> Dict:
+        """Sampling interval analysis from the segment table"""
+
+        top = self.segments.interval_counts().head(10)
+        n = self.total_rows
+
+        dt_mode = top.index[0] if len(top) else 60.0
+        dominant_ratio = top.iloc[0] / n if len(top) else 1.0
+        mixed_sampling = dominant_ratio < THRESHOLDS['mixed_sampling_threshold']
+
+        dt_histogram = {}
+        for i, (dt_val, count) in enumerate(top.head(3).items()):
+            dt_histogram[f"interval_{i+1}_s"] = dt_val
+            dt_histogram[f"interval_{i+1}_count"] = count
+            dt_histogram[f"interval_{i+1}_percent"] = count / n * 100
+
+        if mixed_sampling:
+            logger.warning(f"Mixed sampling detected! Dominant interval: {dominant_ratio:.1%}")
+        else:
+            logger.info(f"Stable sampling: {dt_mode}s ({dt_mode/60:.2f} min)")
+
+        return {
+            'dt_mode_s': dt_mode,
+            'dt_mode_min': dt_mode / 60,
+            'mixed_sampling': mixed_sampling,
+            'dominant_ratio': dominant_ratio,
+            **dt_histogram
+        }
+
+    def _energy_result(self, power_col: str, dt_h: float) -> Dict:
+        stats = self.power[power_col]
+        E_kWh = self.segments.integrate(power_col) / 1000
+
+        logger.info(f"Energy ({power_col}): {E_kWh:.2f} kWh")
+
+        return {
+            'power_column': power_col,
+            'E_kWh': E_kWh,
+            'P_mean_W': stats.get_mean(),
+            'P_min_W': stats.get_min(),
+            'P_max_W': stats.get_max(),
+            'dt_h': dt_h
+        }
+
+    def finalize(self) -> Dict:
+        """
+        Compute results from accumulators
+
+        Returns:
+            Results dict (same keys as Calculator.results)
+        """
+
+        if self.invalid_rows:
+            logger.warning(f"Removed {self.invalid_rows} rows with invalid timestamps")
+
+        self.results['timestamp_order'] = {
+            'monotonic': self.order_breaks == 0,
+            'sorted_runs': self.order_breaks + 1,
+            'order_breaks': self.order_breaks,
+            'duplicates': self.duplicates,
+            'breaks': self.breaks
+        }
+
+        if self.order_breaks:
+            for b in self.breaks:
+                logger.warning(f"Time order breaks at row {b['row']:,}: "
+                               f"{b['before']} → {b['after']} ({b['jump_s']:+.0f} s)")
+
+            logger.warning(f"Time order breaks {self.order_breaks} times "
+                           f"(streaming mode does not sort rows)")
+
+        logger.info(f"Streamed {self.total_rows:,} valid rows")
+
+        if self.total_rows == 0:
+            raise ValueError("No rows with valid timestamps")
+
+        results = self.results
+        results['sampling'] = self._sampling_result()
+        results['segments'] = self.segments.quality()
+
+        if results['segments']['gaps']:
+            logger.warning(f"{results['segments']['gaps']} gaps in recording, "
+                           f"{results['segments']['gap_hours']:.2f} h missing "
+                           f"(coverage {results['segments']['coverage_percent']:.1f}%)")
+        dt_h = results['sampling']['dt_mode_s'] / 3600
+
+        if 'P_total' in self.power:
+            results['energy_total'] = self._energy_result('P_total', dt_h)
+
+        phase_cols = [f"P_{p}" for p in PHASES]
+        if 'energy_total' in results and all(c in self.power for c in phase_cols):
+            E_total = results['energy_total']['E_kWh']
+            E_phase_sum = sum(self._energy_result(c, dt_h)['E_kWh'] for c in phase_cols)
+            delta_E_percent = abs(E_phase_sum - E_total) / E_total * 100
+
+            thresholds = THRESHOLDS['delta_E_percent']
+            results['energy_comparison'] = {
+                'E_total_kWh': E_total,
+                'E_phase_sum_kWh': E_phase_sum,
+                'delta_E_percent': delta_E_percent,
+                'status': 'PASS' if delta_E_percent <= thresholds['pass'] else
+                          ('INFO' if delta_E_percent <= thresholds['info'] else 'ALERT')
+            }
+
+            logger.info(f"Energy comparison: ΔE = {delta_E_percent:.2f}% "
+                        f"[{results['energy_comparison']['status']}]")
+
+        if 'PF_total' in self.columns and self.pf_calc.count:
+            results['pf'] = {
+                'PF_calc_mean': self.pf_calc.get_mean(),
+                'PF_calc_min': self.pf_calc.get_min(),
+                'PF_calc_max': self.pf_calc.get_max(),
+                'PF_measured_mean': self.pf_measured.get_mean(),
+                **_prefixed(self.pf_diff.summary(), 'PF_diff')
+            }
+
+            logger.info(f"PF difference: mean={results['pf']['PF_diff_mean']:.4f}, "
+                        f"p95={results['pf']['PF_diff_p95']:.4f}")
+
+        for quantity, acc in self.balance.items():
+            total_col = f"{quantity}_total"
+            result = {
+                'available': True,
+                'total_col': total_col,
+                'phase_cols': [f"{quantity}_{p}" for p in PHASES],
+                **_prefixed(acc.summary(), 'rel_err')
+            }
+            results[f"power_balance_{quantity}"] = result
+
+            logger.info(f"Power balance ({total_col}): mean={result['rel_err_mean']:.3f}, "
+                        f"p95={result['rel_err_p95']:.3f}")
+
+        if 'Q_total' in self.columns and self._enabled('vector'):
+            results['vector_validation'] = {
+                'available': True,
+                'samples_used': self.vector.stats.count,
+                **_prefixed(self.vector.summary(), 'rel_err')
+            }
+
+            logger.info(f"Vector validation (S²=P²+Q²): "
+                        f"mean={results['vector_validation']['rel_err_mean']:.3f}, "
+                        f"p95={results['vector_validation']['rel_err_p95']:.3f}")
+
+        if 'F' in self.columns and self._enabled('frequency'):
+            results['frequency'] = {
+                'available': True,
+                'F_mean_Hz': self.frequency.get_mean(),
+                'F_min_Hz': self.frequency.get_min(),
+                'F_max_Hz': self.frequency.get_max(),
+                'F_std_Hz': self.frequency.get_std()
+            }
+
+            logger.info(f"Frequency: {results['frequency']['F_mean_Hz']:.3f} Hz "
+                        f"(±{results['frequency']['F_std_Hz']:.3f})")
+
+        if self.imbalance.stats.count:
+            results['voltage_imbalance'] = {
+                'available': True,
+                **_prefixed(self.imbalance.summary(), 'imbalance', '_percent')
+            }
+
+            logger.info(f"Voltage imbalance: "
+                        f"mean={results['voltage_imbalance']['imbalance_mean_percent']:.2f}%, "
+                        f"p95={results['voltage_imbalance']['imbalance_p95_percent']:.2f}%")
+
+        # Aggregation pyramid and compliance of 10-minute means
+        if self._enabled('pyramid'):
+            self.pyramid.build(*self.pyramid_blocks)
+            self.pyramid_blocks = []
+        else:
+            self.pyramid = None
+
+        if self.pyramid is not None and self._enabled('compliance'):
+            results['compliance'] = check_compliance(self.pyramid)
+            _log_compliance(results['compliance'])
+
+        if self.events is not None:
+            results['events'] = self.events.summary()
+            _log_events(results['events'])
+
+        return results
+
+    def analyze_harmonics(self, blocks: Iterable[np.ndarray],
+                          decoder: HarmonicDecoder) -> Dict:
+        """
+        Harmonic analytics block by block (see Calculator.analyze_harmonics);
+        without kept timestamps there is no spectrum over time
+
+        Args:
+            blocks: Harmonic cube blocks (HarmonicDecoder.iter_load)
+            decoder: Decoder of the cube layout
+
+        Returns:
+            Dict with per-phase THD and dominant harmonic, limit violations
+        """
+
+        self.harmonics = HarmonicAnalyzer.from_decoder(decoder).consume(blocks)
+
+        result = self.harmonics.result()
+        self.results['harmonics'] = result
+        _log_harmonics(result)
+
+        return result
+
+    def get_summary(self) -> Dict:
+        """
+        Generate comprehensive summary of all calculations
+
+        Returns:
+            Dict with all results combined (same layout as Calculator.get_summary)
+        """
+
+        duration_hours = ((self.max_timestamp - self.min_timestamp).total_seconds() / 3600
+                          if self.total_rows else math.nan)
+
+        return {
+            'measurement_start': self.min_timestamp,
+            'measurement_end': self.max_timestamp,
+            'duration_hours': duration_hours,
+            'total_samples': self.total_rows,
+            **self.results
+        }
+
+    # Acceptance criteria only read self.results
+    check_acceptance_criteria = Calculator.check_acceptance_criteria
@@ -0,0 +1,206 @@
+"""
+Time index module for random access by timestamp
+
+A sparse sidecar index (<file>.tidx next to the raw export) holds the
+timestamp and byte offset of every TIME_INDEX_STRIDE-th line. It is
+built on the way during preprocessing (CleanStream, preprocess_file),
+so it costs no extra pass. A time window is then located with a binary
+search over the entries plus a scan of at most one stride of lines,
+instead of parsing the file from the top.
+
+The index stays valid while the file only grows (the fingerprint of the
+header and of the bytes before the indexed size is checked on load).
+Without a valid index the window is found by bisecting the file
+(find_time_offset), which also works but reads more blocks.
+"""
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple, Union
+from .config import TIME_INDEX_STRIDE
+from .preprocessor import find_time_offset, prefix_fingerprint, read_header
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.tidx'
+
+TimeLike = Union[str, datetime, pd.Timestamp]
+
+
+class TimeIndex:
+    """
+    Sparse timestamp → byte offset index of a raw export
+    """
+
+    def __init__(self, filepath: str, stride: int = TIME_INDEX_STRIDE):
+        """
+        Initialize empty index (filled by preprocessing via add())
+
+        Args:
+            filepath: Path to raw export
+            stride: Lines between entries
+        """
+
+        self.filepath = Path(filepath)
+        self.stride = stride
+        self.size = 0  # Bytes of the file covered by the index
+
+        self._offsets = []     # int64 arrays per block
+        self._timestamps = []  # int64 ns arrays per block
+
+    @property
+    def path(self) -> Path:
+        """Sidecar file path"""
+
+        return self.filepath.with_name(self.filepath.name + INDEX_SUFFIX)
+
+    def add(self, offsets: np.ndarray, timestamps: np.ndarray):
+        """Append entries of the next block (preprocessor.index_block)"""
+
+        self._offsets.append(offsets)
+        self._timestamps.append(timestamps)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        All entries
+
+        Returns:
+            Tuple of (int64 file offsets, int64 nanosecond timestamps)
+        """
+
+        if len(self._offsets) != 1:
+            self._offsets = [np.concatenate(self._offsets or [np.empty(0, np.int64)])]
+            self._timestamps = [np.concatenate(self._timestamps or [np.empty(0, np.int64)])]
+
+        return self._offsets[0], self._timestamps[0]
+
+    def __len__(self) -> int:
+        return len(self.arrays()[0])
+
+    def save(self, size: int):
+        """
+        Write the sidecar file (best effort, a read-only directory only
+        costs the speed-up)
+
+        Args:
+            size: Bytes of the file read while indexing
+        """
+
+        offsets, timestamps = self.arrays()
+        self.size = size
+
+        if len(offsets) == 0:
+            return  # Shorter than one stride, bisection is as fast
+
+        if (np.diff(timestamps) < 0).any():
+            logger.warning("Time index not written: rows are not in time order")
+            return
+
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f,
+                         version=INDEX_VERSION,
+                         stride=self.stride,
+                         size=size,
+                         fingerprint=prefix_fingerprint(self.filepath, size),
+                         offsets=offsets,
+                         timestamps=timestamps)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write time index {self.path.name}: {e}")
+            return
+
+        logger.info(f"Time index: {len(offsets):,} entries → {self.path.name}")
+
+    @classmethod
+    def load(cls, filepath: str) -> Optional['TimeIndex']:
+        """
+        Load the sidecar index of a file
+
+        Args:
+            filepath: Path to raw export
+
+        Returns:
+            TimeIndex, or None if missing, outdated or the file changed
+            before the indexed size
+        """
+
+        index = cls(filepath)
+
+        if not index.path.exists():
+            return None
+
+        try:
+            with np.load(index.path) as data:
+                version = int(data['version'])
+                index.stride = int(data['stride'])
+                index.size = int(data['size'])
+                fingerprint = str(data['fingerprint'])
+                index.add(data['offsets'], data['timestamps'])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Unreadable time index {index.path.name}: {e}")
+            return None
+
+        if (version != INDEX_VERSION or index.filepath.stat().st_size < index.size or
+                prefix_fingerprint(index.filepath, index.size) != fingerprint):
+            logger.info(f"Time index {index.path.name} is outdated, not used")
+            return None
+
+        return index
+
+    def bounds(self, timestamp: TimeLike) -> Tuple[int, int]:
+        """
+        Byte range holding the first line at or after a timestamp
+
+        Args:
+            timestamp: Timestamp to look for
+
+        Returns:
+            Tuple of (lo, hi) line starts for find_time_offset()
+        """
+
+        offsets, timestamps = self.arrays()
+        i = int(np.searchsorted(timestamps, pd.Timestamp(timestamp).as_unit('ns').value))
+
+        lo = int(offsets[i - 1]) if i > 0 else len(read_header(self.filepath))
+        hi = int(offsets[i]) if i < len(offsets) else self.filepath.stat().st_size
+
+        return lo, hi
+
+
+def locate_window(filepath: str,
+                  start: Optional[TimeLike] = None,
+                  end: Optional[TimeLike] = None) -> Tuple[int, Optional[int]]:
+    """
+    Byte range of the rows with start <= timestamp < end
+
+    Uses the sidecar index when it is valid, otherwise bisects the file.
+
+    Args:
+        filepath: Path to raw export (rows in time order)
+        start: First timestamp (None = from the beginning)
+        end: Timestamp after the window (None = to the end)
+
+    Returns:
+        Tuple of (start offset, end offset or None for end of file)
+    """
+
+    if start is None and end is None:
+        return 0, None
+
+    index = TimeIndex.load(filepath)
+
+    def offset(timestamp: TimeLike) -> int:
+        timestamp = pd.Timestamp(timestamp)
+        lo, hi = index.bounds(timestamp) if index is not None else (None, None)
+        return find_time_offset(str(filepath), timestamp, lo, hi)
+
+    return (0 if start is None else offset(start),
+            None if end is None else offset(end))
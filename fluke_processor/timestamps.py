@@ -0,0 +1,223 @@
+"""
+Timestamps module for parsing datum/cas columns into int64 epoch
+
+The date/time format is sniffed once from the first rows. Every distinct
+date and time string is then parsed only once: values are factorized,
+the unique strings are looked up in (or added to) a cache, and the
+per-row timestamp is assembled with two integer gathers. Dates repeat
+for a whole day and times repeat every day at regular sampling, so the
+caches stay small.
+
+check_order() verifies time order in one pass and reports where it
+breaks; sort_order() merges the sorted runs when it does.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Tuple
+from .config import DATE_FORMATS, TIME_FORMATS
+
+logger = logging.getLogger(__name__)
+
+NAT = np.iinfo(np.int64).min  # int64 view of NaT
+SNIFF_ROWS = 100
+TIMESTAMP_CACHE_SIZE = 100_000  # Entries per cache before it is cleared
+MAX_REPORTED_BREAKS = 10
+
+_TIME_BASE = pd.Timestamp('1900-01-01').value  # strptime default date
+
+
+def _sniff(samples, formats) -> str:
+    """Format that parses most sample strings (first one on ties)"""
+
+    def n_parsed(fmt):
+        count = 0
+        for value in samples:
+            try:
+                datetime.strptime(value, fmt)
+                count += 1
+            except ValueError:
+                pass
+        return count
+
+    scores = [n_parsed(fmt) for fmt in formats]
+    best = max(range(len(formats)), key=lambda i: scores[i])
+
+    if scores[best] == 0:
+        raise ValueError(f"Unrecognized date/time format: {samples[:3]}")
+
+    return formats[best]
+
+
+def _to_ns(values, fmt: str) -> np.ndarray:
+    """Parse strings with format into int64 nanoseconds (NaT for invalid)"""
+
+    parsed = pd.to_datetime(pd.Index(values, dtype=object), format=fmt, errors='coerce')
+    return np.asarray(parsed, dtype='datetime64[ns]').view(np.int64)
+
+
+class TimestampParser:
+    """
+    Parse date and time string columns into datetime64[ns] with caching
+    """
+
+    def __init__(self, date_format: str, time_format: str):
+        """
+        Initialize parser
+
+        Args:
+            date_format: strptime format of date column (e.g. '%d.%m.%Y')
+            time_format: strptime format of time column (e.g. '%H:%M:%S.%f')
+        """
+
+        self.date_format = date_format
+        self.time_format = time_format
+
+        self._date_cache: Dict[str, int] = {}  # date string → ns of midnight
+        self._time_cache: Dict[str, int] = {}  # time string → ns since midnight
+
+    @classmethod
+    def sniff(cls, dates, times, n_rows: int = SNIFF_ROWS) -> 'TimestampParser':
+        """
+        Create parser with formats detected from the first valid rows
+
+        Args:
+            dates: Date strings (Series or array)
+            times: Time strings (Series or array)
+            n_rows: Number of rows to inspect
+
+        Returns:
+            TimestampParser instance
+        """
+
+        # Look at a bounded head only (leading rows may be empty)
+        head = n_rows * 10
+        pairs = pd.DataFrame({'d': np.asarray(pd.Series(dates).iloc[:head], dtype=object),
+                              't': np.asarray(pd.Series(times).iloc[:head], dtype=object)})
+        pairs = pairs.dropna().head(n_rows)
+
+        if pairs.empty:
+            raise ValueError("No date/time values to detect format from")
+
+        date_format = _sniff([str(v).strip() for v in pairs['d']], DATE_FORMATS)
+        time_format = _sniff([str(v).strip() for v in pairs['t']], TIME_FORMATS)
+
+        logger.info(f"Timestamp format: '{date_format} {time_format}'")
+
+        return cls(date_format, time_format)
+
+    def _lookup(self, values, cache: Dict[str, int], fmt: str, offset: int) -> np.ndarray:
+        """
+        Map strings to int64 ns through the cache
+
+        Only strings not seen before are parsed.
+        """
+
+        codes, uniques = pd.factorize(values)
+        uniques = [str(u).strip() for u in uniques]
+
+        missing = [u for u in uniques if u not in cache]
+        if missing:
+            if len(cache) + len(missing) > TIMESTAMP_CACHE_SIZE:
+                cache.clear()
+                missing = uniques
+
+            parsed = _to_ns(missing, fmt)
+            valid = parsed != NAT
+            parsed[valid] -= offset
+            cache.update(zip(missing, parsed.tolist()))
+
+        # Last slot serves code -1 (missing value)
+        table = np.fromiter((cache[u] for u in uniques), dtype=np.int64, count=len(uniques))
+        table = np.append(table, NAT)
+
+        return table[codes]
+
+    def parse_ns(self, dates, times) -> np.ndarray:
+        """
+        Parse into int64 nanoseconds since epoch
+
+        Args:
+            dates: Date strings (Series or array; NaN allowed)
+            times: Time strings (Series or array; NaN allowed)
+
+        Returns:
+            int64 array, NaT (int64 min) where date or time is invalid
+        """
+
+        date_ns = self._lookup(dates, self._date_cache, self.date_format, 0)
+        time_ns = self._lookup(times, self._time_cache, self.time_format, _TIME_BASE)
+
+        result = date_ns + time_ns
+        result[(date_ns == NAT) | (time_ns == NAT)] = NAT
+
+        return result
+
+    def parse(self, dates, times) -> pd.Series:
+        """
+        Parse into datetime64[ns] Series (index taken from dates if a Series)
+
+        Args:
+            dates: Date strings
+            times: Time strings
+
+        Returns:
+            Series of datetime64[ns], NaT where invalid
+        """
+
+        index = dates.index if isinstance(dates, pd.Series) else None
+
+        return pd.Series(self.parse_ns(dates, times).view('datetime64[ns]'),
+                         index=index, name='timestamp')
+
+    def cache_info(self) -> Tuple[int, int]:
+        """Number of cached (dates, times)"""
+
+        return len(self._date_cache), len(self._time_cache)
+
+
+def check_order(ts_ns: np.ndarray, max_report: int = MAX_REPORTED_BREAKS) -> Dict:
+    """
+    Check in O(n) whether timestamps are non-decreasing
+
+    Args:
+        ts_ns: int64 nanosecond timestamps (no NaT)
+        max_report: Maximum number of breaks listed in detail
+
+    Returns:
+        Dict with monotonic flag, number of sorted runs, order breaks,
+        duplicate timestamps and details of the first breaks
+        (row, before, after, jump_s)
+    """
+
+    diff = np.diff(ts_ns)
+    break_rows = np.flatnonzero(diff < 0) + 1
+
+    breaks = [{
+        'row': int(row),
+        'before': pd.Timestamp(int(ts_ns[row - 1])),
+        'after': pd.Timestamp(int(ts_ns[row])),
+        'jump_s': (int(ts_ns[row]) - int(ts_ns[row - 1])) / 1e9
+    } for row in break_rows[:max_report]]
+
+    return {
+        'monotonic': len(break_rows) == 0,
+        'sorted_runs': len(break_rows) + 1,
+        'order_breaks': len(break_rows),
+        'duplicates': int((diff == 0).sum()),
+        'breaks': breaks
+    }
+
+
+def sort_order(ts_ns: np.ndarray) -> np.ndarray:
+    """
+    Stable permutation that sorts timestamps
+
+    NumPy's stable sort is a timsort for int64: it detects the already
+    sorted runs and merges them, so a handful of runs (DST fall-back,
+    concatenated logger sessions) costs about O(n log runs).
+    """
+
+    return np.argsort(ts_ns, kind='stable')
@@ -21,13 +21,26 @@ from pathlib import Path
 from datetime import datetime
 
 from fluke_processor import (
-    preprocess_file,
+    CleanStream,
     ColumnMapper,
     DataLoader,
     Calculator,
-    Exporter
+    Exporter,
+    DataCache,
+    StreamingCalculator,
+    HarmonicDecoder,
+    MetricScheduler,
+    AppendState,
+    TimeIndex
+)
+from fluke_processor.preprocessor import estimate_file_info, default_clean_path, complete_size
+from fluke_processor.scheduler import code_version
+from fluke_processor.append import APPEND_VERSION
+from fluke_processor.config import (
+    QUANTILE_BACKEND,
+    METRIC_THREADS,
+    CACHE_DIR
 )
-from fluke_processor.preprocessor import estimate_file_info
 
 
 def setup_logging(verbose: bool = False):
@@ -42,6 +55,235 @@ def setup_logging(verbose: bool = False):
     )
 
 
+def metric_list(value: str) -> list:
+    """Comma-separated metric names (argparse type)"""
+
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def load_data(args, input_path: Path, mapper: ColumnMapper, column_mapping: dict,
+              scheduler: MetricScheduler):
+    """
+    Preprocess (STEP 2) and load (STEP 3) the columns of the selected metrics
+
+    Returns:
+        Tuple of (DataFrame, clean copy path or None)
+    """
+
+    logger = logging.getLogger(__name__)
+
+    # STEP 2: Preprocessing
+    logger.info("\n--- STEP 2: PREPROCESSING ---")
+
+    stream = None
+    clean_file = None
+    columns = scheduler.columns()
+
+    if args.skip_preprocess:
+        logger.info("Skipping preprocessing (using input file as-is)")
+        load_mapping = {name: column_mapping[name] for name in columns}
+    else:
+        # Only the projected columns are cleaned and streamed into the parser
+        if args.keep_clean_file:
+            clean_file = str(default_clean_path(input_path))
+
+        stream = CleanStream(
+            str(input_path),
+            clean_copy_path=clean_file,
+            verbose=args.verbose,
+            workers=args.jobs,
+            columns=mapper.get_mapped_indices(names=columns),
+            index=TimeIndex(str(input_path))
+        )
+        load_mapping = mapper.get_projected_mapping(names=columns)
+
+        if clean_file:
+            logger.info(f"Clean copy (projected columns) will be written to: {clean_file}")
+
+    # STEP 3: Load Data
+    logger.info("\n--- STEP 3: LOADING DATA ---")
+
+    loader = DataLoader(str(input_path), stream=stream, engine=args.parser)
+    df, reverse_mapping = loader.load_with_mapping(
+        load_mapping,
+        required=scheduler.required_columns(),
+        parse_timestamps=True,
+        chunk_size=args.chunk_size,
+        verbose=args.verbose
+    )
+
+    # The loader may have reopened the stream for a fallback parser
+    if loader.stream is not None:
+        loader.stream.close()
+
+    return df, clean_file
+
+
+def stream_analysis(args, input_path: Path, mapper: ColumnMapper, column_mapping: dict,
+                    scheduler: MetricScheduler):
+    """
+    Preprocess, load and analyse chunk by chunk (STEP 2-4 in one pass)
+
+    With --append only the lines added since the previous run are read;
+    the accumulators of that run are restored and stored again.
+
+    Returns:
+        Tuple of (StreamingCalculator, clean copy path or None)
+    """
+
+    logger = logging.getLogger(__name__)
+
+    logger.info("\n--- STEP 2-4: STREAMING ANALYSIS ---")
+
+    stream = None
+    clean_file = None
+    columns = scheduler.columns()
+    load_mapping = {name: column_mapping[name] for name in columns}
+
+    calc = None
+    start, end = 0, None
+
+    if args.append:
+        state = AppendState(str(input_path), args.cache_dir or CACHE_DIR)
+        settings = {
+            'mapping': load_mapping,
+            'metrics': scheduler.selected(),
+            'params': scheduler.params(),
+            'quantiles': args.quantiles,
+            'parser': args.parser,
+            'code': code_version(),
+            'version': APPEND_VERSION
+        }
+
+        # A partial last line (logger still writing) is left for the next run
+        end = complete_size(input_path)
+        previous = state.load(settings)
+
+        if previous is not None:
+            start, calc = previous['offset'], previous['calc']
+
+    if calc is None:
+        calc = StreamingCalculator(quantiles=args.quantiles, metrics=scheduler.selected())
+
+    if end is not None and start >= end:
+        logger.info("Append: no new data since the previous run")
+    else:
+        if end is not None:
+            logger.info(f"Append: reading {end - start:,} new bytes")
+
+        if not args.skip_preprocess:
+            if args.keep_clean_file:
+                clean_file = str(default_clean_path(input_path))
+
+            # Time index of the whole file, or extended by the new tail
+            index = TimeIndex(str(input_path))
+            if start > 0:
+                index = TimeIndex.load(str(input_path))
+                if index is not None and index.size != start:
+                    index = None
+
+            stream = CleanStream(
+                str(input_path),
+                clean_copy_path=clean_file,
+                verbose=args.verbose,
+                workers=args.jobs,
+                columns=mapper.get_mapped_indices(names=columns),
+                start=start,
+                end=end,
+                index=index
+            )
+            load_mapping = mapper.get_projected_mapping(names=columns)
+
+        loader = DataLoader(str(input_path), stream=stream, engine=args.parser)
+        chunks = loader.iter_with_mapping(
+            load_mapping,
+            required=scheduler.required_columns(),
+            chunk_size=args.chunk_size,
+            verbose=args.verbose,
+            parse_timestamps=True
+        )
+
+        for chunk in chunks:
+            calc.update(chunk, date_col='datum', time_col='cas')
+
+        if loader.stream is not None:
+            loader.stream.close()
+
+    if args.append:
+        calc.compact()
+        state.save(end, calc, settings)
+
+        if calc.last_timestamp is not None:
+            logger.info(f"Append: data up to {calc.last_timestamp}")
+
+    calc.finalize()
+
+    return calc, clean_file
+
+
+def analyse(args, input_path: Path, mapper: ColumnMapper, column_mapping: dict,
+            scheduler: MetricScheduler, cache):
+    """
+    Load the projected columns (STEP 2-3, or from cache) and run the
+    selected metrics (STEP 4)
+
+    Returns:
+        Tuple of (Calculator, clean copy path or None)
+    """
+
+    logger = logging.getLogger(__name__)
+
+    # Cached data from a previous run on the same file and columns
+    cache_key = None
+    df = None
+
+    if cache is not None:
+        load_mapping = {name: column_mapping[name] for name in scheduler.columns()}
+        cache_key = cache.make_key(str(input_path), load_mapping,
+                                   parser=args.parser,
+                                   preprocessed=not args.skip_preprocess,
+                                   timestamps='datetime64[ns]')
+
+        # The audit copy is written while preprocessing, so it needs a fresh run
+        if args.keep_clean_file:
+            logger.info("Not using cached data (--keep-clean-file)")
+        else:
+            df = cache.load(cache_key)
+
+    clean_file = None
+
+    if df is not None:
+        logger.info("Using cached data, skipping preprocessing and loading")
+    else:
+        df, clean_file = load_data(args, input_path, mapper, column_mapping, scheduler)
+
+        if cache is not None:
+            cache.store(cache_key, df)
+
+    logger.info(f"Loaded {len(df):,} rows × {len(df.columns)} columns")
+
+    # STEP 4: Calculations
+    logger.info("\n--- STEP 4: CALCULATIONS ---")
+
+    # Calculator takes ownership of the loaded frame (no copy)
+    calc = Calculator(df, copy=False, quantiles=args.quantiles)
+    del df
+
+    # Timestamps, segments, metrics, pyramid, compliance, demand, events
+    # in dependency order, independent ones in parallel threads; metric
+    # results memoized next to the loaded data
+    data_key = None
+    if cache is not None:
+        data_key = cache.make_key(str(input_path), {},
+                                  parser=args.parser,
+                                  preprocessed=not args.skip_preprocess,
+                                  timestamps='datetime64[ns]')
+
+    scheduler.run(calc, workers=args.threads, cache=cache, data_key=data_key)
+
+    return calc, clean_file
+
+
 def main():
     """Main processing pipeline"""
 
@@ -59,6 +301,30 @@ Examples:
   # Verbose output
   python process_fluke.py data.txt --verbose
 
+  # Preprocess on 8 CPU cores
+  python process_fluke.py data.txt --jobs 8
+
+  # Keep the clean UTF-8 copy for audit
+  python process_fluke.py data.txt --keep-clean-file
+
+  # Bounded memory for very large files (no timeseries sheet)
+  python process_fluke.py data.txt --streaming
+
+  # Growing export: only read lines added since the previous run
+  python process_fluke.py data.txt --append
+
+  # Harmonic analytics (THD, EN 50160 limits, spectrum sheets)
+  python process_fluke.py data.txt --harmonics
+
+  # Only power factor (loads P, S and PF columns only)
+  python process_fluke.py data.txt --metrics pf
+
+  # All metrics except demand and voltage events
+  python process_fluke.py data.txt --skip-metrics demand,events
+
+  # Ignore cached data from previous runs
+  python process_fluke.py data.txt --no-cache
+
   # Skip preprocessing (if already clean)
   python process_fluke.py data_clean.txt --skip-preprocess
 
@@ -77,11 +343,71 @@ For more information, see README.md
                        action='store_true',
                        help='Skip preprocessing step (use if file is already clean)')
 
+    parser.add_argument('--keep-clean-file',
+                       action='store_true',
+                       help='Also write the clean UTF-8 copy (<input>_clean.txt) for audit '
+                            '(cached data is not used)')
+
+    parser.add_argument('--cache-dir',
+                       default=None,
+                       help='Cache directory for parsed data (default: ~/.cache/fluke_processor)')
+
+    parser.add_argument('--no-cache',
+                       action='store_true',
+                       help='Do not read or write the parsed-data cache')
+
     parser.add_argument('--chunk-size',
                        type=int,
                        default=None,
                        help='Chunk size for reading large files (default: auto)')
 
+    parser.add_argument('--streaming',
+                       action='store_true',
+                       help='Analyse chunk by chunk with bounded memory '
+                            '(no timeseries sheet)')
+
+    parser.add_argument('--append',
+                       action='store_true',
+                       help='Streaming analysis that only reads lines added since the '
+                            'previous --append run of the same file (state kept in the cache dir)')
+
+    parser.add_argument('--parser',
+                       choices=['c', 'pyarrow', 'python'],
+                       default='c',
+                       help='CSV parser backend (default: c)')
+
+    parser.add_argument('--quantiles',
+                       choices=['exact', 'sketch'],
+                       default=None,
+                       help=f"Quantile backend for p50/p95 metrics "
+                            f"(default: sketch with --streaming, else {QUANTILE_BACKEND})")
+
+    parser.add_argument('--harmonics',
+                       action='store_true',
+                       help='Analyse harmonics 2-50 (THD, limits, spectrum; '
+                            'reads the harmonic columns in a second pass)')
+
+    parser.add_argument('--metrics',
+                       type=metric_list,
+                       default=None,
+                       help=f"Comma-separated metrics to run, only their columns are loaded "
+                            f"({', '.join(MetricScheduler.metric_names())}; default: all but harmonics)")
+
+    parser.add_argument('--skip-metrics',
+                       type=metric_list,
+                       default=[],
+                       help='Comma-separated metrics not to run')
+
+    parser.add_argument('--threads',
+                       type=int,
+                       default=METRIC_THREADS,
+                       help=f"Threads running independent metrics (default: {METRIC_THREADS})")
+
+    parser.add_argument('--jobs', '-j',
+                       type=int,
+                       default=1,
+                       help='Worker processes for preprocessing (default: 1)')
+
     parser.add_argument('--verbose', '-v',
                        action='store_true',
                        help='Verbose output')
@@ -92,6 +418,22 @@ For more information, see README.md
 
     args = parser.parse_args()
 
+    if args.append:
+        if args.skip_preprocess or args.keep_clean_file:
+            parser.error("--append cannot be combined with --skip-preprocess or --keep-clean-file")
+        args.streaming = True
+
+    if args.quantiles is None:
+        args.quantiles = 'sketch' if args.streaming else QUANTILE_BACKEND
+
+    try:
+        scheduler = MetricScheduler(args.metrics, args.skip_metrics)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.harmonics and 'harmonics' not in scheduler.metrics:
+        scheduler.metrics.append('harmonics')
+
     # Setup logging
     setup_logging(args.verbose)
     logger = logging.getLogger(__name__)
@@ -108,32 +450,28 @@ For more information, see README.md
 
     # Estimate file info
     logger.info("\n--- FILE INFO ---")
-    file_info = estimate_file_info(str(input_path))
+    file_info = estimate_file_info(str(input_path), sample=args.append)
     logger.info(f"File size: {file_info['file_size_mb']:.1f} MB")
     logger.info(f"Estimated rows: {file_info['estimated_rows']:,}")
     logger.info(f"Estimated columns: {file_info['estimated_cols']:,}")
 
-    # STEP 1: Preprocessing
-    logger.info("\n--- STEP 1: PREPROCESSING ---")
+    if file_info['span_hours'] is not None:
+        logger.info(f"Measurement span: {file_info['first_timestamp']} → "
+                    f"{file_info['last_timestamp']} ({file_info['span_hours']:.1f} h)")
 
-    if args.skip_preprocess:
-        logger.info("Skipping preprocessing (using input file as-is)")
-        clean_file = str(input_path)
-    else:
-        clean_file, preprocess_stats = preprocess_file(
-            str(input_path),
-            verbose=args.verbose
-        )
-        logger.info(f"Created clean file: {clean_file}")
+    # STEP 1: Column Mapping
+    logger.info("\n--- STEP 1: COLUMN MAPPING ---")
 
-    # STEP 2: Column Mapping
-    logger.info("\n--- STEP 2: COLUMN MAPPING ---")
+    cache = None
+    if not args.no_cache:
+        cache = DataCache(args.cache_dir) if args.cache_dir else DataCache()
 
-    mapper = ColumnMapper.from_file(clean_file)
-    column_mapping = mapper.auto_map()
+    # Preprocessing never moves tabs, so raw header indices are valid
+    mapper = ColumnMapper.from_file(str(input_path))
+    column_mapping = mapper.auto_map(cache_dir=cache.cache_dir if cache else None)
 
     # Check critical columns
-    critical_cols = ['datum', 'cas', 'P_total', 'S_total']
+    critical_cols = ['datum', 'cas']
     missing_critical = [col for col in critical_cols if column_mapping.get(col) is None]
 
     if missing_critical:
@@ -143,83 +481,29 @@ For more information, see README.md
 
     logger.info(f"Successfully mapped {sum(1 for v in column_mapping.values() if v is not None)} columns")
 
-    # STEP 3: Load Data
-    logger.info("\n--- STEP 3: LOADING DATA ---")
-
-    loader = DataLoader(clean_file)
-    df, reverse_mapping = loader.load_with_mapping(
-        column_mapping,
-        required=['datum', 'cas', 'P_total', 'S_total'],
-        chunk_size=args.chunk_size,
-        verbose=args.verbose
-    )
-
-    logger.info(f"Loaded {len(df):,} rows × {len(df.columns)} columns")
-
-    # STEP 4: Calculations
-    logger.info("\n--- STEP 4: CALCULATIONS ---")
-
-    calc = Calculator(df)
-
-    # Create timestamp
-    calc.create_timestamp(date_col='datum', time_col='cas')
-
-    # Analyze sampling
-    sampling_result = calc.analyze_sampling()
-
-    # Calculate energies
-    energy_total = calc.calculate_energy('P_total')
-    calc.results['energy_total'] = energy_total
-
-    # Energy comparison (if phases available)
-    if all(col in df.columns for col in ['P_L1N', 'P_L2N', 'P_L3N']):
-        energy_phases = []
-        for phase in ['P_L1N', 'P_L2N', 'P_L3N']:
-            e = calc.calculate_energy(phase)
-            energy_phases.append(e['E_kWh'])
-
-        E_phase_sum = sum(energy_phases)
-        E_total = energy_total['E_kWh']
-        delta_E_percent = abs(E_phase_sum - E_total) / E_total * 100
-
-        calc.results['energy_comparison'] = {
-            'E_total_kWh': E_total,
-            'E_phase_sum_kWh': E_phase_sum,
-            'delta_E_percent': delta_E_percent,
-            'status': 'PASS' if delta_E_percent <= 1.0 else ('INFO' if delta_E_percent <= 3.0 else 'ALERT')
-        }
+    # Metrics whose columns are mapped, and the columns they read
+    scheduler.resolve(column_mapping)
 
-        logger.info(f"Energy comparison: ΔE = {delta_E_percent:.2f}% "
-                   f"[{calc.results['energy_comparison']['status']}]")
-
-    # Power Factor
-    if 'PF_total' in df.columns:
-        pf_result = calc.calculate_pf('P_total', 'S_total', 'PF_total')
-        calc.results['pf'] = pf_result
-
-    # Validations
-    if all(col in df.columns for col in ['P_L1N', 'P_L2N', 'P_L3N']):
-        pb_P = calc.validate_power_balance('P_total', ['P_L1N', 'P_L2N', 'P_L3N'])
-        calc.results['power_balance_P'] = pb_P
+    if not scheduler.metrics:
+        logger.error("No selected metric can run with the mapped columns.")
+        sys.exit(1)
 
-    if all(col in df.columns for col in ['S_L1N', 'S_L2N', 'S_L3N']):
-        pb_S = calc.validate_power_balance('S_total', ['S_L1N', 'S_L2N', 'S_L3N'])
-        calc.results['power_balance_S'] = pb_S
+    logger.info(f"Metrics: {', '.join(scheduler.metrics)}")
+    logger.info(f"Loading {len(scheduler.columns())} of "
+                f"{sum(1 for v in column_mapping.values() if v is not None)} mapped columns")
 
-    # Vector validation
-    if 'Q_total' in df.columns:
-        vv = calc.validate_vector_power('P_total', 'Q_total', 'S_total')
-        calc.results['vector_validation'] = vv
+    if args.streaming:
+        calc, clean_file = stream_analysis(args, input_path, mapper, column_mapping, scheduler)
+    else:
+        calc, clean_file = analyse(args, input_path, mapper, column_mapping, scheduler, cache)
 
-    # Frequency
-    if 'F' in df.columns:
-        freq_result = calc.analyze_frequency('F')
-        calc.results['frequency'] = freq_result
+    # Harmonic analytics (second pass over the harmonic columns only)
+    if 'harmonics' in scheduler.metrics:
+        logger.info("\n--- HARMONICS ---")
+        decoder = HarmonicDecoder(mapper.columns)
 
-    # Voltage imbalance
-    if all(col in df.columns for col in ['U_L1N', 'U_L2N', 'U_L3N']):
-        vi_result = calc.analyze_voltage_imbalance(['U_L1N', 'U_L2N', 'U_L3N'])
-        calc.results['voltage_imbalance'] = vi_result
+        if decoder.available:
+            calc.analyze_harmonics(decoder.iter_load(str(input_path), workers=args.jobs), decoder)
 
     # Check acceptance criteria
     acceptance = calc.check_acceptance_criteria()
@@ -240,14 +524,22 @@ For more information, see README.md
 
     # Export XLSX
     xlsx_filename = f"fluke_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    exporter.export_xlsx(calc.df, summary, mapping_log, filename=xlsx_filename)
+    df = None if args.streaming or 'timeseries' not in scheduler.metrics else calc.df
+    exporter.export_xlsx(df, summary, mapping_log, filename=xlsx_filename,
+                         segments=calc.segments, pyramid=calc.pyramid,
+                         events=calc.events, harmonics=calc.harmonics)
 
-    # Export plots
-    if 'P_total' in calc.df.columns and 'S_total' in calc.df.columns:
-        exporter.plot_power_timeseries(calc.df)
+    # Export plots (from the aggregation pyramid, not raw rows)
+    columns = calc.pyramid.columns if calc.pyramid is not None else []
 
-    if 'PF_total' in calc.df.columns and 'PF_calc' in calc.df.columns:
-        exporter.plot_pf_comparison(calc.df)
+    if 'P_total' in columns and 'S_total' in columns:
+        exporter.plot_power_timeseries(df, pyramid=calc.pyramid)
+
+    if 'PF_total' in columns and 'PF_calc' in columns:
+        exporter.plot_pf_comparison(df, pyramid=calc.pyramid)
+
+    if args.streaming:
+        logger.info("Streaming mode: timeseries sheet skipped")
 
     # DONE
     logger.info("\n" + "=" * 80)
@@ -259,8 +551,12 @@ For more information, see README.md
 
     if args.skip_preprocess:
         logger.info(f"  - Clean file: (skipped)")
-    else:
+    elif clean_file:
         logger.info(f"  - Clean file: {clean_file}")
+    elif args.keep_clean_file:
+        logger.info(f"  - Clean file: (not written)")
+    else:
+        logger.info(f"  - Clean file: (not kept, use --keep-clean-file)")
 
     logger.info(f"\nOverall Status: {acceptance.get('overall', 'N/A')}")
 
@@ -0,0 +1,109 @@
+"""
+Shared fixtures: small synthetic Fluke 435 exports
+"""
+
+import sys
+import numpy as np
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+AGGREGATES = ['Min', 'Priem', 'Max']
+PHASES = ['L1N', 'L2N', 'L3N']
+
+
+def export_columns() -> list:
+    """Header of a reduced export (the columns the metrics read)"""
+
+    columns = ['Dátum', 'Čas']
+
+    for phase in PHASES + ['NG']:
+        columns += [f"Napätie {phase} {agg}" for agg in AGGREGATES]
+    for phase in ['L1', 'L2', 'L3', 'N']:
+        columns += [f"Prúd {phase} {agg}" for agg in AGGREGATES]
+    columns += [f"Frekvencia {agg}" for agg in AGGREGATES]
+
+    for quantity in ['Činný výkon', 'Klasický VA full', 'Klasický VAR', 'Klasický PF']:
+        for phase in PHASES + ['Celkom']:
+            columns += [f"{quantity} {phase} {agg}" for agg in AGGREGATES]
+
+    return columns
+
+
+def _fmt(value: float) -> str:
+    """Number as exported: decimal comma, no leading zero"""
+
+    text = f"{value:.3f}".replace('.', ',')
+
+    if text.startswith('0,'):
+        return text[1:]
+    if text.startswith('-0,'):
+        return '-' + text[2:]
+    return text
+
+
+def write_export(filepath: Path, rows: int, seed: int = 0,
+                 start: str = '2025-10-21T16:01:00', step_s: int = 60) -> Path:
+    """
+    Write a raw export (CP1250, CRLF, decimal commas) with one row per step
+
+    Args:
+        filepath: Output path
+        rows: Number of data rows
+        seed: Random seed of the values
+        start: Timestamp of the first row
+        step_s: Seconds between rows
+
+    Returns:
+        filepath
+    """
+
+    rng = np.random.default_rng(seed)
+    columns = export_columns()
+    times = np.datetime64(start) + np.arange(rows) * np.timedelta64(step_s, 's')
+
+    with open(filepath, 'w', encoding='cp1250', newline='') as f:
+        f.write('\t'.join(columns) + '\r\n')
+
+        for t in times.astype(str):
+            date, clock = t.split('T')
+            y, m, d = date.split('-')
+
+            p = rng.uniform(5000, 12000, 3)
+            q = rng.uniform(1000, 4000, 3)
+            s = np.hypot(p, q)
+            phases = {'Činný výkon': p, 'Klasický VA full': s, 'Klasický VAR': q}
+
+            fields = [f"{d}.{m}.{y}", f"{clock}.000"]
+
+            for name in columns[2:]:
+                quantity, phase = name.rsplit(' ', 2)[:2]
+
+                if quantity == 'Napätie' and phase != 'NG':
+                    value = rng.uniform(225, 235)
+                elif quantity == 'Frekvencia':
+                    value = rng.normal(50, 0.02)
+                elif quantity in phases:
+                    values = phases[quantity]
+                    value = values.sum() if phase == 'Celkom' else values[PHASES.index(phase)]
+                elif quantity == 'Klasický PF':
+                    value = p.sum() / s.sum() if phase == 'Celkom' else (p / s)[PHASES.index(phase)]
+                else:
+                    value = rng.uniform(0, 20)
+
+                fields.append(_fmt(value))
+
+            f.write('\t'.join(fields) + '\r\n')
+
+    return filepath
+
+
+@pytest.fixture
+def export_file(tmp_path):
+    """Factory writing a raw export into tmp_path"""
+
+    def make(rows: int = 300, name: str = 'export.txt', **kwargs) -> Path:
+        return write_export(tmp_path / name, rows, **kwargs)
+
+    return make
@@ -0,0 +1,116 @@
+"""
+Append mode: incremental runs give the same workbook as one streaming run
+"""
+
+import sys
+import pandas as pd
+import pytest
+import process_fluke
+
+
+def run_cli(monkeypatch, *args):
+    """Run process_fluke.main() with arguments (exit code is the status)"""
+
+    monkeypatch.setattr(sys, 'argv', ['process_fluke.py', *map(str, args)])
+
+    with pytest.raises(SystemExit) as exit_info:
+        process_fluke.main()
+
+    assert exit_info.value.code in (0, 1, 2)
+
+
+def workbook(output_dir):
+    """All sheets of the single workbook in output_dir"""
+
+    paths = list(output_dir.glob('*.xlsx'))
+    assert len(paths) == 1
+
+    return pd.read_excel(paths[0], sheet_name=None)
+
+
+def assert_same_workbook(a, b):
+    assert list(a) == list(b)
+
+    for sheet in a:
+        pd.testing.assert_frame_equal(a[sheet], b[sheet], obj=sheet)
+
+
+def line_end(data: bytes, line: int) -> int:
+    """Byte offset after the given line (0 = header)"""
+
+    offset = -1
+    for _ in range(line + 1):
+        offset = data.index(b'\n', offset + 1)
+    return offset + 1
+
+
+@pytest.fixture
+def growing_export(export_file, tmp_path):
+    """Full export and a copy holding only its first 1,200 rows"""
+
+    full = export_file(2000, name='full.txt')
+    data = full.read_bytes()
+
+    growing = tmp_path / 'growing.txt'
+    growing.write_bytes(data[:line_end(data, 1200)])
+
+    return full, growing, data
+
+
+def test_append_runs_equal_streaming(monkeypatch, tmp_path, growing_export):
+    full, growing, data = growing_export
+    cache = tmp_path / 'cache'
+
+    run_cli(monkeypatch, growing, '--append', '--cache-dir', cache, '-o', tmp_path / 'first')
+
+    growing.write_bytes(data)
+    run_cli(monkeypatch, growing, '--append', '--cache-dir', cache, '-o', tmp_path / 'second')
+    run_cli(monkeypatch, full, '--streaming', '--no-cache', '-o', tmp_path / 'streaming')
+
+    assert_same_workbook(workbook(tmp_path / 'second'), workbook(tmp_path / 'streaming'))
+
+
+def test_append_detects_edit_far_before_offset(monkeypatch, tmp_path, growing_export, caplog):
+    full, growing, data = growing_export
+    cache = tmp_path / 'cache'
+
+    run_cli(monkeypatch, growing, '--append', '--cache-dir', cache, '-o', tmp_path / 'first')
+
+    # One digit of P_total in row 100, far more than FINGERPRINT_BYTES
+    # before the stored offset
+    start = line_end(data, 99)
+    fields = data[start:line_end(data, 100)].split(b'\t')
+    column = process_fluke.ColumnMapper.from_file(str(full)).auto_map()['P_total']
+    fields[column] = b'9' + fields[column][1:] if fields[column][:1] != b'9' else b'1' + fields[column][1:]
+    edited = data[:start] + b'\t'.join(fields) + data[line_end(data, 100):]
+
+    assert len(edited) == len(data)
+    growing.write_bytes(edited)
+    full.write_bytes(edited)
+
+    with caplog.at_level('INFO'):
+        run_cli(monkeypatch, growing, '--append', '--cache-dir', cache, '-o', tmp_path / 'second')
+
+    assert "file changed before the stored offset" in caplog.text
+
+    run_cli(monkeypatch, full, '--streaming', '--no-cache', '-o', tmp_path / 'streaming')
+    assert_same_workbook(workbook(tmp_path / 'second'), workbook(tmp_path / 'streaming'))
+
+
+def test_append_replaced_file(monkeypatch, tmp_path, growing_export, export_file, caplog):
+    _, growing, _ = growing_export
+    cache = tmp_path / 'cache'
+
+    run_cli(monkeypatch, growing, '--append', '--cache-dir', cache, '-o', tmp_path / 'first')
+
+    # Another measurement, longer than the stored offset
+    growing.write_bytes(export_file(1500, name='other.txt', seed=1).read_bytes())
+
+    with caplog.at_level('INFO'):
+        run_cli(monkeypatch, growing, '--append', '--cache-dir', cache, '-o', tmp_path / 'second')
+
+    assert "processing whole file" in caplog.text
+
+    run_cli(monkeypatch, tmp_path / 'other.txt', '--streaming', '--no-cache',
+            '-o', tmp_path / 'streaming')
+    assert_same_workbook(workbook(tmp_path / 'second'), workbook(tmp_path / 'streaming'))
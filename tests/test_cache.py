@@ -0,0 +1,58 @@
+"""
+DataCache stat index stays small and current
+"""
+
+import json
+import os
+from fluke_processor import cache as cache_module
+from fluke_processor.cache import DataCache, STAT_INDEX_FILE
+
+
+def stored_index(cache: DataCache) -> dict:
+    with open(cache.cache_dir / STAT_INDEX_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_hit_does_not_rewrite_index(tmp_path):
+    data = tmp_path / 'a.txt'
+    data.write_bytes(b'abc')
+    cache = DataCache(str(tmp_path / 'cache'))
+
+    digest = cache.file_digest(str(data))
+    index_path = cache.cache_dir / STAT_INDEX_FILE
+    os.utime(index_path, ns=(0, 0))
+
+    assert DataCache(str(tmp_path / 'cache')).file_digest(str(data)) == digest
+    assert index_path.stat().st_mtime_ns == 0
+
+
+def test_stale_entries_are_pruned(tmp_path):
+    gone = tmp_path / 'gone.txt'
+    edited = tmp_path / 'edited.txt'
+    kept = tmp_path / 'kept.txt'
+    for path in (gone, edited, kept):
+        path.write_bytes(b'abc')
+
+    cache = DataCache(str(tmp_path / 'cache'))
+    for path in (gone, edited, kept):
+        cache.file_digest(str(path))
+
+    gone.unlink()
+    edited.write_bytes(b'abcdef')
+    cache._evict()
+
+    assert list(stored_index(cache)) == [str(kept.resolve())]
+
+
+def test_index_is_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, 'CACHE_STAT_INDEX_MAX', 3)
+    cache = DataCache(str(tmp_path / 'cache'))
+
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"{i}.txt"
+        path.write_bytes(bytes([i]))
+        cache.file_digest(str(path))
+        paths.append(str(path.resolve()))
+
+    assert list(stored_index(cache)) == paths[-3:]
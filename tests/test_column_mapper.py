@@ -0,0 +1,29 @@
+"""
+Persisted column mappings are keyed on the mapper version
+"""
+
+from fluke_processor import column_mapper
+from fluke_processor.column_mapper import ColumnMapper
+
+from conftest import export_columns
+
+
+def test_fingerprint_changes_with_mapper_version(monkeypatch):
+    mapper = ColumnMapper(columns=export_columns())
+    before = mapper.fingerprint()
+
+    assert mapper.fingerprint() == before
+
+    monkeypatch.setattr(column_mapper, 'MAPPER_VERSION', column_mapper.MAPPER_VERSION + 1)
+
+    assert mapper.fingerprint() != before
+
+
+def test_cached_mapping_not_reused_across_versions(tmp_path, monkeypatch):
+    mapper = ColumnMapper(columns=export_columns())
+    mapping = mapper.auto_map(cache_dir=str(tmp_path))
+
+    monkeypatch.setattr(column_mapper, 'MAPPER_VERSION', column_mapper.MAPPER_VERSION + 1)
+    assert ColumnMapper(columns=export_columns()).auto_map(cache_dir=str(tmp_path)) == mapping
+
+    assert len(list((tmp_path / 'mappings').glob('*.json'))) == 2
@@ -0,0 +1,136 @@
+"""
+DataLoader parser backends keep the same rows
+"""
+
+import pytest
+import pandas as pd
+from fluke_processor.data_loader import DataLoader, PARSER_ENGINES
+from fluke_processor.column_mapper import ColumnMapper
+from fluke_processor.preprocessor import CleanStream, preprocess_file
+
+pytest.importorskip('pyarrow')
+
+
+def malformed_clean_file(export_file, tmp_path):
+    """Clean file with one short and one long row in the middle"""
+
+    raw = export_file(300)
+    clean = tmp_path / 'export_clean.txt'
+    preprocess_file(str(raw), str(clean))
+
+    lines = clean.read_text(encoding='utf-8').splitlines()
+    lines[100] = '\t'.join(lines[100].split('\t')[:20])  # short row
+    lines[200] = lines[200] + '\t1,5\t2,5'                # long row
+    clean.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    return raw, clean
+
+
+@pytest.mark.parametrize('projected', [False, True])
+def test_engines_keep_same_rows(export_file, tmp_path, projected):
+    raw, clean = malformed_clean_file(export_file, tmp_path)
+
+    mapping = ColumnMapper.from_file(str(raw)).auto_map()
+    if projected:
+        mapping = {name: mapping[name] for name in ['datum', 'cas', 'P_total', 'U_L1N']}
+
+    results = {}
+    for engine in PARSER_ENGINES:
+        df, _ = DataLoader(str(clean), engine=engine).load_with_mapping(
+            mapping, parse_timestamps=True)
+        results[engine] = df
+
+    counts = {engine: len(df) for engine, df in results.items()}
+    assert len(set(counts.values())) == 1, counts
+
+    for engine, df in results.items():
+        assert df['timestamp'].notna().sum() == counts['c'], engine
+        assert df['P_total'].isna().sum() == results['c']['P_total'].isna().sum(), engine
+
+
+def test_engines_whole_file(export_file, tmp_path):
+    _, clean = malformed_clean_file(export_file, tmp_path)
+
+    counts = {engine: len(DataLoader(str(clean), engine=engine).load_data(auto_mode=False))
+              for engine in PARSER_ENGINES}
+
+    # All columns read: the long row is dropped, the short one padded
+    assert counts == {engine: 299 for engine in PARSER_ENGINES}
+
+
+def truncate_raw_row(raw, row: int, fields: int = 20):
+    """Cut one data row of a raw export to its first fields"""
+
+    lines = raw.read_bytes().split(b'\r\n')
+    lines[row] = b'\t'.join(lines[row].split(b'\t')[:fields])
+    raw.write_bytes(b'\r\n'.join(lines))
+
+
+def load_stream(raw, mapper, names, engine):
+    """Load projected columns through a CleanStream (as the CLI does)"""
+
+    stream = CleanStream(str(raw), columns=mapper.get_mapped_indices(names=names))
+    loader = DataLoader(str(raw), stream=stream, engine=engine)
+
+    df, _ = loader.load_with_mapping(mapper.get_projected_mapping(names=names),
+                                     parse_timestamps=True)
+    loader.stream.close()
+
+    return df
+
+
+def test_engines_keep_same_rows_from_stream(export_file):
+    raw = export_file(300)
+    truncate_raw_row(raw, 150)
+
+    mapper = ColumnMapper.from_file(str(raw))
+    mapper.auto_map()
+    names = ['datum', 'cas', 'P_total', 'S_total']
+
+    counts = {engine: int(load_stream(raw, mapper, names, engine)['timestamp'].notna().sum())
+              for engine in PARSER_ENGINES}
+
+    assert counts == {engine: 300 for engine in PARSER_ENGINES}
+
+
+def test_chunked_fallback_resumes_stream(export_file, monkeypatch):
+    raw = export_file(300)
+
+    mapper = ColumnMapper.from_file(str(raw))
+    mapper.auto_map()
+    names = ['datum', 'cas', 'P_total']
+    expected = load_stream(raw, mapper, names, 'python')
+
+    read_chunks = DataLoader._read_chunks
+
+    def failing_c(self, engine, use_cols, chunk_size, skip=0):
+        for i, chunk in enumerate(read_chunks(self, engine, use_cols, chunk_size, skip)):
+            if engine == 'c' and i == 2:
+                raise pd.errors.ParserError("simulated failure")
+            yield chunk
+
+    monkeypatch.setattr(DataLoader, '_read_chunks', failing_c)
+
+    stream = CleanStream(str(raw), columns=mapper.get_mapped_indices(names=names))
+    loader = DataLoader(str(raw), stream=stream, engine='c')
+    chunks = list(loader.iter_with_mapping(mapper.get_projected_mapping(names=names),
+                                           chunk_size=50, parse_timestamps=True))
+    loader.stream.close()
+
+    assert loader.stream is not stream
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_concat_chunks_matches_pd_concat():
+    chunks = [pd.DataFrame({'p': [1.5, 2.5], 'n': [1, 2], 'ts': pd.to_datetime(['2025-01-01', '2025-01-02'])}),
+              pd.DataFrame({'p': [3.5], 'n': [3.0], 'ts': pd.to_datetime(['2025-01-03'])})]
+
+    df, n_chunks = DataLoader._concat_chunks(iter(chunks))
+
+    assert n_chunks == 2
+    pd.testing.assert_frame_equal(df, pd.concat(chunks, ignore_index=True))
+
+
+def test_concat_chunks_rejects_empty_input():
+    with pytest.raises(ValueError):
+        DataLoader._concat_chunks(iter([]))
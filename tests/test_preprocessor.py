@@ -0,0 +1,35 @@
+"""
+Parallel preprocessing matches the serial path
+"""
+
+from fluke_processor import preprocessor
+from fluke_processor.preprocessor import iter_clean_blocks
+
+
+def test_parallel_blocks_match_serial(export_file):
+    raw = export_file(2000)
+
+    serial = ''.join(text for text, _ in iter_clean_blocks(raw, 32 * 1024, 1))
+    parallel = ''.join(text for text, _ in iter_clean_blocks(raw, 32 * 1024, 2))
+
+    assert parallel == serial
+
+
+def test_parallel_keeps_bounded_window(export_file, monkeypatch):
+    raw = export_file(2000)
+    submitted = []
+    original = preprocessor.ProcessPoolExecutor.submit
+
+    def submit(pool, *args, **kwargs):
+        submitted.append(args[1:3])
+        return original(pool, *args, **kwargs)
+
+    monkeypatch.setattr(preprocessor.ProcessPoolExecutor, 'submit', submit)
+    monkeypatch.setattr(preprocessor, 'PREPROCESS_PREFETCH', 2)
+
+    blocks = iter_clean_blocks(raw, 16 * 1024, 2)
+    next(blocks)
+
+    # 2 workers × 2 shards up front, plus one refill for the consumed shard
+    assert len(submitted) == 5
+    blocks.close()
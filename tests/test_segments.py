@@ -0,0 +1,210 @@
+"""
+SegmentTable: run-length Δt table, gaps and energy weights
+SegmentStats: its bounded streaming counterpart
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from fluke_processor.segments import SegmentTable, SegmentStats
+from fluke_processor.calculator import Calculator
+
+H = 1 / 60  # Hours per 60 s row
+
+
+def seconds(*values) -> np.ndarray:
+    """int64 nanosecond timestamps from seconds"""
+
+    return np.array(values, dtype=np.int64) * 10**9
+
+
+REGULAR = seconds(0, 60, 120, 180, 240)
+GAP = seconds(0, 60, 120, 720, 780, 840)
+MIXED = seconds(0, 60, 120, 180, 240, 300, 420, 540, 660)
+DISORDER = seconds(0, 60, 60, 120, 100, 160)
+
+
+def test_regular():
+    table = SegmentTable.from_timestamps(REGULAR)
+
+    assert table.start.tolist() == [0]
+    assert table.dt_ns.tolist() == [60 * 10**9]
+    assert table.lengths.tolist() == [5]
+    assert table.first_row_open
+    assert table.interval_counts().to_dict() == {60.0: 4}
+    assert table.gap_mask().tolist() == [False]
+    assert table.weights_h() == pytest.approx([H])
+    assert table.row_weights_h(2) == pytest.approx([H] * 3)
+    assert np.isnan(table.row_dt_s()[0])
+
+    # 5 rows × 1 kW × 1 min
+    assert table.integrate(np.full(5, 1000.0)) == pytest.approx(5000 * H)
+
+
+def test_gap():
+    table = SegmentTable.from_timestamps(GAP)
+
+    assert table.start.tolist() == [0, 3, 4]
+    assert (table.dt_ns // 10**9).tolist() == [60, 600, 60]
+    assert table.lengths.tolist() == [3, 1, 2]
+    assert table.interval_counts().to_dict() == {60.0: 4, 600.0: 1}
+    assert table.dt_mode_ns() == 60 * 10**9
+    assert table.gap_mask().tolist() == [False, True, False]
+
+    # The row after the gap counts for one dominant interval, not 10 min
+    assert table.weights_h() == pytest.approx([H, H, H])
+    assert table.row_weights_h() == pytest.approx([H] * 6)
+    assert table.gap_rows().tolist() == [3]
+    assert table.after_gap(2).tolist() == [False, True, False, False]
+
+    assert table.integrate([1000, 2000, 3000, 4000, 5000, 6000]) == pytest.approx(21000 * H)
+
+    quality = table.quality()
+    assert quality['gaps'] == 1
+    assert quality['gap_hours'] == pytest.approx(540 / 3600)
+    assert quality['longest_gap_s'] == 600.0
+    assert quality['coverage_percent'] == pytest.approx(360 / 900 * 100)
+
+
+def test_mixed_sampling():
+    table = SegmentTable.from_timestamps(MIXED)
+
+    assert table.start.tolist() == [0, 6]
+    assert (table.dt_ns // 10**9).tolist() == [60, 120]
+    assert table.interval_counts().to_dict() == {60.0: 5, 120.0: 3}
+
+    # Three 120 s rows in a row are a sampling segment, not a gap
+    assert table.gap_mask().tolist() == [False, False]
+    assert table.weights_h() == pytest.approx([H, 2 * H])
+    assert table.row_weights_h(5) == pytest.approx([H, 2 * H, 2 * H, 2 * H])
+
+    # 6 kW: 6 rows × 1 min + 3 rows × 2 min = 12 min (sum × dominant Δt gave 9)
+    assert table.integrate(np.full(9, 6000.0)) == pytest.approx(1200.0)
+
+
+def test_short_slow_run_is_gap():
+    table = SegmentTable.from_timestamps(seconds(0, 60, 120, 180, 300, 420, 480))
+
+    assert (table.dt_ns // 10**9).tolist() == [60, 120, 60]
+    assert table.gap_mask().tolist() == [False, True, False]
+    assert table.weights_h() == pytest.approx([H, H, H])
+
+
+def test_duplicate_and_negative_dt():
+    table = SegmentTable.from_timestamps(DISORDER)
+
+    assert table.start.tolist() == [0, 2, 3, 4, 5]
+    assert (table.dt_ns // 10**9).tolist() == [60, 0, 60, -20, 60]
+    assert table.interval_counts().to_dict() == {60.0: 3, 0.0: 1, -20.0: 1}
+    assert table.gap_mask().tolist() == [False] * 5
+
+    # Duplicate and out-of-order rows count for the dominant Δt
+    assert table.weights_h() == pytest.approx([H] * 5)
+    assert table.row_dt_s()[1:].tolist() == [60, 0, 60, -20, 60]
+    assert table.integrate([1000, 2000, 3000, 4000, 5000, 6000]) == pytest.approx(21000 * H)
+
+
+def test_empty_and_single_row():
+    assert len(SegmentTable.from_timestamps(seconds())) == 0
+    assert SegmentTable().integrate([]) == 0.0
+
+    table = SegmentTable.from_timestamps(seconds(0))
+    assert table.interval_counts().empty
+    assert table.weights_h() == pytest.approx([H])
+
+
+COMBINED = np.concatenate([REGULAR, GAP + seconds(900), MIXED + seconds(1800),
+                           DISORDER + seconds(2500)])
+
+
+@pytest.mark.parametrize('splits', [[2], [5], [3, 4], [6, 9, 12], [7, 13, 18, 22, 24]])
+def test_append_equals_whole(splits):
+    whole = SegmentTable.from_timestamps(COMBINED)
+
+    table = SegmentTable()
+    prev_ns = None
+    for part in np.split(COMBINED, splits):
+        table.append(SegmentTable.from_timestamps(part, prev_ns))
+        prev_ns = int(part[-1])
+
+    for name in ['start', 'dt_ns', 'start_ns', 'end_ns']:
+        assert getattr(table, name).tolist() == getattr(whole, name).tolist(), name
+    assert table.n_rows == whole.n_rows
+    assert table.first_row_open == whole.first_row_open
+
+    values = np.arange(len(COMBINED), dtype=np.float64)
+    assert table.integrate(values) == pytest.approx(whole.integrate(values))
+    assert table.row_weights_h(10) == pytest.approx(whole.row_weights_h(10))
+
+
+def test_calculator_energy_mixed_sampling():
+    df = pd.DataFrame({'timestamp': MIXED.view('datetime64[ns]'),
+                       'P_total': np.full(len(MIXED), 6000.0)})
+
+    calc = Calculator(df)
+    calc.analyze_sampling()
+    energy = calc.calculate_energy('P_total')
+
+    assert energy['E_kWh'] == pytest.approx(1.2)
+    assert energy['dt_h'] == pytest.approx(H)
+
+
+def stats_from_parts(ts_ns, values, splits):
+    """SegmentStats fed chunk by chunk"""
+
+    stats = SegmentStats()
+    for part, part_values in zip(np.split(ts_ns, splits), np.split(values, splits)):
+        stats.update(part, {'P': part_values})
+    return stats
+
+
+@pytest.mark.parametrize('ts_ns', [REGULAR, GAP, MIXED, DISORDER, COMBINED])
+@pytest.mark.parametrize('splits', [[], [1], [2], [3, 4]])
+def test_stats_equal_table(ts_ns, splits):
+    table = SegmentTable.from_timestamps(ts_ns)
+    values = np.arange(1, len(ts_ns) + 1, dtype=np.float64) * 1000
+    stats = stats_from_parts(ts_ns, values, splits)
+
+    assert stats.n_rows == table.n_rows
+    assert stats.integrate('P') == pytest.approx(table.integrate(values))
+    assert stats.interval_counts().to_dict() == table.interval_counts().to_dict()
+    assert stats.dt_mode_ns() == table.dt_mode_ns()
+
+    quality, expected = stats.quality(), table.quality()
+    assert quality.pop('segments') <= expected.pop('segments')
+    assert quality == pytest.approx(expected)
+
+
+def test_stats_last_update_rows():
+    stats = SegmentStats()
+    stats.update(GAP[:3])
+    stats.update(GAP[3:])
+
+    assert stats.after_gap(3).tolist() == [True, False, False]
+    assert stats.row_weights_h(3) == pytest.approx([H] * 3)
+
+    with pytest.raises(ValueError):
+        stats.row_weights_h(0)
+
+
+def test_stats_bounded_with_jitter():
+    rng = np.random.default_rng(0)
+    n = 200_000
+
+    # ±1 ms timestamp jitter and one 1 h gap
+    ts_ns = (np.arange(n) * 60_000 + rng.integers(-1, 2, n)) * 10**6
+    ts_ns[n // 2:] += 3600 * 10**9
+    values = rng.uniform(5000, 12000, n)
+
+    table = SegmentTable.from_timestamps(ts_ns)
+    stats = stats_from_parts(ts_ns, values, list(range(10_000, n, 10_000)))
+
+    assert len(table) > n // 2
+    assert len(stats) == 3
+    assert len(stats.centers) == 2
+    assert stats.integrate('P') == pytest.approx(table.integrate(values))
+    assert stats.quality()['gaps'] == table.quality()['gaps'] == 1
+
+    frame = stats.to_frame()
+    assert frame['rows'].tolist() == [n - 1, 1]
+    assert frame['gap'].tolist() == [False, True]
@@ -0,0 +1,156 @@
+"""
+Mergeable accumulators: QuantileSketch, QuantileSketchArray, RunningStats
+"""
+
+import numpy as np
+import pytest
+from fluke_processor.sketch import (RunningStats, QuantileSketch, QuantileSketchArray,
+                                    ErrorAccumulator, SKETCH_ALPHA)
+
+QUANTILES = [0.50, 0.95]
+
+
+def datasets():
+    rng = np.random.default_rng(42)
+
+    return {
+        'lognormal': rng.lognormal(0, 2, 20_000),
+        'uniform': rng.uniform(0.5, 30, 20_000),
+        'shifted_normal': rng.normal(50, 5, 20_000),
+        'negative': -rng.exponential(10, 20_000),
+        'with_zeros_and_nan': np.where(rng.random(20_000) < 0.1, 0.0,
+                                       np.where(rng.random(20_000) < 0.05, np.nan,
+                                                rng.exponential(3, 20_000)))
+    }
+
+
+def pieces(values, splits=(1, 777, 5_000, 12_345)):
+    return np.split(values, list(splits))
+
+
+@pytest.mark.parametrize('name', list(datasets()))
+def test_sketch_within_relative_error(name):
+    values = datasets()[name]
+    sketch = QuantileSketch().update(values)
+
+    assert sketch.count == np.count_nonzero(~np.isnan(values))
+
+    for q in QUANTILES:
+        exact = np.nanquantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= SKETCH_ALPHA * abs(exact) + 1e-12, q
+
+
+@pytest.mark.parametrize('name', list(datasets()))
+def test_sketch_merge_equals_whole(name):
+    values = datasets()[name]
+    whole = QuantileSketch().update(values)
+
+    merged = QuantileSketch()
+    for part in pieces(values):
+        merged.merge(QuantileSketch().update(part))
+
+    assert merged.to_dict() == whole.to_dict()
+    for q in QUANTILES:
+        assert merged.quantile(q) == whole.quantile(q)
+
+
+def test_sketch_merge_rejects_other_alpha():
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+
+def test_sketch_empty():
+    assert np.isnan(QuantileSketch().quantile(0.5))
+    assert np.isnan(QuantileSketch().update([np.nan]).quantile(0.5))
+
+
+@pytest.mark.parametrize('name', list(datasets()))
+def test_running_stats_merge_equals_whole(name):
+    values = datasets()[name]
+    whole = RunningStats().update(values)
+
+    merged = RunningStats()
+    for part in pieces(values):
+        merged.merge(RunningStats().update(part))
+
+    valid = values[~np.isnan(values)]
+    assert merged.count == whole.count == valid.size
+    assert merged.min == whole.min == valid.min()
+    assert merged.max == whole.max == valid.max()
+    assert merged.sum == pytest.approx(valid.sum())
+    assert merged.get_mean() == pytest.approx(valid.mean())
+    assert merged.get_std() == pytest.approx(valid.std(ddof=1))
+    assert merged.m2 == pytest.approx(whole.m2)
+
+
+def test_running_stats_empty_pieces():
+    stats = RunningStats().merge(RunningStats()).update([]).update([np.nan])
+
+    assert stats.count == 0
+    assert np.isnan(stats.get_mean()) and np.isnan(stats.get_std())
+
+
+def test_error_accumulator_merge_equals_whole():
+    values = datasets()['uniform']
+    whole = ErrorAccumulator('sketch').update(values).summary()
+
+    merged = ErrorAccumulator('sketch')
+    for part in pieces(values):
+        merged.merge(ErrorAccumulator('sketch').update(part))
+
+    assert merged.summary() == pytest.approx(whole)
+
+
+def channel_data(rows=5_000, channels=6):
+    """Non-negative values in the array range, with zeros and NaN"""
+
+    rng = np.random.default_rng(7)
+    values = rng.lognormal(0, 1.5, (rows, channels)).clip(1e-3, 1e3)
+    values[rng.random((rows, channels)) < 0.05] = 0.0
+    values[rng.random((rows, channels)) < 0.02] = np.nan
+    values[:, -1] = np.nan  # Channel without data
+
+    return values
+
+
+def test_sketch_array_matches_sketch_per_column():
+    values = channel_data()
+    sketches = QuantileSketchArray(values.shape[1]).update(values)
+
+    expected_count = np.count_nonzero(~np.isnan(values), axis=0)
+    assert sketches.count().tolist() == expected_count.tolist()
+
+    for q in QUANTILES:
+        result = sketches.quantile(q)
+
+        for channel in range(values.shape[1]):
+            single = QuantileSketch().update(values[:, channel]).quantile(q)
+
+            if np.isnan(single):
+                assert np.isnan(result[channel])
+            else:
+                assert result[channel] == pytest.approx(single, rel=1e-9), (q, channel)
+
+
+def test_sketch_array_merge_equals_whole():
+    values = channel_data()
+    whole = QuantileSketchArray(values.shape[1]).update(values)
+
+    merged = QuantileSketchArray(values.shape[1])
+    for part in pieces(values, (1, 333, 2_500)):
+        merged.merge(QuantileSketchArray(values.shape[1]).update(part))
+
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketchArray(values.shape[1], min_value=1e-2))
+
+
+def test_sketch_array_float32_within_relative_error():
+    values = channel_data()[:, :-1]
+    sketches = QuantileSketchArray(values.shape[1]).update(values.astype(np.float32))
+
+    for q in QUANTILES:
+        exact = np.nanquantile(values, q, axis=0)
+        np.testing.assert_array_less(np.abs(sketches.quantile(q) - exact),
+                                     SKETCH_ALPHA * np.abs(exact) * 1.001 + 1e-9)